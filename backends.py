@@ -0,0 +1,56 @@
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, every script falls back to its pure python implementation
+    np = None
+
+BACKENDS = ("auto", "numpy", "python")
+
+def use_numpy(backend, *inputs):
+    """
+    Decides whether a call runs on the NumPy backend.
+
+    Args:
+        backend (str):
+            - "auto":   NumPy when it is installed and any of the inputs already is an ndarray.
+            - "numpy":  NumPy when it is installed, lists are converted once. Falls back to python otherwise.
+            - "python": always the pure python implementation.
+        *inputs: The inputs of the call, only used by "auto".
+
+    Returns:
+        bool: True if the NumPy implementation should be used.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend!r}. Choose from {', '.join(BACKENDS)}.")
+
+    if np is None or backend == "python":
+        return False
+    if backend == "numpy":
+        return True
+    return any(isinstance(x, np.ndarray) for x in inputs)
+
+def as_numeric_array(values, message):
+    """
+    Converts values to an ndarray once and checks its dtype instead of checking every element.
+
+    Args:
+        values: An ndarray or a (nested) list of numbers.
+        message (str): Message of the ValueError raised for non-numeric input.
+
+    Returns:
+        np.ndarray: A boolean, integer or float array.
+
+    Raises:
+        ValueError: If the values are not numeric or do not form a regular array.
+    """
+    try:
+        array = np.asarray(values)
+    except ValueError:  # ragged nested lists cannot be converted
+        raise ValueError(message) from None
+
+    # bool, signed int, unsigned int and float dtypes mirror the isinstance(x, (int, float)) checks
+    if array.dtype.kind not in "biuf":
+        raise ValueError(message)
+    return array
@@ -0,0 +1,142 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from data_cleaning import IMPORTS85_SPEC, CleaningPipeline, load_imports85, outlier_mask
+
+# file writers of the supported output formats, parquet and feather need pyarrow (or fastparquet for parquet)
+WRITERS = {
+    'parquet': lambda df, path: df.to_parquet(path, index=False),
+    'feather': lambda df, path: df.reset_index(drop=True).to_feather(path),
+    'csv':     lambda df, path: df.to_csv(path, index=False),
+}
+
+def output_names(files):
+    """
+    Name the outputs after their input files without extension. Inputs sharing a name (e.g. day1/extract.data and
+    day2/extract.data) get a hash of their absolute path appended, so their outputs never overwrite each other.
+    """
+    names  = [os.path.splitext(os.path.basename(data_file))[0] for data_file in files]
+    counts = Counter(names)
+    return [name if counts[name] == 1 else f"{name}-{hashlib.sha256(os.path.abspath(data_file).encode()).hexdigest()[:8]}"
+            for name, data_file in zip(names, files)]
+
+def clean_file(data_file, out_dir, fmt = 'parquet', threshold = 3, spec = IMPORTS85_SPEC, name = None):
+    """
+    Clean one file with the imports-85 schema and write it in a columnar format.
+
+    Steps: typed load (mapping and dtype conversion at parse time), imputation with a CleaningPipeline fitted
+    on the file, and a boolean 'outlier' column flagging the rows with a z-score above threshold in any numeric column.
+    The output is written as <name>.<fmt> in out_dir, name defaults to the input file name without extension.
+
+    Returns:
+        dict: Summary of the file with its rows, missing counts, imputation medians, outlier counts and output path.
+    """
+    df      = load_imports85(data_file)
+    missing = df.isna().sum()
+
+    pipeline = CleaningPipeline(spec)
+    cleaned  = pipeline.fit_transform(df)
+
+    numerical_columns  = cleaned.select_dtypes(include=['float', 'int']).columns
+    mask               = outlier_mask(cleaned, numerical_columns, 'zscore', threshold)
+    cleaned['outlier'] = mask.any(axis=1)
+
+    name        = name or os.path.splitext(os.path.basename(data_file))[0]
+    output_file = os.path.join(out_dir, f"{name}.{fmt}")
+    WRITERS[fmt](cleaned, output_file)
+
+    medians = {column: value for column, value in pipeline.fill_values_.items()
+               if spec[column].get('impute') == 'median'}
+    return {
+        'file':     data_file,
+        'output':   output_file,
+        'rows':     len(cleaned),
+        'missing':  missing[missing > 0].to_dict(),
+        'medians':  medians,
+        'outliers': mask.sum()[lambda counts: counts > 0].to_dict(),
+    }
+
+def merge_summaries(summaries):
+    """
+    Combine the per-file summaries: missing and outlier counts are added up, medians are kept per file
+    (medians of separate files cannot be combined into the median of all rows).
+    """
+    files = [summary['file'] for summary in summaries]
+    return {
+        'files':    len(summaries),
+        'rows':     sum(summary['rows'] for summary in summaries),
+        'missing':  pd.DataFrame([summary['missing'] for summary in summaries], index=files).fillna(0).sum().astype(int),
+        'outliers': pd.DataFrame([summary['outliers'] for summary in summaries], index=files).fillna(0).sum().astype(int),
+        'medians':  pd.DataFrame([summary['medians'] for summary in summaries], index=files),
+    }
+
+def run_batch(pattern, out_dir, workers = None, fmt = 'parquet', threshold = 3):
+    """
+    Clean every file matching a glob pattern in a process pool.
+
+    Args:
+        pattern (str): Glob of the input files, e.g. "extracts/*.data".
+        out_dir (str): Directory for the cleaned files.
+        workers (int): Number of processes, os.cpu_count() by default.
+        fmt (str): Output format, 'parquet', 'feather' or 'csv'.
+        threshold (float): Z-score above which a value is flagged as an outlier.
+
+    Returns:
+        dict: The merged summary, plus the elapsed seconds and the throughput in files/sec and rows/sec.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown output format: {fmt!r}. Choose from {', '.join(WRITERS)}.")
+
+    files = sorted(glob.glob(pattern))
+    if not files:
+        raise ValueError(f"No input files match {pattern!r}.")
+    os.makedirs(out_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        summaries = list(pool.map(clean_file, files, [out_dir] * len(files), [fmt] * len(files), [threshold] * len(files),
+                                  [IMPORTS85_SPEC] * len(files), output_names(files)))
+    elapsed = time.perf_counter() - start
+
+    summary = merge_summaries(summaries)
+    summary['seconds']       = elapsed
+    summary['files_per_sec'] = len(files) / elapsed
+    summary['rows_per_sec']  = summary['rows'] / elapsed
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean many files with the imports-85 schema in parallel.")
+    parser.add_argument("pattern", help="glob of the input files, e.g. 'extracts/*.data' (quote it)")
+    parser.add_argument("--out", default="cleaned", help="output directory (default: cleaned)")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default: all cores)")
+    parser.add_argument("--format", default="parquet", choices=sorted(WRITERS), help="output format (default: parquet)")
+    parser.add_argument("--threshold", type=float, default=3, help="z-score outlier threshold (default: 3)")
+    parser.add_argument("--summary", metavar="FILE", help="write the merged summary as JSON")
+    args = parser.parse_args()
+
+    summary = run_batch(args.pattern, args.out, args.workers, args.format, args.threshold)
+
+    print(f"Cleaned {summary['files']} files ({summary['rows']} rows) in {summary['seconds']:.2f} s: "
+          f"{summary['files_per_sec']:.1f} files/sec, {summary['rows_per_sec']:.0f} rows/sec")
+    print("\nMissing values filled:")
+    print(summary['missing'])
+    print("\nOutliers flagged:")
+    print(summary['outliers'])
+    print("\nImputation medians per file:")
+    print(summary['medians'])
+
+    if args.summary:
+        with open(args.summary, 'w') as file:
+            json.dump({key: json.loads(value.to_json()) if isinstance(value, (pd.Series, pd.DataFrame)) else value
+                       for key, value in summary.items()}, file, indent=2)
+
+if __name__ == "__main__":
+    main()
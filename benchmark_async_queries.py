@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from dummy_sql_data import populate
+from queries_explained import migrate, query_a, query_b
+from query_service import AsyncQueryService
+
+# report variants requested by the simulated clients: every location for query_a, every year for query_b
+LOCATIONS = [
+    {'department': 'market_insights', 'district': 'Plzen',          'country': 'Czech Republic'},
+    {'department': 'supercars',       'district': 'Woking Borough', 'country': 'Surrey (England)'},
+    {'department': 'supercars',       'district': 'Lisbon',         'country': 'Surrey (England)'},
+    {'department': 'HR',              'district': 'Plzen',          'country': 'Czech Republic'},
+]
+VARIANTS = [('query_a', location) for location in LOCATIONS] + [('query_b', {**LOCATIONS[1], 'year': year}) for year in range(2010, 2024)]
+
+async def heartbeat(interval, lags, stop):
+    """
+    Measures how late the event loop wakes up a task that sleeps interval seconds, i.e. how long it is blocked.
+    """
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+async def load(requests, rate, summary, service = None, conn = None):
+    """
+    Sends the requests at a fixed arrival rate (open loop), through the async service or the synchronous
+    functions on one connection. A request's latency runs from its scheduled arrival, so time spent waiting
+    behind a blocked event loop is counted too.
+
+    Returns:
+        tuple: Latency of every request and event loop lag samples, in seconds.
+    """
+    latencies = []
+    lags      = []
+    stop      = asyncio.Event()
+
+    async def handle(name, filters, arrival):
+        if service is not None:
+            await service.report(name, summary, **filters)
+        else:  # the current synchronous path, it blocks the event loop during the query
+            (query_a if name == 'query_a' else query_b)(conn.cursor(), summary, **filters)
+        latencies.append(time.perf_counter() - arrival)
+
+    monitor = asyncio.create_task(heartbeat(0.001, lags, stop))
+    tasks   = []
+    start   = time.perf_counter()
+    for i, (name, filters) in enumerate(requests):
+        arrival = start + i / rate
+        await asyncio.sleep(max(0, arrival - time.perf_counter()))
+        tasks.append(asyncio.create_task(handle(name, filters, arrival)))
+    await asyncio.gather(*tasks)
+    stop.set()
+    await monitor
+    return latencies, lags
+
+def summarize(label, latencies, lags, elapsed):
+    latencies = sorted(latencies)
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    print(f"{label:>6}: {len(latencies) / elapsed:8.1f} req/s  p50 {statistics.median(latencies) * 1000:8.2f} ms  "
+          f"p95 {p95 * 1000:8.2f} ms  max loop lag {max(lags, default=0) * 1000:8.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares report latency under concurrent load: async service vs the synchronous queries.")
+    parser.add_argument("--db", help="existing salary database (default: generate one in a temporary directory)")
+    parser.add_argument("--employees", type=int, default=6000, help="employees of the generated database (default: 6000, ~1M salary rows)")
+    parser.add_argument("--rate", type=float, default=20, help="request arrivals per second (default: 20)")
+    parser.add_argument("--requests", type=int, default=200, help="total requests (default: 200)")
+    parser.add_argument("--pool-size", type=int, default=os.cpu_count(), help="connections and threads of the async service")
+    parser.add_argument("--summary", action="store_true", help="read the summary tables instead of aggregating tb_salary")
+    parser.add_argument("--cache", action="store_true", help="enable the result cache of the async service")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database = args.db or os.path.join(tmp_dir, "company_db.sqlite")
+        conn = sqlite3.connect(database)
+        if not args.db:
+            print(f"Generating {args.employees} employees...")
+            populate(conn, args.employees, seed=42, fast=True)
+        migrate(conn)
+
+        requests = [VARIANTS[i % len(VARIANTS)] for i in range(args.requests)]
+        print(f"{args.requests} requests at {args.rate:g} req/s, {'summary tables' if args.summary else 'tb_salary'}")
+
+        start = time.perf_counter()
+        latencies, lags = asyncio.run(load(requests, args.rate, args.summary, conn=conn))
+        summarize("sync", latencies, lags, time.perf_counter() - start)
+        conn.close()
+
+        async def run_async():
+            async with AsyncQueryService(database, args.pool_size, cache_size=128 if args.cache else 0) as service:
+                return await load(requests, args.rate, args.summary, service=service)
+
+        start = time.perf_counter()
+        latencies, lags = asyncio.run(run_async())
+        summarize("async", latencies, lags, time.perf_counter() - start)
+
+if __name__ == "__main__":
+    main()
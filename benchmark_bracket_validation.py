@@ -0,0 +1,68 @@
+import argparse
+import json
+import random
+import string
+import time
+
+from bracket_validation import is_valid_bracket_sequence, validate_many
+
+CLOSING = {'(': ')', '[': ']', '{': '}'}
+
+def generate_strings(kind, size, seed = 1904):
+    """
+    Generates test strings of one kind:
+        - "random":   5 to 30 random letters, digits, spaces and brackets.
+        - "json":     JSON documents of about 60 characters, 30% of them truncated.
+        - "brackets": nested brackets only, up to 20 characters, 30% of them reversed.
+    """
+    rng      = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits + " ()[]{}"
+    strings  = []
+    for _ in range(size):
+        if kind == "random":
+            s = "".join(rng.choice(alphabet) for _ in range(rng.randint(5, 30)))
+        elif kind == "json":
+            s = json.dumps({"id": rng.randrange(10 ** 6), "tags": [rng.choice("abc") for _ in range(rng.randint(0, 4))],
+                            "meta": {"x": [rng.random()]}})
+            s = s[:-1] if rng.random() < 0.3 else s
+        else:
+            s = "".join(rng.choice("([{") for _ in range(rng.randint(1, 10)))
+            s = s + "".join(CLOSING[char] for char in reversed(s))
+            s = s[::-1] if rng.random() < 0.3 else s
+        strings.append(s)
+    return strings
+
+def best_of(repeat, function, *args):
+    """
+    Returns the fastest of repeat calls in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def validate_each(strings):
+    return [is_valid_bracket_sequence(s) for s in strings]
+
+def main():
+    parser = argparse.ArgumentParser(description = "Compares validate_many with a per-string is_valid_bracket_sequence loop.")
+    parser.add_argument("--size", type = int, default = 300_000, help = "strings per data set (default: 300k)")
+    parser.add_argument("--repeat", type = int, default = 5, help = "runs per measurement, the fastest is reported (default: 5)")
+    args = parser.parse_args()
+
+    datasets = {kind: generate_strings(kind, args.size) for kind in ("random", "json", "brackets")}
+    datasets["mixed"] = datasets["random"][:args.size // 2] + datasets["json"][:args.size // 2]
+
+    print(f"{'strings':>10} {'loop':>9} {'validate_many':>14} {'speed-up':>9}")
+    for kind, strings in datasets.items():
+        # both paths must agree before their timings mean anything
+        assert list(validate_many(strings)) == list(map(int, validate_each(strings)))
+
+        loop  = best_of(args.repeat, validate_each, strings)
+        batch = best_of(args.repeat, validate_many, strings)
+        print(f"{kind:>10} {loop:>8.3f}s {batch:>13.3f}s {loop / batch:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from columnar_engine import ColumnarEngine
+from dummy_sql_data import populate
+from queries_explained import migrate, query_a, query_b
+
+MONTHS = 14 * 12  # salaries per employee over the default 2010-2023 range
+
+def best_of(repeat, function, *args, **kwargs):
+    """
+    Returns the fastest of repeat calls in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the SQLite queries with the columnar NumPy engine.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 10_000_000], help="salary rows (default: 1k 100k 10M)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query, the fastest is reported (default: 5)")
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'load':>9} {'sql a':>10} {'numpy a':>10} {'sql b':>10} {'numpy b':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            conn = sqlite3.connect(os.path.join(tmp_dir, "company_db.sqlite"))
+            populate(conn, max(1, size // MONTHS), seed=42, fast=True)
+            migrate(conn)  # the SQL path runs with its covering indexes
+            rows = conn.execute("SELECT COUNT(*) FROM tb_salary").fetchone()[0]
+
+            start  = time.perf_counter()
+            engine = ColumnarEngine.from_sqlite(conn)
+            load   = time.perf_counter() - start
+
+            # the engines must agree before their timings mean anything
+            assert engine.query_a().equals(query_a(conn.cursor(), summary=False))
+            assert engine.query_b().equals(query_b(conn.cursor(), summary=False))
+
+            timings = [best_of(args.repeat, query_a, conn.cursor(), summary=False), best_of(args.repeat, engine.query_a),
+                       best_of(args.repeat, query_b, conn.cursor(), summary=False), best_of(args.repeat, engine.query_b)]
+            conn.close()
+
+        print(f"{rows:>12,} {load:>8.2f}s " + " ".join(f"{seconds * 1000:>8.2f}ms" for seconds in timings))
+
+if __name__ == "__main__":
+    main()
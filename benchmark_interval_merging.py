@@ -0,0 +1,55 @@
+import argparse
+import os
+import random
+import time
+
+from backends import np
+from interval_merging import merge_intervals, merge_intervals_parallel
+
+def generate_intervals(size, seed = 1904, use_numpy = True):
+    """
+    Generates random intervals with short lengths so a fair share of them overlap.
+
+    Returns an ndarray of shape (size, 2) when NumPy is used, a list of [start, end] lists otherwise.
+    """
+    if use_numpy and np is not None:
+        rng    = np.random.default_rng(seed)
+        starts = rng.integers(0, size * 10, size)
+        return np.column_stack((starts, starts + rng.integers(0, 12, size)))
+
+    rng = random.Random(seed)
+    intervals = []
+    for _ in range(size):
+        start = rng.randrange(size * 10)
+        intervals.append([start, start + rng.randrange(12)])
+    return intervals
+
+def main():
+    parser = argparse.ArgumentParser(description = "Measures how merge_intervals_parallel scales with the number of cores.")
+    parser.add_argument("--size", type = int, default = 10_000_000, help = "number of intervals (default: 10M)")
+    parser.add_argument("--max-workers", type = int, default = os.cpu_count(), help = "largest worker count to try")
+    parser.add_argument("--python", action = "store_true", help = "use lists of lists instead of NumPy arrays")
+    args = parser.parse_args()
+
+    intervals = generate_intervals(args.size, use_numpy = not args.python)
+    kind      = "lists" if isinstance(intervals, list) else "ndarray"
+    print(f"{args.size:,} intervals ({kind}), up to {args.max_workers} workers")
+
+    start    = time.perf_counter()
+    expected = merge_intervals(intervals)
+    serial   = time.perf_counter() - start
+    print(f"{'serial':>10}: {serial:8.2f} s")
+
+    # powers of two up to the largest worker count, plus that count itself
+    counts = sorted({2 ** i for i in range(args.max_workers.bit_length()) if 2 ** i <= args.max_workers} | {args.max_workers})
+    for workers in counts:
+        start   = time.perf_counter()
+        merged  = merge_intervals_parallel(intervals, workers = workers, shards = max(2, workers))
+        elapsed = time.perf_counter() - start
+
+        # the parallel path must give exactly the serial result
+        same = (merged == expected).all() if kind == "ndarray" else merged == expected
+        print(f"{workers:>3} workers: {elapsed:8.2f} s  speed-up x{serial / elapsed:.2f}  identical: {bool(same)}")
+
+if __name__ == "__main__":
+    main()
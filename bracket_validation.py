@@ -1,4 +1,15 @@
 import sys
+import os
+import re
+from array import array
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+
+# Mapping of closing brackets to their corresponding opening brackets, built once instead of per call
+BRACKET_MAP      = {')': '(', '}': '{', ']': '['}
+OPENING_BRACKETS = frozenset(BRACKET_MAP.values())
 
 def is_valid_bracket_sequence(s: str) -> bool:
     """
@@ -22,18 +33,15 @@ def is_valid_bracket_sequence(s: str) -> bool:
     # Stack to track opening brackets
     stack = []
 
-    # Mapping of closing brackets to their corresponding opening brackets
-    bracket_map = {')': '(', '}': '{', ']': '['}
-
     # Iterate through each character in the string
     for char in s:
         # If it's an opening bracket,
-        if char in bracket_map.values():   
+        if char in OPENING_BRACKETS:
             stack.append(char)          # push it onto the stack
         
         # If it's a closing bracket
-        elif char in bracket_map.keys(): 
-            if not stack or bracket_map[char] != stack.pop():  # Check if the stack is empty or if the last opened bracket doesn't match
+        elif char in BRACKET_MAP:
+            if not stack or BRACKET_MAP[char] != stack.pop():  # Check if the stack is empty or if the last opened bracket doesn't match
                 return False
 
     # If the stack is empty at the end, all brackets were properly matched
@@ -55,6 +63,295 @@ def validate_brackets(s: str) -> None:
     else:
         print("Error: The string contains invalid brackets.")
 
+class ValidationResult(namedtuple("ValidationResult", ["valid", "offset", "line", "column", "message"])):
+    """
+    Result of a streaming validation.
+
+    Attributes:
+        valid (bool): True if the brackets are balanced.
+        offset (int): 0-based character offset of the first error, None if valid.
+        line (int): 1-based line of the first error, None if valid.
+        column (int): 1-based column of the first error, None if valid.
+        message (str): Description of the first error, None if valid.
+
+    The result is truthy only when valid, so it can be used like is_valid_bracket_sequence.
+    """
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return self.valid
+
+class BracketValidator:
+    """
+    Validates brackets in text fed chunk by chunk, keeping the stack state across chunks.
+
+    Only the characters that matter (brackets, quotes, the escape character) are visited in Python:
+    a precompiled character class finds them with re.finditer and lookup tables built once per validator
+    classify them, while the line and column are counted in bulk with str.count between those characters.
+
+    Args:
+        pairs (str): Opening and closing brackets, two characters per pair, e.g. "()[]{}<>".
+        quotes (str): Characters that open and close string literals, e.g. '"' or "\"'".
+                      Brackets inside string literals are ignored. Empty by default, like is_valid_bracket_sequence.
+        escape (str): Character that escapes the next character inside a string literal.
+
+    Time Complexity: O(n), where n is the length of the text.
+    Space Complexity: O(d + c), for the nesting depth d and the chunk size c.
+    """
+
+    def __init__(self, pairs = "()[]{}", quotes = "", escape = "\\"):
+        if len(pairs) % 2 or len(set(pairs)) != len(pairs):
+            raise ValueError("Bracket pairs must be distinct characters given as opening/closing pairs.")
+        if set(quotes) & set(pairs) or (quotes and escape in set(pairs) | set(quotes)):
+            raise ValueError("Quote and escape characters cannot also be brackets.")
+
+        # lookup tables: closing bracket -> opening bracket and the set of opening brackets
+        self._matching = {pairs[i + 1]: pairs[i] for i in range(0, len(pairs), 2)}
+        self._opening  = frozenset(pairs[0::2])
+        self._quotes   = frozenset(quotes)
+        self._escape   = escape if quotes else None
+
+        specials      = pairs + quotes + (escape if quotes else "")
+        self._pattern = re.compile("[" + "".join(re.escape(ch) for ch in specials) + "]")
+
+        self._stack      = []     # (bracket, offset, line, column) of the open brackets
+        self._quote      = None   # (quote, offset, line, column) of the open string literal
+        self._skip       = -1     # offset of the character escaped by the last escape character
+        self._offset     = 0      # offset of the start of the current chunk
+        self._line       = 1      # line at the position scanned so far
+        self._line_start = 0      # offset of the first character of that line
+        self._error      = None
+        self._closed     = False
+
+    def _position(self, chunk, scanned, pos):
+        """
+        Advances the line counter from scanned to pos in the chunk and returns (line, column) at pos.
+        """
+        newlines = chunk.count("\n", scanned, pos)
+        if newlines:
+            self._line      += newlines
+            self._line_start = self._offset + chunk.rfind("\n", scanned, pos) + 1
+        return self._line, self._offset + pos - self._line_start + 1
+
+    def _fail(self, offset, line, column, message):
+        self._error = ValidationResult(False, offset, line, column, message)
+
+    def feed(self, chunk):
+        """
+        Validates the next chunk of text. Does nothing once an error has been found.
+        """
+        if self._closed:
+            raise ValueError("The validator is already closed.")
+        if self._error is not None:
+            return
+
+        stack, matching, opening, quotes, escape = self._stack, self._matching, self._opening, self._quotes, self._escape
+        scanned = 0
+
+        for match in self._pattern.finditer(chunk):
+            pos    = match.start()
+            offset = self._offset + pos
+            char   = chunk[pos]
+
+            # inside a string literal only the escape and the closing quote matter
+            if self._quote is not None:
+                if offset == self._skip:
+                    continue
+                if char == escape:
+                    self._skip = offset + 1
+                elif char == self._quote[0]:
+                    self._quote = None
+                continue
+
+            if char in opening:
+                line, column = self._position(chunk, scanned, pos)
+                scanned      = pos
+                stack.append((char, offset, line, column))
+
+            elif char in matching:
+                if not stack or stack[-1][0] != matching[char]:
+                    line, column = self._position(chunk, scanned, pos)
+                    expected     = f"expected closing bracket for '{stack[-1][0]}'" if stack else "no bracket is open"
+                    self._fail(offset, line, column, f"Unexpected '{char}', {expected}.")
+                    return
+                stack.pop()
+
+            elif char in quotes:
+                line, column = self._position(chunk, scanned, pos)
+                scanned      = pos
+                self._quote  = (char, offset, line, column)
+
+        self._position(chunk, scanned, len(chunk))
+        self._offset += len(chunk)
+
+    def close(self):
+        """
+        Ends the input and returns the ValidationResult.
+        """
+        self._closed = True
+        if self._error is None:
+            if self._quote is not None:
+                quote, offset, line, column = self._quote
+                self._fail(offset, line, column, f"Unterminated string literal opened with {quote}.")
+            elif self._stack:
+                bracket, offset, line, column = self._stack[-1]
+                self._fail(offset, line, column, f"Unclosed '{bracket}'.")
+        return self.result
+
+    @property
+    def result(self):
+        """
+        The ValidationResult so far: the first error if one was found, valid otherwise.
+        """
+        if self._error is not None:
+            return self._error
+        return ValidationResult(True, None, None, None, None)
+
+def validate_stream(source, pairs = "()[]{}", quotes = "", escape = "\\", chunk_size = 1 << 16):
+    """
+    Validates brackets in a text that may not fit in memory.
+
+    Args:
+        source (str or file object or Iterable[str]): The text, a text file opened for reading, or an iterable of chunks.
+        pairs, quotes, escape: See BracketValidator.
+        chunk_size (int): Number of characters read at a time from file objects.
+
+    Returns:
+        ValidationResult: valid, and the offset, line, column and message of the first error.
+
+    Time Complexity: O(n), where n is the length of the text.
+    Space Complexity: O(d + c), for the nesting depth d and the chunk size c.
+    """
+    validator = BracketValidator(pairs, quotes, escape)
+
+    if isinstance(source, str):
+        chunks = (source,)
+    elif hasattr(source, "read"):
+        chunks = iter(lambda: source.read(chunk_size), "")
+    else:
+        chunks = source
+
+    for chunk in chunks:
+        validator.feed(chunk)
+        # stop reading at the first error
+        if not validator.result:
+            break
+
+    return validator.close()
+
+@lru_cache(maxsize = None)
+def _batch_tables(pairs):
+    """
+    Builds the filter table, the bracket lookups and the adjacent pairs to strip, once per process.
+
+    The filter is a plain str.maketrans table deleting every ASCII character that is not a bracket, which
+    str.translate applies with its ASCII fast path. Other characters are kept and handled by the stack check.
+    """
+    if len(pairs) % 2 or len(set(pairs)) != len(pairs):
+        raise ValueError("Bracket pairs must be distinct characters given as opening/closing pairs.")
+    matching = {pairs[i + 1]: pairs[i] for i in range(0, len(pairs), 2)}
+    adjacent = tuple(opening + closing for closing, opening in matching.items())
+    table    = str.maketrans("", "", "".join(chr(code) for code in range(128) if chr(code) not in pairs))
+    return table, matching, frozenset(matching.values()), adjacent
+
+def _strip_pairs(brackets, adjacent, rounds):
+    """
+    Removes the innermost matched pairs for up to rounds rounds.
+
+    Returns:
+        tuple: The remaining brackets and True if they stopped changing within the rounds.
+    """
+    for _ in range(rounds):
+        reduced = brackets
+        for pair in adjacent:
+            reduced = reduced.replace(pair, "")
+        if reduced == brackets:
+            return brackets, True
+        brackets = reduced
+    return brackets, False
+
+def _validate_batch(strings, pairs, short_length = 24, reduce_rounds = 8, count_check_length = 64):
+    """
+    Validates a batch of strings and returns one byte per string (1 valid, 0 invalid).
+
+    Short strings go straight through the stack check, which stops at the first error: filtering them first costs
+    more than it saves. Longer strings are filtered with str.translate and adjacent pairs such as "()" are stripped
+    with str.replace for a few rounds, which settles shallow strings without a Python loop per character.
+    Whatever is left after the rounds, or still holds non-ASCII characters, goes through the stack check.
+    """
+    table, matching, openings, adjacent = _batch_tables(pairs)
+    results = bytearray(len(strings))
+
+    for i, s in enumerate(strings):
+        if len(s) > short_length:
+            # strip every ASCII non-bracket character in one C-level pass
+            brackets = s.translate(table)
+
+            if brackets.isascii():
+                # cheap invariants: an odd number of brackets, a leading closing or trailing opening bracket,
+                # or (for long strings) a type whose counts differ, can never balance
+                if len(brackets) % 2 or (brackets and (brackets[0] in matching or brackets[-1] in openings)):
+                    continue
+                if len(brackets) > count_check_length and any(brackets.count(pair[0]) != brackets.count(pair[1]) for pair in adjacent):
+                    continue
+
+                brackets, settled = _strip_pairs(brackets, adjacent, reduce_rounds)
+                if settled:
+                    # the reduction converged: valid only if every bracket was matched
+                    results[i] = not brackets
+                    continue
+
+            # non-ASCII characters or deeper nesting than the rounds allowed, finish with the stack
+            s = brackets
+
+        # stack check, ignoring the characters that are not brackets
+        stack = []
+        for char in s:
+            if char in openings:
+                stack.append(char)
+            elif char in matching:
+                if not stack or stack.pop() != matching[char]:
+                    break
+        else:
+            results[i] = not stack
+
+    return results
+
+def validate_many(strings, pairs = "()[]{}", workers = None, batch_size = 50_000):
+    """
+    Validates many strings at once and returns a compact array of results instead of printing.
+
+    Short strings get the stack check directly. Longer ones are reduced to their brackets with str.translate and
+    rejected early when the brackets cannot balance. Matched adjacent pairs are then stripped with str.replace,
+    and deeply nested leftovers get the usual stack check. Large batches are split across a process pool.
+    See benchmark_bracket_validation.py for the comparison with a per-string is_valid_bracket_sequence loop.
+
+    Args:
+        strings (Sequence[str]): The strings to validate.
+        pairs (str): Opening and closing brackets, two characters per pair.
+        workers (int): Number of processes. None or 1 validates in this process.
+        batch_size (int): Number of strings sent to a worker at a time.
+
+    Returns:
+        array('B'): One entry per string, 1 if its brackets are valid and 0 otherwise.
+
+    Time Complexity: O(total length of the strings).
+    Space Complexity: O(n) for the results, plus O(longest string) for the filtered brackets.
+    """
+    strings = strings if isinstance(strings, (list, tuple)) else list(strings)
+    results = array("B")
+
+    if not workers or workers == 1 or len(strings) <= batch_size:
+        results.frombytes(bytes(_validate_batch(strings, pairs)))
+        return results
+
+    batches = [strings[i:i + batch_size] for i in range(0, len(strings), batch_size)]
+    with ProcessPoolExecutor(max_workers = min(workers, os.cpu_count() or 1, len(batches))) as pool:
+        for batch in pool.map(_validate_batch, batches, repeat(pairs)):
+            results.frombytes(bytes(batch))
+    return results
+
 # to run the code, pass a string with brackets as a command-line argument
 if __name__ == "__main__":
     if len(sys.argv) < 2:
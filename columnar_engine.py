@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+from queries_explained import REPORTS, report_params
+
+# text columns of tb_employee, stored dictionary-encoded (integer codes into a small array of distinct values)
+EMPLOYEE_TEXT_COLUMNS = ['gender', 'position', 'department', 'country', 'district']
+
+def _read_columns(cursor, query, dtypes, chunksize = 1_000_000):
+    """
+    Reads a query into one NumPy array per column, converting fetchmany chunks as they come
+    so the Python row tuples of only one chunk are alive at a time.
+    """
+    cursor.execute(query)
+    chunks = [[] for _ in dtypes]
+    while rows := cursor.fetchmany(chunksize):
+        for column, values in enumerate(zip(*rows)):
+            chunks[column].append(np.array(values, dtype=dtypes[column]))
+    return [np.concatenate(parts) if parts else np.empty(0, dtype) for parts, dtype in zip(chunks, dtypes)]
+
+class ColumnarEngine:
+    """
+    In-memory columnar copy of the salary database evaluating query_a and query_b with vectorized NumPy operations.
+
+    The tables are loaded once:
+        - tb_salary as month_id, employee_id and salary_value arrays sorted by (employee_id, month_id), so the
+          salaries of an employee are contiguous and the last one is the most recent month.
+        - tb_employee as arrays indexed by employee_id, text columns as pd.Categorical (dictionary encoded):
+          filters compare integer codes instead of strings.
+        - tb_reference_salary as a (position, year) matrix of maximum reference values, NaN where missing.
+
+    The reports return the same DataFrames as queries_explained.query_a / query_b with summary=False
+    (rows with the same sort keys may come in a different order, as in SQL).
+
+    Example:
+        engine = ColumnarEngine.from_sqlite(conn)
+        df = engine.query_b(year=2015)
+    """
+
+    def __init__(self, salaries, employees, references):
+        """
+        Args:
+            salaries (tuple): month_id, employee_id and salary_value arrays of the salaries.
+            employees (pd.DataFrame): tb_employee, with integer employee_id.
+            references (pd.DataFrame): tb_reference_salary.
+        """
+        month_id, employee_id, salary_value = salaries
+        order = np.lexsort((month_id, employee_id))
+        self.month_id     = month_id[order]
+        self.employee_id  = employee_id[order]
+        self.salary_value = salary_value[order]
+        self.year         = self.month_id // 100
+
+        # employee attributes indexed by employee_id, -1 codes for ids without employee
+        size = int(max(employees['employee_id'].max(), self.employee_id.max(initial=0))) + 1 if len(employees) else 1
+        ids  = employees['employee_id'].to_numpy()
+        self.categories = {}
+        self.codes      = {}
+        for column in EMPLOYEE_TEXT_COLUMNS:
+            encoded = pd.Categorical(employees[column])
+            self.categories[column] = encoded.categories
+            self.codes[column]      = np.full(size, -1, dtype=np.int32)
+            self.codes[column][ids] = encoded.codes
+        self.has_employee      = np.zeros(size, dtype=bool)
+        self.has_employee[ids] = True
+
+        # maximum reference value of every (position code, year), positions unknown to tb_employee are dropped
+        positions       = pd.Categorical(references['position'], categories=self.categories['position']).codes
+        known           = positions >= 0
+        years           = references['year'].to_numpy()
+        self.first_year = int(min(years.min(initial=9999), self.year.min(initial=9999)))
+        last_year       = int(max(years.max(initial=0), self.year.max(initial=0)))
+        self.maximum_ref_value = np.full((len(self.categories['position']) + 1, max(last_year - self.first_year + 1, 1)), np.nan)
+        self.maximum_ref_value[positions[known], years[known] - self.first_year] = references['maximum_ref_value'].to_numpy()[known]
+
+    @classmethod
+    def from_sqlite(cls, conn, chunksize = 1_000_000):
+        """
+        Loads the three tables from a SQLite connection.
+        """
+        cursor     = conn.cursor()
+        salaries   = _read_columns(cursor, "SELECT month_id, employee_id, salary_value FROM tb_salary",
+                                   [np.int64, np.int64, np.float64], chunksize)
+        employees  = pd.read_sql("SELECT employee_id, gender, position, department, country, district FROM tb_employee", conn)
+        references = pd.read_sql("SELECT position, year, maximum_ref_value FROM tb_reference_salary", conn)
+        return cls(salaries, employees, references)
+
+    def _employee_mask(self, params):
+        # boolean array indexed by employee_id: employees matching the department/district/country filters
+        mask = self.has_employee.copy()
+        for column in ('department', 'district', 'country'):
+            categories = self.categories[column]
+            if params[column] not in categories:
+                return np.zeros_like(mask)
+            mask &= self.codes[column] == categories.get_loc(params[column])
+        return mask
+
+    def _frame(self, name, params, ids, values):
+        # report DataFrame with the decoded employee attributes of ids followed by the value columns
+        report  = REPORTS[name]
+        columns = [column.format(**params) for column in report.columns if column not in report.exclude]
+        if not len(ids):  # the empty frame of the SQL path, with object columns
+            return pd.DataFrame.from_records([], columns=columns)
+        data    = {'employee_id': ids}
+        for column in ('position', 'department', 'country', 'district'):
+            data[column] = np.asarray(self.categories[column], dtype=object)[self.codes[column][ids]]
+        data.update(zip(columns[len(data):], values))
+        return pd.DataFrame(data, columns=columns)
+
+    def query_a(self, **filters):
+        """
+        Vectorized query_a: most recent salary of every filtered employee, kept if above the reference maximum
+        of its position and year, with the number of overpaid months as first sort key.
+        """
+        params = report_params('query_a', filters)
+        rows   = np.flatnonzero(self._employee_mask(params)[self.employee_id])
+        ids    = self.employee_id[rows]
+
+        # reference maximum of every selected salary, NaN (never overpaid) without reference
+        positions = self.codes['position'][ids]
+        maximum   = self.maximum_ref_value[positions, self.year[rows] - self.first_year]
+        salary    = self.salary_value[rows]
+        overpaid  = salary > maximum
+
+        # the rows are sorted by (employee_id, month_id): the last row of every employee is its most recent month
+        if len(rows):
+            last   = np.flatnonzero(np.append(ids[1:] != ids[:-1], True))
+            months = np.add.reduceat(overpaid.astype(np.int64), np.concatenate(([0], last[:-1] + 1)))
+        else:
+            last   = months = np.empty(0, dtype=np.int64)
+        keep         = overpaid[last]
+        last, months = last[keep], months[keep]
+
+        difference = salary[last] - maximum[last]
+        order      = np.lexsort((-difference, -months))
+        last       = last[order]
+        return self._frame('query_a', params, ids[last], [salary[last], maximum[last], self.month_id[rows][last]])
+
+    def query_b(self, **filters):
+        """
+        Vectorized query_b: total salary of every filtered employee in a year, sorted ascending.
+        """
+        params = report_params('query_b', filters)
+        year   = params['year']
+        mask   = (self._employee_mask(params)[self.employee_id]
+                  & (self.month_id >= year * 100 + 1) & (self.month_id <= year * 100 + 12))
+        ids    = self.employee_id[mask]
+
+        totals   = np.bincount(ids, weights=self.salary_value[mask], minlength=len(self.has_employee))
+        selected = np.unique(ids)
+        totals   = totals[selected]
+        order    = np.argsort(totals, kind='stable')
+        return self._frame('query_b', params, selected[order], [totals[order]])
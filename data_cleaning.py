@@ -1,24 +1,196 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
-from scipy import stats
-import matplotlib.pyplot as plt
-import seaborn as sns
 
-def analyze_dataset(df):
+# matplotlib and seaborn are imported only when a plot is requested, see _plot
+
+# the file imports-85.names contains the names, ranges and missing value marker of the columns in the dataset
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "imports-85.data")
+
+COLUMN_NAMES = ['symboling', 'normalized-losses', 'make', 'fuel-type', 'aspiration',
+     'num-of-doors', 'body-style', 'drive-wheels', 'engine-location',
+     'wheel-base', 'length', 'width', 'height', 'curb-weight', 'engine-type',
+     'num-of-cylinders', 'engine-size', 'fuel-system', 'bore', 'stroke',
+     'compression-ratio', 'horsepower', 'peak-rpm', 'city-mpg', 'highway-mpg', 'price']
+
+# word values of the 2 columns that should be numeric
+DOORS_MAP     = {'two': 2, 'four': 4}
+CYLINDERS_MAP = {'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'eight': 8, 'twelve': 12}
+
+# nominal columns with the values listed in imports-85.names, fixed categories keep every chunk on the same dtype
+CATEGORIES = {
+    'make':            ['alfa-romero', 'audi', 'bmw', 'chevrolet', 'dodge', 'honda', 'isuzu', 'jaguar', 'mazda',
+                        'mercedes-benz', 'mercury', 'mitsubishi', 'nissan', 'peugot', 'plymouth', 'porsche',
+                        'renault', 'saab', 'subaru', 'toyota', 'volkswagen', 'volvo'],
+    'fuel-type':       ['diesel', 'gas'],
+    'aspiration':      ['std', 'turbo'],
+    'body-style':      ['hardtop', 'wagon', 'sedan', 'hatchback', 'convertible'],
+    'drive-wheels':    ['4wd', 'fwd', 'rwd'],
+    'engine-location': ['front', 'rear'],
+    'engine-type':     ['dohc', 'dohcv', 'l', 'ohc', 'ohcf', 'ohcv', 'rotor'],
+    'fuel-system':     ['1bbl', '2bbl', '4bbl', 'idi', 'mfi', 'mpfi', 'spdi', 'spfi'],
+}
+
+# continuous columns, the ones with missing values need a float dtype to hold NaN
+FLOAT_COLUMNS = ['normalized-losses', 'wheel-base', 'length', 'width', 'height', 'curb-weight', 'engine-size',
+                 'bore', 'stroke', 'compression-ratio', 'horsepower', 'peak-rpm', 'city-mpg', 'highway-mpg', 'price']
+
+DTYPES = {'symboling': 'int64',
+          **{column: 'float64' for column in FLOAT_COLUMNS},
+          **{column: pd.CategoricalDtype(values) for column, values in CATEGORIES.items()}}
+
+def _word_to_number(mapping):
+    """
+    Returns a read_csv converter that maps the word values of a column to numbers and '?' to NaN.
+    """
+    def convert(value):
+        return mapping.get(value, float('nan'))
+    return convert
+
+CONVERTERS = {'num-of-doors':     _word_to_number(DOORS_MAP),
+              'num-of-cylinders': _word_to_number(CYLINDERS_MAP)}
+
+def load_imports85(data_file = DATA_FILE, chunksize = None):
+    """
+    Read imports-85.data with the full schema applied at parse time.
+
+    Missing values ('?') become NaN, nominal columns are parsed straight into category dtype,
+    continuous columns into float and the word-number columns are converted while parsing,
+    so no column has to be converted (and copied) afterwards.
+
+    Args:
+        data_file (str): Path to a file with the imports-85 schema.
+        chunksize (int): If given, returns an iterator of DataFrames of at most chunksize rows
+                         instead of one DataFrame, to process files larger than memory.
+
+    Returns:
+        pd.DataFrame or pandas TextFileReader of DataFrames.
+    """
+    return pd.read_csv(data_file, names=COLUMN_NAMES, header=None, na_values='?',
+                       dtype=DTYPES, converters=CONVERTERS, chunksize=chunksize)
+
+def memory_report(data_file = DATA_FILE):
+    """
+    Compare the memory used by the untyped read_csv and by load_imports85.
+    """
+    untyped = pd.read_csv(data_file, names=COLUMN_NAMES).memory_usage(deep=True).sum()
+    typed   = load_imports85(data_file).memory_usage(deep=True).sum()
+    report  = {'untyped_bytes': int(untyped), 'typed_bytes': int(typed), 'ratio': untyped / typed}
+    print(f"Memory usage: {untyped / 1024:.1f} KiB untyped -> {typed / 1024:.1f} KiB typed ({report['ratio']:.1f}x smaller)")
+    return report
+
+class PlotWriter:
+    """
+    Render plots to files in a background thread so the analysis is not blocked by rendering.
+
+    Plots are drawn on matplotlib Figure objects (no pyplot state, no display needed), one at a time.
+    Pass a PlotWriter as the plot argument of the analysis functions, then close it (or use it as a
+    context manager) to wait for the files.
+    """
+
+    def __init__(self, directory, fmt = 'png'):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fmt       = fmt
+        self._pool     = ThreadPoolExecutor(max_workers=1)
+        self._futures  = []
+
+    def submit(self, name, figsize, draw, *args):
+        """
+        Queue a plot: draw(ax, *args) is called in the background and saved as <name>.<fmt>.
+        """
+        self._futures.append(self._pool.submit(self._render, name, figsize, draw, args))
+
+    def _render(self, name, figsize, draw, args):
+        from matplotlib.figure import Figure
+
+        figure = Figure(figsize=figsize)
+        draw(figure.subplots(), *args)
+        path = os.path.join(self.directory, f"{name}.{self.fmt}")
+        figure.savefig(path, bbox_inches='tight')
+        return path
+
+    def close(self):
+        """
+        Wait for every queued plot and return the paths of the files written.
+        """
+        paths = [future.result() for future in self._futures]
+        self._pool.shutdown()
+        return paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _plot(plot, name, figsize, draw, *args):
+    """
+    Show a plot, queue it on a PlotWriter or skip it.
+
+    Args:
+        plot (bool or PlotWriter): True shows the plot with pyplot, a PlotWriter saves it in the background,
+                                   False does nothing (and never imports matplotlib).
+    """
+    if isinstance(plot, PlotWriter):
+        plot.submit(name, figsize, draw, *args)
+    elif plot:
+        import matplotlib.pyplot as plt
+
+        _, ax = plt.subplots(figsize=figsize)
+        draw(ax, *args)
+        plt.show()
+
+def _draw_missing_heatmap(ax, missing):
+    import seaborn as sns
+
+    sns.heatmap(missing, cbar=False, cmap='viridis', yticklabels=False, ax=ax)
+    ax.set_title('Missing Values Heatmap')
+
+def _draw_boxplot(ax, values, column):
+    import seaborn as sns
+
+    sns.boxplot(x=values, ax=ax)
+    ax.set_title(f'Boxplot for {column}')
+
+def _draw_correlation_heatmap(ax, matrix):
+    import seaborn as sns
+
+    sns.heatmap(matrix, annot=True, cmap='coolwarm', fmt='.2f', linewidths=0.5, ax=ax)
+    ax.set_title('Pearson Correlation Matrix')
+
+def analyze_dataset(df, verbose = True):
     """
     Analyze the dataset and return a summary of the dataset.
+
+    Returns a dict with the shape, the df.info() text, the first rows and the summary statistics.
+    Nothing is printed when verbose is False.
     """
+    info = io.StringIO()
+    df.info(buf=info)             # info() prints by default, capture it instead
     summary = {
         'shape': df.shape,
-        'info': df.info(),        # This directly prints the info
+        'info': info.getvalue(),
         'head': df.head(),        # Preview the first few rows of the dataset
         'describe': df.describe() # Summary statistics of the dataset
     }
+    if not verbose:
+        return summary
+
+    print(summary['info'])
     print("Dataset Summary:")
     print(f"Shape of dataset: {summary['shape']}")
     print("\nFirst few rows of the dataset:")
     print(summary['head'])
     print("\nSummary statistics of the dataset:")
     print(summary['describe'])
+    return summary
     #  using info(), head() and shape to get a summary of the dataset and its columns we find there are:
     #    - 205 rows and 26 columns,
     #    - missing values in 7 columns,
@@ -26,13 +198,13 @@ def analyze_dataset(df):
     #    - columns num-of-doors and num-of-cylinders have values that are strings but can and should be int dtype.
     #    - missing data is represented by '?' 
    
-def analyze_missing_values(df):
+def analyze_missing_values(df, plot = True, verbose = True, name = 'missing_values'):
     """
     Analyze missing values in the dataset and return a summary.
-    """
-    # replaced the '?' with NaN 
-    df.replace('?', pd.NA, inplace=True)
 
+    Returns a DataFrame with the missing count and percentage of each column.
+    The heatmap is shown, written by a PlotWriter (as <name>.png) or skipped depending on plot, see _plot.
+    """
     # counted the missing values in each column using the isnull() method and verified most missing values are in the 'normalized-losses' column
     number_missing_values = df.isnull().sum()
     # calculated percentage of missing values
@@ -43,28 +215,20 @@ def analyze_missing_values(df):
         'Missing Count':      number_missing_values,
         'Missing Percentage': missing_percentage
     })
-    print(missing_summary)
+    if verbose:
+        print(missing_summary)
     
     # view missing data with a heatmap for better analysis
-    plt.figure(figsize=(12, 8))
-    sns.heatmap(df.isnull(), cbar=False, cmap='viridis', yticklabels=False)
-    plt.title('Missing Values Heatmap')
-    plt.show()
+    _plot(plot, name, (12, 8), _draw_missing_heatmap, df.isnull())
+    return missing_summary
 
 def mapping_columns(df):
     """
     Mapping the 2 columns to the correct data.
     """
     # first i converted 'num-of-doors' and 'num-of-cylinders' to int dtype by mapping the string values to the int values 
-    df['num-of-doors']     = df['num-of-doors'].map({'two': 2,
-                                                      'four': 4})
-    df['num-of-cylinders'] = df['num-of-cylinders'].map({'two': 2,
-                                                          'three': 3,
-                                                            'four': 4,
-                                                              'five': 5,
-                                                                'six': 6,
-                                                                  'eight': 8,
-                                                                    'twelve': 12})
+    df['num-of-doors']     = df['num-of-doors'].map(DOORS_MAP)
+    df['num-of-cylinders'] = df['num-of-cylinders'].map(CYLINDERS_MAP)
     return df
 
 def convert_columns_dtype(df, dtype, *columns):
@@ -105,76 +269,578 @@ def fill_missing_values(df, *columns):
         df[column] = df[column].fillna(median)
     return df
 
+# default cleaning rules for imports-85: the word-number columns are mapped, missing values are filled with
+# the median of the continuous columns and the most frequent number of doors and cylinders, which then become integer columns
+IMPORTS85_SPEC = {
+    'normalized-losses': {'impute': 'median'},
+    'bore':              {'impute': 'median'},
+    'stroke':            {'impute': 'median'},
+    'horsepower':        {'impute': 'median'},
+    'peak-rpm':          {'impute': 'median'},
+    'price':             {'impute': 'median'},
+    'num-of-doors':      {'mapping': DOORS_MAP, 'impute': 'mode', 'dtype': 'int64'},
+    'num-of-cylinders':  {'mapping': CYLINDERS_MAP, 'impute': 'mode', 'dtype': 'int64'},
+}
+
+IMPUTE_STRATEGIES = ('median', 'mean', 'mode', 'constant')
+
+class CleaningPipeline:
+    """
+    Declarative cleaning: a column spec compiled into a few whole-frame operations.
+
+    Each column of the spec can have:
+        - 'mapping':    dict applied to the column when it still holds raw (non-numeric) values.
+        - 'impute':     'median', 'mean', 'mode' or 'constant' (with 'fill_value') for the missing values.
+        - 'dtype':      dtype of the column once the missing values are filled.
+
+    fit computes the imputation statistics once (one median() call for all the median columns, one mean(), one mode()).
+    transform then applies them to any batch with a single fillna and a single astype, so new files or chunks
+    are cleaned with the same statistics without recomputing them.
+
+    Frames read without load_imports85 are accepted too: mapped columns holding raw words are mapped, and the
+    median/mean columns still holding text (e.g. '?') are coerced to numbers, unparsable values becoming NaN.
+    Integer columns that still have missing values after the fill (no 'impute' rule, or a column that was
+    entirely missing when fitted) become the nullable Int64 dtype instead of failing.
+    """
+
+    def __init__(self, spec = IMPORTS85_SPEC):
+        self.spec = spec
+
+        # compile the spec: group the columns by operation
+        self._mappings   = {column: rules['mapping'] for column, rules in spec.items() if 'mapping' in rules}
+        self._dtypes     = {column: rules['dtype'] for column, rules in spec.items() if 'dtype' in rules}
+        self._strategies = {strategy: [] for strategy in IMPUTE_STRATEGIES}
+        for column, rules in spec.items():
+            if 'impute' in rules:
+                if rules['impute'] not in IMPUTE_STRATEGIES:
+                    raise ValueError(f"Unknown imputation strategy for {column}: {rules['impute']!r}.")
+                self._strategies[rules['impute']].append(column)
+        self._numeric = [column for column in self._strategies['median'] + self._strategies['mean'] if column not in self._mappings]
+
+        self.fill_values_ = None
+
+    def _map(self, df):
+        """
+        Map the columns that still hold raw values and coerce the numeric ones read as text,
+        returning a new frame (the input is not modified).
+        """
+        raw     = {column: df[column].map(self._mappings[column]) for column in self._mappings
+                   if not pd.api.types.is_numeric_dtype(df[column])}
+        raw.update({column: pd.to_numeric(df[column], errors='coerce') for column in self._numeric
+                    if not pd.api.types.is_numeric_dtype(df[column])})
+        return df.assign(**raw) if raw else df
+
+    def fit(self, df):
+        """
+        Compute the imputation statistics of every column in the spec.
+        """
+        df    = self._map(df)
+        fills = {}
+
+        if self._strategies['median']:
+            fills.update(df[self._strategies['median']].median().to_dict())
+        if self._strategies['mean']:
+            fills.update(df[self._strategies['mean']].mean().to_dict())
+        if self._strategies['mode']:
+            # the smallest value wins ties, like stats.mode; a column without any value has no mode and is left unfilled
+            modes = df[self._strategies['mode']].mode(dropna=True)
+            if len(modes):
+                fills.update(modes.iloc[0].dropna().to_dict())
+        for column in self._strategies['constant']:
+            fills[column] = self.spec[column]['fill_value']
+
+        self.fill_values_ = fills
+        return self
+
+    def transform(self, df):
+        """
+        Clean a frame (or a chunk) with the fitted statistics.
+        """
+        if self.fill_values_ is None:
+            raise ValueError("CleaningPipeline must be fitted before transform.")
+
+        df = self._map(df)
+        df = df.fillna(self.fill_values_)
+        if not self._dtypes:
+            return df
+
+        # NaN cannot be stored in a NumPy integer column, the columns still missing values get the nullable dtype
+        dtypes = {column: 'Int64' if pd.api.types.is_integer_dtype(dtype) and df[column].isna().any() else dtype
+                  for column, dtype in self._dtypes.items()}
+        return df.astype(dtypes)
+
+    def fit_transform(self, df):
+        """
+        Fit on a frame and clean it.
+        """
+        return self.fit(df).transform(df)
+
+    def fingerprint(self):
+        """
+        Return a stable hash of the spec, so cached results are rebuilt when the cleaning rules change.
+        """
+        spec = json.dumps(self.spec, sort_keys=True, default=str)
+        return hashlib.sha256(spec.encode()).hexdigest()
+
+def iter_clean_imports85(pipeline, data_file = DATA_FILE, chunksize = 100_000):
+    """
+    Clean a file larger than memory chunk by chunk with an already fitted pipeline.
+    """
+    for chunk in load_imports85(data_file, chunksize=chunksize):
+        yield pipeline.transform(chunk)
+
+# bump when the cache layout or the loader changes so old cache files are ignored
+CACHE_VERSION = '2'
+
+def _input_key(data_file, key):
+    """
+    Identify the content of the input file: a sha256 of its bytes ('content') or its size and mtime ('mtime').
+    """
+    if key == 'mtime':
+        status = os.stat(data_file)
+        return f"{status.st_size}-{status.st_mtime_ns}"
+    if key == 'content':
+        digest = hashlib.sha256()
+        with open(data_file, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    raise ValueError(f"Unknown cache key: {key!r}. Choose 'content' or 'mtime'.")
+
+def _cache_format():
+    """
+    Feather (memory-mappable Arrow) when pyarrow is installed, pickle otherwise.
+    """
+    try:
+        import pyarrow  # noqa: F401
+        return 'feather'
+    except ImportError:
+        return 'pkl'
+
+# fingerprint of the cached typed frame, which does not depend on any cleaning rule
+RAW_FINGERPRINT = hashlib.sha256(b'raw').hexdigest()
+
+def _cached(data_file, cache_dir, input_key, fingerprint, build):
+    """
+    Read a frame from the cache or build it with build() and write it.
+
+    Cache files are named <input name>-<path hash>-<input key>-<fingerprint>.<fmt>. Once a file is written, the caches
+    of older versions of the same input file (same name and path, another input key) are removed. Caches of other
+    fingerprints (other specs) and of other inputs with the same name stay valid and are kept, and temporary files
+    of writers in other processes are never touched.
+    """
+    fmt    = _cache_format()
+    prefix = f"{os.path.splitext(os.path.basename(data_file))[0]}-{hashlib.sha256(os.path.abspath(data_file).encode()).hexdigest()[:8]}-"
+    path   = os.path.join(cache_dir, f"{prefix}{input_key}-{fingerprint[:16]}.{fmt}")
+
+    if os.path.exists(path):
+        return pd.read_feather(path) if fmt == 'feather' else pd.read_pickle(path)
+
+    df = build()
+
+    # write to a temporary file of this writer first so a crash never leaves a truncated cache behind
+    os.makedirs(cache_dir, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(prefix=os.path.basename(path), suffix='.tmp', dir=cache_dir)
+    os.close(descriptor)
+    try:
+        if fmt == 'feather':
+            df.to_feather(temporary)
+        else:
+            df.to_pickle(temporary)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+    for entry in os.listdir(cache_dir):
+        if entry.startswith(prefix) and not entry.endswith('.tmp') and entry[len(prefix):].split('-')[0] != input_key:
+            try:
+                os.remove(os.path.join(cache_dir, entry))
+            except FileNotFoundError:  # already removed by another process
+                pass
+    return df
+
+def load_cleaned(data_file = DATA_FILE, spec = IMPORTS85_SPEC, cache_dir = None, key = 'content', raw = False):
+    """
+    Load the cleaned dataset from a binary cache, rebuilding it only when the input or the cleaning rules change.
+
+    The cache file name combines a hash of the input file (see key) with the fingerprint of the spec, so any change
+    to either misses the cache. Caches of older versions of the same input file are removed when a new one is written,
+    caches of other specs are kept so switching between specs does not rebuild them.
+
+    Args:
+        data_file (str): File with the imports-85 schema.
+        spec (dict): Column spec of the CleaningPipeline, see IMPORTS85_SPEC.
+        cache_dir (str): Cache directory, a .cache folder next to the data file by default.
+        key (str): 'content' hashes the whole file (safe), 'mtime' only uses its size and modification time (instant).
+        raw (bool): Also return the typed frame before cleaning (load_imports85), cached as well,
+                    for the analyses of the raw data.
+
+    Returns:
+        pd.DataFrame: The cleaned dataset, or a (raw, cleaned) tuple of DataFrames when raw is True.
+    """
+    pipeline  = CleaningPipeline(spec)
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(data_file)), '.cache')
+    input_key = hashlib.sha256(f"{CACHE_VERSION}:{_input_key(data_file, key)}".encode()).hexdigest()[:16]
+
+    # the file is parsed at most once, even when both frames miss the cache
+    parsed = []
+    def parse():
+        if not parsed:
+            parsed.append(load_imports85(data_file))
+        return parsed[0]
+
+    cleaned = _cached(data_file, cache_dir, input_key, pipeline.fingerprint(), lambda: pipeline.fit_transform(parse()))
+    if not raw:
+        return cleaned
+    return _cached(data_file, cache_dir, input_key, RAW_FINGERPRINT, parse), cleaned
+
+# default threshold of each outlier method: |z| for zscore, |robust z| for mad and the IQR multiple for iqr
+OUTLIER_THRESHOLDS = {'zscore': 3, 'mad': 3.5, 'iqr': 1.5}
+
+def _outlier_bounds(values, method, threshold, center = None, scale = None):
+    """
+    Return the per-column (low, high) bounds outside which a value is an outlier.
+
+    values is a 2D float array with NaN for missing values. center and scale can be given
+    (e.g. from ColumnMoments) to skip computing them from values.
+
+    A column whose spread is 0 (standard deviation, MAD or IQR) gets infinite bounds and has no outliers:
+    with MAD or IQR this happens as soon as most values are equal (e.g. num-of-doors), and any value
+    different from the median would otherwise be flagged.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if method == 'zscore':
+            center = np.nanmean(values, axis=0) if center is None else center
+            scale  = np.nanstd(values, axis=0) if scale is None else scale   # ddof=0 like stats.zscore
+            low, high = center, center
+
+        elif method == 'mad':
+            # median absolute deviation scaled to match the standard deviation of normal data
+            low = high = np.nanmedian(values, axis=0)
+            scale      = 1.4826 * np.nanmedian(np.abs(values - low), axis=0)
+
+        elif method == 'iqr':
+            low, high = np.nanpercentile(values, [25, 75], axis=0)
+            scale     = high - low
+
+        else:
+            raise ValueError(f"Unknown outlier method: {method!r}. Choose from {', '.join(OUTLIER_THRESHOLDS)}.")
+
+        scale = np.where(scale > 0, scale, np.inf)
+        return low - threshold * scale, high + threshold * scale
+
+def outlier_mask(df, columns = None, method = 'zscore', threshold = None):
+    """
+    Flag the outliers of every numeric column in one vectorized pass.
+
+    Args:
+        df (pd.DataFrame): The data, NaN values are ignored and never flagged.
+        columns: Columns to check, all numeric columns by default.
+        method (str): 'zscore', 'mad' (median absolute deviation) or 'iqr' (interquartile range).
+        threshold (float): Cut-off of the method, see OUTLIER_THRESHOLDS for the defaults.
+
+    Returns:
+        pd.DataFrame: Boolean mask with the same index, True where a value is an outlier.
+    """
+    if columns is None:
+        columns = df.select_dtypes(include='number').columns
+    threshold = OUTLIER_THRESHOLDS.get(method) if threshold is None else threshold
+
+    values    = df[columns].to_numpy(dtype=float, na_value=np.nan)
+    low, high = _outlier_bounds(values, method, threshold)
+    # comparisons with NaN are False, so missing values are never outliers
+    mask = (values < low) | (values > high)
+    return pd.DataFrame(mask, index=df.index, columns=columns)
+
+def outlier_rows(mask):
+    """
+    Return the index labels of the outlier rows of each column of an outlier mask, for columns with outliers.
+    """
+    values = mask.to_numpy()
+    return {column: mask.index[values[:, i]].to_numpy() for i, column in enumerate(mask.columns) if values[:, i].any()}
+
 def find_outliers_zscore(df, columns, threshold = 3):
-    outliers = {}
-    for column in columns:
-        z_scores = stats.zscore(df[column])  
-        data     = df[(z_scores > threshold) | (z_scores < -threshold)]
-        if not data.empty:  
-            outliers[column] = data
-    return outliers
+    """
+    Find the rows with a z-score above the threshold in each column.
+
+    Returns a dict column -> DataFrame of the outlier rows, for the columns with outliers.
+    The z-scores of all columns are computed at once by outlier_mask, use outlier_mask or outlier_rows
+    directly to avoid copying the rows.
+    """
+    mask = outlier_mask(df, columns, 'zscore', threshold)
+    return {column: df.loc[rows] for column, rows in outlier_rows(mask).items()}
+
+class ColumnMoments:
+    """
+    Mergeable per-column count, mean and variance, to compute z-scores over data that does not fit in memory.
+
+    Chunks are summarized with vectorized NaN-aware operations and combined with Chan's parallel formula,
+    so partial moments from separate files or workers can be merged like running_avg.RunningStats.
+    """
+
+    __slots__ = ('columns', 'count', 'mean', '_m2')
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.count   = np.zeros(len(self.columns))
+        self.mean    = np.zeros(len(self.columns))
+        self._m2     = np.zeros(len(self.columns))
+
+    @property
+    def variance(self):
+        """Population variance of each column."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self._m2 / self.count
+
+    @property
+    def std(self):
+        """Population standard deviation of each column."""
+        return np.sqrt(self.variance)
+
+    def update(self, chunk):
+        """
+        Add the values of a DataFrame chunk.
+        """
+        values = chunk[self.columns].to_numpy(dtype=float, na_value=np.nan)
+        other  = ColumnMoments(self.columns)
+        other.count = np.sum(~np.isnan(values), axis=0).astype(float)
+        # columns without values in this chunk keep a mean of 0 and a count of 0
+        other.mean  = np.nansum(values, axis=0) / np.maximum(other.count, 1)
+        other._m2   = np.nansum((values - other.mean) ** 2, axis=0)
+        return self.merge(other)
+
+    def merge(self, other):
+        """
+        Combine the moments of another ColumnMoments over the same columns into this one.
+        """
+        count = self.count + other.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta     = other.mean - self.mean
+            weight    = np.where(count > 0, other.count / count, 0)
+            self.mean = self.mean + delta * weight
+            self._m2  = self._m2 + other._m2 + delta ** 2 * self.count * weight
+        self.count = count
+        return self
+
+def iter_outlier_masks(chunks, columns, threshold = 3, moments = None):
+    """
+    Flag z-score outliers over chunked data (e.g. load_imports85(path, chunksize=...)).
+
+    Two-pass (exact): compute the moments in a first pass over the chunks, ColumnMoments(columns).update(chunk)
+    for each chunk, and pass them here for the second pass.
+    Single-pass (approximate): leave moments as None, each chunk is flagged against the moments of every chunk
+    seen so far including itself, so the first chunks are judged on less data.
+
+    Yields:
+        pd.DataFrame: The boolean outlier mask of each chunk.
+    """
+    single_pass = moments is None
+    if single_pass:
+        moments = ColumnMoments(columns)
+
+    for chunk in chunks:
+        if single_pass:
+            moments.update(chunk)
+        values    = chunk[moments.columns].to_numpy(dtype=float, na_value=np.nan)
+        low, high = _outlier_bounds(values, 'zscore', threshold, moments.mean, moments.std)
+        yield pd.DataFrame((values < low) | (values > high), index=chunk.index, columns=moments.columns)
 
-def report_outliers(outliers_zscore, df):
+def report_outliers(outliers_zscore, df, plot = True, verbose = True):
     """
     Report the number of outliers and their percentage for each column with outliers.
+
+    Returns a DataFrame with the outlier count and percentage of each column with outliers.
+    The boxplots are shown, written by a PlotWriter or skipped depending on plot, see _plot.
     """
+    report = {}
     for column, outlier_data in outliers_zscore.items():
         num_outliers = len(outlier_data)  # Count the number of outliers
         total_rows = len(df)  # Total number of rows in the dataset
         outlier_percentage = (num_outliers / total_rows) * 100  # Calculate percentage of outliers
-        print(f"Number of outliers in {column}: {num_outliers} ({outlier_percentage:.2f}%)")
+        report[column] = {'Outlier Count': num_outliers, 'Outlier Percentage': outlier_percentage}
+        if verbose:
+            print(f"Number of outliers in {column}: {num_outliers} ({outlier_percentage:.2f}%)")
         
         # Optionally: Boxplot to visualize outliers
-        plt.figure(figsize=(8, 6))
-        sns.boxplot(x=df[column])
-        plt.title(f'Boxplot for {column}')
-        plt.show()
+        _plot(plot, f'boxplot_{column}', (8, 6), _draw_boxplot, df[column], column)
+
+    return pd.DataFrame.from_dict(report, orient='index', columns=['Outlier Count', 'Outlier Percentage'])
 
-def correlation_matrix(df, numerical_columns):
+def correlation_matrix(df, numerical_columns, plot = True, verbose = True):
     """
     Compute the correlation matrix using Pearson correlation.
+
+    Returns the matrix as a DataFrame. The heatmap is shown, written by a PlotWriter or skipped depending on plot, see _plot.
     """
     correlation_matrix = df[numerical_columns].corr(method='pearson')
-    print("Correlation Matrix:")
-    print(correlation_matrix)
+    if verbose:
+        print("Correlation Matrix:")
+        print(correlation_matrix)
     
     # plot the correlation matrix using a heatmap
-    plt.figure(figsize=(10, 8))
-    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', fmt='.2f', linewidths=0.5)
-    plt.title('Pearson Correlation Matrix')
-    plt.show()
+    _plot(plot, 'correlation_matrix', (10, 8), _draw_correlation_heatmap, correlation_matrix)
+    return correlation_matrix
+
+class CorrelationAccumulator:
+    """
+    Incremental, mergeable Pearson correlations over chunks of data.
+
+    Keeps the count, the mean of each column and the co-moments (sums of products of deviations from the mean),
+    updated per chunk with one matrix product and combined with Chan's parallel formula, so partial accumulators
+    from separate workers or files can be merged. The correlations are produced on demand.
+
+    With a target column only the co-moments with the target are kept (O(p) memory instead of O(p^2)),
+    enough for top_k such as "features most correlated with price".
+
+    Rows with a missing value in any tracked column are skipped (listwise), unlike DataFrame.corr which
+    works pair by pair, so results match df.corr() on data without missing values.
+    """
+
+    __slots__ = ('columns', 'target', 'count', 'mean', '_m2', '_cross')
+
+    def __init__(self, columns, target = None):
+        self.columns = list(columns)
+        self.target  = target
+        if target is not None and target not in self.columns:
+            self.columns.append(target)
+
+        p = len(self.columns)
+        self.count  = 0
+        self.mean   = np.zeros(p)
+        self._m2    = np.zeros(p)                                   # co-moment of each column with itself
+        self._cross = np.zeros(p) if target is not None else np.zeros((p, p))
+
+    def _target_index(self):
+        return self.columns.index(self.target)
+
+    def update(self, chunk):
+        """
+        Add the complete rows of a DataFrame chunk.
+        """
+        values = chunk[self.columns].to_numpy(dtype=float, na_value=np.nan)
+        values = values[~np.isnan(values).any(axis=1)]
+        if not len(values):
+            return self
+
+        other        = CorrelationAccumulator(self.columns, self.target)
+        other.count  = len(values)
+        other.mean   = values.mean(axis=0)
+        deviations   = values - other.mean
+        other._m2    = np.einsum('ij,ij->j', deviations, deviations)
+        other._cross = deviations.T @ (deviations[:, self._target_index()] if self.target is not None else deviations)
+        return self.merge(other)
+
+    def merge(self, other):
+        """
+        Combine another accumulator over the same columns (and target) into this one.
+        """
+        if other.count == 0:
+            return self
+
+        count  = self.count + other.count
+        delta  = other.mean - self.mean
+        factor = self.count * other.count / count
+
+        self._m2 = self._m2 + other._m2 + delta ** 2 * factor
+        if self.target is not None:
+            self._cross = self._cross + other._cross + delta * delta[self._target_index()] * factor
+        else:
+            self._cross = self._cross + other._cross + np.outer(delta, delta) * factor
+        self.mean  = self.mean + delta * other.count / count
+        self.count = count
+        return self
+
+    def corr(self):
+        """
+        Return the Pearson correlation matrix (needs an accumulator without target).
+        """
+        if self.target is not None:
+            raise ValueError("The full correlation matrix is not tracked when a target is set, use correlations().")
+        std = np.sqrt(self._m2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            matrix = self._cross / np.outer(std, std)
+        return pd.DataFrame(matrix, index=self.columns, columns=self.columns)
+
+    def correlations(self, target = None):
+        """
+        Return the Pearson correlation of every column with the target column, as a Series.
+        """
+        target = self.target if target is None else target
+        if self.target is not None and target != self.target:
+            raise ValueError(f"Only correlations with {self.target!r} are tracked.")
+
+        t     = self.columns.index(target)
+        cross = self._cross if self.target is not None else self._cross[:, t]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return pd.Series(cross / np.sqrt(self._m2 * self._m2[t]), index=self.columns, name=target)
+
+    def top_k(self, k = 10, target = None, absolute = True):
+        """
+        Return the k columns most correlated with the target (by absolute value by default), strongest first.
+        """
+        target = self.target if target is None else target
+        values = self.correlations(target).drop(target)
+        order  = values.abs() if absolute else values
+        return values[order.sort_values(ascending=False).index[:k]]
+
+def top_correlated(df, target, k = 10, columns = None):
+    """
+    Return the k numeric columns most correlated with target without computing the full correlation matrix.
+    """
+    if columns is None:
+        columns = df.select_dtypes(include='number').columns
+    return CorrelationAccumulator(columns, target).update(df).top_k(k)
+
+def analysis_report(df, numerical_columns = None, threshold = 3, plot = False):
+    """
+    Run the whole analysis without printing and return it as a JSON-serializable dict.
+
+    Meant for batch servers: nothing is plotted unless plot is a PlotWriter (or True).
+    """
+    if numerical_columns is None:
+        numerical_columns = df.select_dtypes(include=['float', 'int']).columns
+
+    summary  = analyze_dataset(df, verbose=False)
+    missing  = analyze_missing_values(df, plot=plot, verbose=False)
+    outliers = report_outliers(find_outliers_zscore(df, numerical_columns, threshold), df, plot=plot, verbose=False)
+    matrix   = correlation_matrix(df, numerical_columns, plot=plot, verbose=False)
+
+    return {
+        'shape':       list(summary['shape']),
+        'dtypes':      df.dtypes.astype(str).to_dict(),
+        'describe':    json.loads(summary['describe'].to_json()),
+        'missing':     json.loads(missing.to_json(orient='index')),
+        'outliers':    json.loads(outliers.to_json(orient='index')),
+        'correlation': json.loads(matrix.to_json()),
+    }
     
-def main():
+def run_analysis(data_file = DATA_FILE, plot = True, report_file = None, memory = False):
     # the file imports-85.names contains the names of the columns in the dataset
     # the file imports-85.data contains the data in the dataset
-    # File path
-    data_file  = r"C:\Users\lourencomarvao\nos\data\imports-85.data"
-
-    column_names = ['symboling', 'normalized-losses', 'make', 'fuel-type', 'aspiration',
-     'num-of-doors', 'body-style', 'drive-wheels', 'engine-location',
-     'wheel-base', 'length', 'width', 'height', 'curb-weight', 'engine-type',
-     'num-of-cylinders', 'engine-size', 'fuel-system', 'bore', 'stroke',
-     'compression-ratio', 'horsepower', 'peak-rpm', 'city-mpg', 'highway-mpg', 'price']
+    # plot is True to show the plots, False for headless runs or a PlotWriter to save them to files in the background
+    # report_file, if given, receives the analysis of the cleaned data as JSON
+    # memory compares the memory of the untyped read with the typed loader (two extra parses of the file)
+    if memory:
+        memory_report(data_file)
 
-    # read the dataset 
-    df = pd.read_csv(data_file, names=column_names)
+    # read the dataset with the schema applied while parsing:
+    # '?' is read as NaN, 'num-of-doors' and 'num-of-cylinders' are mapped to numbers and the other columns get their dtype
+    # so mapping_columns and converter are only needed for frames read without load_imports85
+    # the typed and the cleaned frames are cached and only rebuilt when the data file or IMPORTS85_SPEC change,
+    # so repeated runs do not parse the file at all, see load_cleaned
+    df, cleaned = load_cleaned(data_file, IMPORTS85_SPEC, raw=True)
 
     # analyze the dataset
     analyze_dataset(df)
 
     # analyze missing values in the dataset
     print('----------------------------Missing Values----------------------------------------')  
-    analyze_missing_values(df)
+    analyze_missing_values(df, plot=plot)
 
     # Assumption:
     # 1. The missing values are just unknown values and not errors in the dataset.
 
-    # mapping the columns to the correct data
-    df = mapping_columns(df)
-
-    # convert the columns to the correct dtype
-    df = converter(df)
-
     # now the data is ready to deal with the missing values
     # there are different ways to handle missing values such as:
     #   - deleting the column with missing values, 
@@ -182,18 +848,14 @@ def main():
     #   - filling the missing values with the mean, median or frequency of values in the column
     #   - using a model like knn to predict the missing values
 
-    # fill the missing values with the mean of the column using the fill_missing_values function
-    df = fill_missing_values(df, 'normalized-losses', 'bore', 'stroke', 'horsepower', 'peak-rpm', 'price')
-
-    # all that remains is handle the 2 missing values in the 'num-of-doors' column
-    # i used the frequency of the column to fill the missing values and changed the dtype to int from float
-    frequency_result   = stats.mode(df['num-of-doors'], nan_policy='omit') 
-    df['num-of-doors'] = df['num-of-doors'].fillna(frequency_result[0])
-    df['num-of-doors'] = df['num-of-doors'].astype('int')
+    # fill the missing values with the median of the continuous columns
+    # and handle the 2 missing values in the 'num-of-doors' column with the frequency of the column, changing the dtype to int from float
+    # the pipeline computes every statistic once and fills all the columns in one pass, see IMPORTS85_SPEC
+    df = cleaned
 
     # count the new missing values
     print('----------------------------New Missing Values----------------------------------------')  
-    analyze_missing_values(df)
+    analyze_missing_values(df, plot=plot, name='missing_values_cleaned')
     print('----------------------------Data Cleaning Done!---------------------------------------')
 
     # find outliers using the z-score method
@@ -201,7 +863,7 @@ def main():
     numerical_columns = df.select_dtypes(include=['float', 'int']).columns
     outliers_zscore   = find_outliers_zscore(df, numerical_columns)
 
-    report_outliers(outliers_zscore, df)
+    report_outliers(outliers_zscore, df, plot=plot)
 
     # Assumption:
     # 2. The outliers are valid data points and not errors in the dataset.
@@ -214,7 +876,16 @@ def main():
     # Start by identifying which features are most important in the price of a car by computing the correlation matrix.
 
     # correlation matrix using Pearson correlation
-    correlation_matrix(df, numerical_columns)
+    correlation_matrix(df, numerical_columns, plot=plot)
+
+    # the features most correlated with the price, without the full matrix
+    print("Features most correlated with price:")
+    print(top_correlated(df, 'price', k=5, columns=numerical_columns))
+
+    # structured results for unattended runs
+    if report_file:
+        with open(report_file, 'w') as file:
+            json.dump(analysis_report(df, numerical_columns), file, indent=2)
 
     # The correlation matrix shows the relationship between the numerical columns in the dataset.
     # More specifically: 'engine-size', 'curb-weight' have the strongest positive correlation with 'price' while surprisingly 'symboling', 'num-of-doors' and 'stroke' have basically no influence on the price.
@@ -222,6 +893,21 @@ def main():
     # Cars with bigger engines have more horsepower and are heavier.
     # Cars with large width and legth are heavier and have lower mpg aka fuel efficiency.
 
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Clean and analyze a file with the imports-85 schema.")
+    parser.add_argument("data_file", nargs="?", default=DATA_FILE, help="input file (default: data/imports-85.data)")
+    parser.add_argument("--headless", action="store_true", help="do not show any plot")
+    parser.add_argument("--plots", metavar="DIR", help="save the plots to DIR in the background instead of showing them")
+    parser.add_argument("--report", metavar="FILE", help="write the analysis of the cleaned data as JSON")
+    parser.add_argument("--memory", action="store_true", help="compare the memory of the untyped and the typed read")
+    args = parser.parse_args(argv)
+
+    if args.plots:
+        with PlotWriter(args.plots) as writer:
+            run_analysis(args.data_file, plot=writer, report_file=args.report, memory=args.memory)
+    else:
+        run_analysis(args.data_file, plot=not args.headless, report_file=args.report, memory=args.memory)
+
 if __name__ == "__main__":
     main()
     
\ No newline at end of file
@@ -1,15 +1,17 @@
-import sqlite3
+import argparse
 import random
+import sqlite3
+import time
+from itertools import islice
 
-# connect to SQLite 
-conn = sqlite3.connect("company_db.sqlite")
-cursor = conn.cursor()
+from backends import np
 
-# drop tables if they exist (for rerunning the script)
-cursor.executescript("""
+SCHEMA = """
 DROP TABLE IF EXISTS tb_employee;
 DROP TABLE IF EXISTS tb_salary;
 DROP TABLE IF EXISTS tb_reference_salary;
+DROP TABLE IF EXISTS tb_salary_year_summary;
+DROP TABLE IF EXISTS tb_employee_overpaid;
 
 CREATE TABLE tb_employee (
     employee_id INTEGER PRIMARY KEY,
@@ -26,6 +28,7 @@ CREATE TABLE tb_salary (
     month_id INTEGER,
     employee_id INTEGER,
     salary_value REAL,
+    year INTEGER GENERATED ALWAYS AS (month_id / 100) STORED,
     FOREIGN KEY(employee_id) REFERENCES tb_employee(employee_id)
 );
 
@@ -36,10 +39,10 @@ CREATE TABLE tb_reference_salary (
     minimum_ref_value REAL,
     PRIMARY KEY(position, year)
 );
-""")
+"""
 
-# sample employees
-employees = [
+# sample employees, always the first rows so the example queries keep their results
+SAMPLE_EMPLOYEES = [
     (1, 30, 'F', 'Manager',    'HR',              'Czech Republic',   'Plzen'),
     (2, 35, 'F', 'Mechanic',   'supercars',       'Surrey (England)', 'Woking Borough'),
     (3, 40, 'M', 'Lawyer',     'Tax',             'Czech Republic',   'Plzen'),
@@ -49,47 +52,217 @@ employees = [
     (7, 54, 'M', 'Consultant', 'market_insights', 'Czech Republic',   'Plzen'),
 ]
 
-cursor.executemany("INSERT INTO tb_employee VALUES (?, ?, ?, ?, ?, ?, ?)", employees)
-
-# generate salaries for 2010-2023
-salaries = []
-for emp_id in range(1, 8):          # nº employees
-    for year in range(2010, 2024):  # year
-        for month in range(1, 13):  # month
-            month_id = int(f"{year}{month:02d}")
-            if emp_id in [5, 7]:
-                salary = random.randint(5500, 7000) # Random salary to meet the query conditions
-            else:
-                salary = random.randint(2000, 4500)  # Random salary
-            salaries.append((month_id, emp_id, salary))
-
-cursor.executemany("INSERT INTO tb_salary (month_id, employee_id, salary_value) VALUES (?, ?, ?)", salaries)
+# sample employees paid above the reference maximum
+OVERPAID_SAMPLES = {5, 7}
 
-# base reference salary for positions
-base_reference_salaries = {
+# base reference salary for positions (maximum, minimum)
+BASE_REFERENCE_SALARIES = {
     'Consultant':  (5000, 3000),
     'Mechanic':    (4500, 2800),
     'Engineer':    (4800, 3000),
     'Lawyer':      (5200, 3500),
-    'Manager':     (5000, 2200) 
+    'Manager':     (5000, 2200)
 }
-reference_salaries = []
 
-# reference salaries for each year from 2010 to 2023
-for year in range(2010, 2024):
-    for position, (max_salary, min_salary) in base_reference_salaries.items():
-        # annual payrise of 1% (inflation)
-        new_max = round(max_salary * (1.01 ** (year - 2023)), 2)
-        new_min = round(min_salary * (1.01 ** (year - 2023)), 2)
-        reference_salaries.append((position, year, new_max, new_min))
+# default weights of the generated employees, in the proportions of the sample employees
+DEPARTMENTS = {'supercars': 3, 'market_insights': 2, 'HR': 1, 'Tax': 1}
+DISTRICTS   = {
+    ('Czech Republic',   'Plzen'):          4,
+    ('Surrey (England)', 'Woking Borough'): 2,
+    ('Surrey (England)', 'Lisbon'):         1,
+}
+
+SALARY_RANGE   = (2000, 4500)
+OVERPAID_RANGE = (5500, 7000)  # random salary to meet the query conditions
+
+INSERT_EMPLOYEE  = "INSERT INTO tb_employee VALUES (?, ?, ?, ?, ?, ?, ?)"
+INSERT_SALARY    = "INSERT INTO tb_salary (month_id, employee_id, salary_value) VALUES (?, ?, ?)"
+INSERT_REFERENCE = "INSERT INTO tb_reference_salary VALUES (?, ?, ?, ?)"
+
+def create_schema(conn):
+    """
+    Drops and recreates tb_employee, tb_salary and tb_reference_salary (for rerunning the script).
+    """
+    conn.executescript(SCHEMA)
+
+def generate_employees(n_employees = 7, seed = None, departments = None, districts = None, overpaid_share = 0.02):
+    """
+    Generates employees: the sample employees first, then random ones drawn from the given distributions.
+
+    Args:
+        n_employees (int): Number of employees. The first min(n_employees, 7) are the sample employees.
+        seed (int): Seed of the random generator. The same seed always gives the same employees.
+        departments (dict): Weight of every department, DEPARTMENTS by default.
+        districts (dict): Weight of every (country, district) pair, DISTRICTS by default.
+        overpaid_share (float): Probability that a generated employee is paid above the reference maximum.
+
+    Yields:
+        tuple: (employee row, overpaid) where the row has the tb_employee columns in order.
+    """
+    departments = departments or DEPARTMENTS
+    districts   = districts or DISTRICTS
+    rng         = random.Random(seed)
+
+    for row in SAMPLE_EMPLOYEES[:n_employees]:
+        yield row, row[0] in OVERPAID_SAMPLES
+
+    positions = list(BASE_REFERENCE_SALARIES)
+    for employee_id in range(len(SAMPLE_EMPLOYEES) + 1, n_employees + 1):
+        department         = rng.choices(list(departments), weights=list(departments.values()))[0]
+        country, district  = rng.choices(list(districts), weights=list(districts.values()))[0]
+        row = (employee_id, rng.randint(20, 65), rng.choice('FM'), rng.choice(positions), department, country, district)
+        yield row, rng.random() < overpaid_share
+
+def month_ids(years):
+    """
+    Returns the month ids (YYYYMM) of an inclusive (first_year, last_year) range.
+    """
+    return [year * 100 + month for year in range(years[0], years[1] + 1) for month in range(1, 13)]
+
+def generate_salaries(employees, years = (2010, 2023), seed = None, fast = False, block_size = 1_000):
+    """
+    Generates the monthly salaries of every employee, one employee after the other.
+
+    Args:
+        employees: Iterable of (employee_id, overpaid) pairs.
+        years (tuple): Inclusive (first_year, last_year) range.
+        seed (int): Seed of the random generator. The same seed always gives the same salaries.
+        fast (bool): Draw the salaries of block_size employees at a time with NumPy. It is deterministic
+                     too but uses a different generator, so it does not give the same values as fast=False.
+        block_size (int): Employees per NumPy block.
+
+    Yields:
+        tuple: (month_id, employee_id, salary_value) rows.
+
+    Time Complexity: O(E * M) for E employees and M months, with memory bounded by one block.
+    """
+    months = month_ids(years)
+
+    if fast:
+        if np is None:
+            raise ValueError("fast mode needs NumPy installed.")
+        yield from _generate_salaries_numpy(employees, months, seed, block_size)
+        return
+
+    rng = random.Random(seed)
+    for employee_id, overpaid in employees:
+        low, high = OVERPAID_RANGE if overpaid else SALARY_RANGE
+        for month_id in months:
+            yield month_id, employee_id, rng.randint(low, high)
+
+def _generate_salaries_numpy(employees, months, seed, block_size):
+    rng    = np.random.default_rng(seed)
+    months = np.array(months)
+    employees = iter(employees)
+    while True:
+        block = list(islice(employees, block_size))
+        if not block:
+            return
+        ids, overpaid = np.array(block, dtype=np.int64).T
+        low  = np.where(overpaid, OVERPAID_RANGE[0], SALARY_RANGE[0])
+        high = np.where(overpaid, OVERPAID_RANGE[1], SALARY_RANGE[1])
+
+        # one (employees, months) block of salaries, flattened employee by employee like the python mode
+        salaries = rng.integers(low[:, None], high[:, None] + 1, size=(len(block), len(months)))
+        yield from zip(np.tile(months, len(block)).tolist(),
+                       np.repeat(ids, len(months)).tolist(),
+                       salaries.ravel().tolist())
+
+def generate_reference_salaries(years = (2010, 2023)):
+    """
+    Generates the reference salaries of every position for every year, with a 1% annual payrise (inflation)
+    up to the last year of the range.
+    """
+    for year in range(years[0], years[1] + 1):
+        for position, (max_salary, min_salary) in BASE_REFERENCE_SALARIES.items():
+            new_max = round(max_salary * (1.01 ** (year - years[1])), 2)
+            new_min = round(min_salary * (1.01 ** (year - years[1])), 2)
+            yield position, year, new_max, new_min
+
+def insert_batches(conn, statement, rows, batch_size = 100_000):
+    """
+    Inserts rows with executemany in transactions of batch_size rows, so only one batch is held in memory.
+
+    Returns:
+        int: The number of rows inserted.
+    """
+    rows  = iter(rows)
+    total = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return total
+        with conn:  # one transaction per batch
+            conn.executemany(statement, batch)
+        total += len(batch)
+
+def populate(conn, n_employees = 7, years = (2010, 2023), seed = None, departments = None, districts = None,
+             overpaid_share = 0.02, fast = False, batch_size = 100_000):
+    """
+    Creates the schema and fills it with synthetic employees, salaries and reference salaries.
+
+    The employees are generated twice from the same seed (once for tb_employee, once for the salaries)
+    instead of being kept in memory, so the memory use does not grow with the number of rows.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database.
+        n_employees (int): Number of employees, see generate_employees.
+        years (tuple): Inclusive (first_year, last_year) range of the salaries and reference salaries.
+        seed (int): Seed for reproducible data, None for different data on every run.
+        departments, districts, overpaid_share: Distribution of the generated employees, see generate_employees.
+        fast (bool): Generate the salaries with NumPy, see generate_salaries.
+        batch_size (int): Rows per transaction.
+
+    Returns:
+        dict: Number of rows inserted in every table.
+    """
+    if n_employees < 1:
+        raise ValueError("n_employees must be at least 1.")
+    if years[0] > years[1]:
+        raise ValueError("The first year must not be after the last year.")
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+
+    create_schema(conn)
+    # the data is regenerated on failure, so durability during the load is not needed
+    conn.execute("PRAGMA synchronous=OFF")
+
+    def employees():
+        return generate_employees(n_employees, seed, departments, districts, overpaid_share)
+
+    counts = {
+        'tb_employee':         insert_batches(conn, INSERT_EMPLOYEE, (row for row, _ in employees()), batch_size),
+        'tb_salary':           insert_batches(conn, INSERT_SALARY,
+                                              generate_salaries(((row[0], overpaid) for row, overpaid in employees()),
+                                                                years, seed, fast), batch_size),
+        'tb_reference_salary': insert_batches(conn, INSERT_REFERENCE, generate_reference_salaries(years), batch_size),
+    }
+    conn.execute("PRAGMA synchronous=FULL")
+    return counts
 
-cursor.executemany("INSERT INTO tb_reference_salary VALUES (?, ?, ?, ?)", reference_salaries)
+def main():
+    parser = argparse.ArgumentParser(description="Generate the synthetic salary database.")
+    parser.add_argument("--db", default="company_db.sqlite", help="SQLite database file (default: company_db.sqlite)")
+    parser.add_argument("--employees", type=int, default=7, help="number of employees, the first 7 are the samples (default: 7)")
+    parser.add_argument("--years", type=int, nargs=2, default=(2010, 2023), metavar=("FIRST", "LAST"), help="year range (default: 2010 2023)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible data")
+    parser.add_argument("--overpaid-share", type=float, default=0.02, help="share of generated employees paid above the reference maximum")
+    parser.add_argument("--batch-size", type=int, default=100_000, help="rows per transaction (default: 100000)")
+    parser.add_argument("--fast", action="store_true", help="generate the salaries with NumPy")
+    args = parser.parse_args()
 
-conn.commit()
-conn.close()
+    # connect to SQLite
+    conn  = sqlite3.connect(args.db)
+    start = time.perf_counter()
+    counts = populate(conn, args.employees, tuple(args.years), args.seed, overpaid_share=args.overpaid_share,
+                      fast=args.fast, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    conn.close()
 
-print(f"Inserted {len(employees)} employees")
-print(f"Inserted {len(salaries)} salary records")
-print(f"Inserted {len(reference_salaries)} reference salary records")
-print("Database setup complete!")
+    print(f"Inserted {counts['tb_employee']} employees")
+    print(f"Inserted {counts['tb_salary']} salary records")
+    print(f"Inserted {counts['tb_reference_salary']} reference salary records")
+    print(f"Database setup complete in {elapsed:.2f} s ({counts['tb_salary'] / elapsed:.0f} salary rows/sec)!")
 
+if __name__ == "__main__":
+    main()
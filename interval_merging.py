@@ -1,66 +1,483 @@
 import sys
 import ast
+import csv
+import heapq
+import os
+import struct
+import tempfile
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from operator import itemgetter
 
-def merge_intervals(intervals):
+from backends import np, use_numpy, as_numeric_array
+
+def merge_intervals(intervals, backend = "auto"):
     """
     Merges overlapping intervals in a list.
 
     Args:
-        intervals (List[List[int]] or List[Tuple[int, int]]): 
-            A list of intervals, where each interval is a pair [start, end] or (start, end).
+        intervals (List[List[int]] or List[Tuple[int, int]] or np.ndarray): 
+            A list of intervals, where each interval is a pair [start, end] or (start, end),
+            or an array of shape (n, 2).
+        backend (str): "auto" (NumPy for ndarray inputs), "numpy" or "python", see backends.use_numpy.
 
     Returns:
-        List[List[int]] or List[Tuple[int, int]]: 
+        List[List[int]] or List[Tuple[int, int]] or np.ndarray: 
             A list of merged intervals, where overlapping intervals are combined.
+            An ndarray of shape (m, 2) if the input was an ndarray.
+
+    The input list is not modified, use IntervalSet directly to keep adding intervals afterwards.
 
     Time Complexity: O(n log n) due to sorting.
     Space Complexity: O(n) in the worst case (if no intervals merge).
     """
 
+    if use_numpy(backend, intervals):
+        merged = _merge_intervals_numpy(intervals)
+        return merged if isinstance(intervals, np.ndarray) else merged.tolist()
+
     # if the input list is empty, return an empty list
     if not intervals:
         return []
 
+    # bulk load into an interval set, the caller's list is left untouched
+    return IntervalSet(intervals).to_list()
+
+def _check_interval(interval):
+    """
+    Validates one interval and returns its (start, end) pair.
+    """
     # if each interval is a valid list or tuple of two elements
-    for interval in intervals:
-        if not isinstance(interval, (list, tuple)) or len(interval) != 2:
-            raise ValueError("Each interval must have two elements.")
-        
-        start, end = interval
-        # if both start and end are integers or floats
-        if not all(isinstance(x, (int, float)) for x in interval):
-            raise ValueError("All elements in the arrays must be integers or floats.")
-        
-        # if the start value is greater than the end value
-        if start > end:
-            raise ValueError("Start value cannot be greater than end value.")
-        
-    # sort the intervals based on the start value 
-    intervals.sort(key = lambda x: x[0])
-
-    # final list with the start value of the first interval aka the lowest boundary
-    final = [intervals[0]]
-
-    for start, end in intervals[1:]:
-        # last interval in the final list
-        last_start, last_end = final[-1]
-
-        # if the current interval overlaps with the last final interval
-        if start <= last_end:
-            # merge overlapping intervals by updating the last interval end
-            # new end value is the max of the current interval end and the last final interval 
-            final[-1] = [last_start, max(last_end, end)]
+    if not isinstance(interval, (list, tuple)) or len(interval) != 2:
+        raise ValueError("Each interval must have two elements.")
+
+    start, end = interval
+    # if both start and end are integers or floats
+    if not all(isinstance(x, (int, float)) for x in interval):
+        raise ValueError("All elements in the arrays must be integers or floats.")
+
+    # if the start value is greater than the end value
+    if start > end:
+        raise ValueError("Start value cannot be greater than end value.")
+
+    # bools and NumPy scalars become the plain int or float they stand for, so spilled runs read back the same values
+    return (int(start) if isinstance(start, int) else float(start)), (int(end) if isinstance(end, int) else float(end))
+
+def _sweep(intervals):
+    """
+    Merges intervals that are already sorted by start value, yielding each merged [start, end] once it is complete.
+
+    Time Complexity: O(n).
+    Space Complexity: O(1), only the interval being built is kept.
+    """
+    current = None
+    for start, end in intervals:
+        if current is None:
+            current = [start, end]
+        # if the current interval overlaps with the interval being built
+        elif start <= current[1]:
+            # new end value is the max of the current interval end and the end being built
+            current[1] = max(current[1], end)
         else:
-            # if no overlap add the interval in the final list
-            final.append([start, end])
+            # if no overlap the interval being built is final
+            yield current
+            current = [start, end]
+
+    if current is not None:
+        yield current
+
+class IntervalSet:
+    """
+    A set of closed intervals kept merged, supporting incremental updates.
+
+    The merged intervals are stored as two parallel sorted lists of starts and ends, so the intervals touched
+    by an update or a query are found with bisect. Touching intervals ([1, 3] and [3, 5]) are merged like in merge_intervals.
+
+    Args:
+        intervals (List[List[int]] or List[Tuple[int, int]]): Optional intervals to bulk load.
+
+    Time Complexity:
+        - bulk load: O(n log n) due to sorting.
+        - add, remove and overlaps: O(log n + k), where k is the number of merged intervals touched
+          (plus a memmove of the list tails when they change size).
+        - point membership: O(log n).
+    Space Complexity: O(m), where m is the number of merged intervals.
+    """
+
+    __slots__ = ("_starts", "_ends")
+
+    def __init__(self, intervals = None):
+        self._starts = []
+        self._ends   = []
+
+        if intervals:
+            pairs = sorted((_check_interval(interval) for interval in intervals), key = lambda x: x[0])
+            for start, end in _sweep(pairs):
+                self._starts.append(start)
+                self._ends.append(end)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        for start, end in zip(self._starts, self._ends):
+            yield [start, end]
+
+    def __contains__(self, point):
+        # the last interval starting at or before the point is the only one that can contain it
+        i = bisect_right(self._starts, point) - 1
+        return i >= 0 and self._ends[i] >= point
+
+    def __repr__(self):
+        return f"IntervalSet({self.to_list()})"
+
+    def to_list(self):
+        """
+        Returns the merged intervals as a list of [start, end] lists.
+        """
+        return list(self)
+
+    def add(self, start, end):
+        """
+        Adds the interval [start, end], merging it with every interval it overlaps or touches.
+        """
+        start, end = _check_interval((start, end))
+
+        # merged intervals from i to j - 1 end at or after the start and begin at or before the end
+        i = bisect_left(self._ends, start)
+        j = bisect_right(self._starts, end)
+        if i < j:
+            start = min(start, self._starts[i])
+            end   = max(end, self._ends[j - 1])
+
+        self._starts[i:j] = [start]
+        self._ends[i:j]   = [end]
+
+    def remove(self, start, end):
+        """
+        Removes the open range (start, end) from the set.
+
+        The cut points stay as the boundaries of what is left, so removing (10, 12) from [8, 14]
+        leaves [8, 10] and [12, 14], like a booking freed between two others. Leftovers of zero length are dropped.
+        """
+        start, end = _check_interval((start, end))
+        if start == end:
+            return
+
+        # merged intervals from i to j - 1 overlap the open range
+        i = bisect_right(self._ends, start)
+        j = bisect_left(self._starts, end)
+        if i >= j:
+            return
+
+        starts, ends = [], []
+        # keep the part of the first interval before the range
+        if self._starts[i] < start:
+            starts.append(self._starts[i])
+            ends.append(start)
+        # keep the part of the last interval after the range
+        if self._ends[j - 1] > end:
+            starts.append(end)
+            ends.append(self._ends[j - 1])
+
+        self._starts[i:j] = starts
+        self._ends[i:j]   = ends
+
+    def overlaps(self, start, end):
+        """
+        Returns the merged intervals that overlap or touch [start, end].
+        """
+        start, end = _check_interval((start, end))
+        i = bisect_left(self._ends, start)
+        j = bisect_right(self._starts, end)
+        return [[self._starts[k], self._ends[k]] for k in range(i, j)]
+
+def _merge_intervals_numpy(intervals):
+    """
+    Merges overlapping intervals with an argsort and a np.maximum.accumulate sweep.
+
+    After sorting by start, the running maximum of the ends is the end of the interval being built,
+    so a new merged interval begins wherever a start is past the running maximum of all previous ends.
+    """
+    intervals = as_numeric_array(intervals, "All elements in the arrays must be integers or floats.")
+
+    if intervals.size == 0:
+        return intervals.reshape(0, 2)
+
+    # the array must be a list of pairs
+    if intervals.ndim != 2 or intervals.shape[1] != 2:
+        raise ValueError("Each interval must have two elements.")
+
+    if np.any(intervals[:, 0] > intervals[:, 1]):
+        raise ValueError("Start value cannot be greater than end value.")
+
+    # sort the intervals based on the start value
+    order  = np.argsort(intervals[:, 0], kind="stable")
+    starts = intervals[order, 0]
+    reach  = np.maximum.accumulate(intervals[order, 1])
+
+    # a group starts at the first interval and wherever the start is past the reach of every previous interval
+    first = np.flatnonzero(np.concatenate(([True], starts[1:] > reach[:-1])))
+    last  = np.concatenate((first[1:] - 1, [starts.size - 1]))
+
+    return np.column_stack((starts[first], reach[last]))
+
+def _merge_shard(shard):
+    """
+    Merges one shard of intervals in a worker process.
+    """
+    if np is not None and isinstance(shard, np.ndarray):
+        return _merge_intervals_numpy(shard)
+    return IntervalSet(shard).to_list()
+
+def merge_intervals_parallel(intervals, workers = None, shards = None, executor = None):
+    """
+    Merges overlapping intervals by splitting the work across processes.
+
+    The input (sorted or not) is cut into contiguous shards. Each worker validates, sorts and merges its shard,
+    and the merged shards are stitched: a k-way merge by start value followed by the usual sweep, which only
+    touches the already merged intervals. The result is identical to merge_intervals.
+
+    Args:
+        intervals (List[List[int]] or np.ndarray): Intervals as in merge_intervals, an ndarray of shape (n, 2) is
+                                                   sent to the workers as one block per shard and merged with NumPy.
+        workers (int): Number of processes, os.cpu_count() by default.
+        shards (int): Number of shards, one per worker by default.
+        executor (concurrent.futures.Executor): Optional pool to reuse across calls.
+
+    Returns:
+        List[List[int]] or np.ndarray: The merged intervals, an ndarray if the input was an ndarray.
+
+    Time Complexity: O((n / p) log(n / p)) per worker plus O(m log p) for the stitching, for p shards and m merged intervals.
+    Space Complexity: O(n) for the shards sent to the workers.
+    """
+    workers = workers or os.cpu_count() or 1
+    shards  = shards or workers
+    is_array = np is not None and isinstance(intervals, np.ndarray)
 
-    return final
+    # not worth the process start-up and pickling, run the serial path
+    if shards == 1 or len(intervals) < 2 * shards:
+        return merge_intervals(intervals)
+
+    size  = -(-len(intervals) // shards)  # ceiling division
+    parts = [intervals[i:i + size] for i in range(0, len(intervals), size)]
+
+    if executor is None:
+        with ProcessPoolExecutor(max_workers = workers) as pool:
+            merged = list(pool.map(_merge_shard, parts))
+    else:
+        merged = list(executor.map(_merge_shard, parts))
+
+    if is_array:
+        return _merge_intervals_numpy(np.concatenate(merged))
+
+    # each shard is sorted and merged, only the boundaries between shards can still overlap
+    return list(_sweep(heapq.merge(*merged, key = itemgetter(0))))
+
+_PAIR = struct.Struct("<dd")  # binary interval files are little-endian float64 (start, end) pairs
+
+def _parse_number(text):
+    """
+    Parses an integer or float from text, keeping integers as int.
+    """
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+def read_intervals(path, fmt = "csv"):
+    """
+    Lazily reads intervals from a file.
+
+    Args:
+        path (str): File to read.
+        fmt (str): "csv" for one start,end pair per line (a non-numeric header line is skipped),
+                   or "binary" for packed little-endian float64 pairs.
+
+    Yields:
+        Tuple[float, float]: One (start, end) pair at a time.
+    """
+    if fmt == "binary":
+        with open(path, "rb") as file:
+            while True:
+                block = file.read(_PAIR.size * 4096)
+                if not block:
+                    break
+                if len(block) % _PAIR.size:
+                    raise ValueError("Binary interval file is truncated.")
+                yield from _PAIR.iter_unpack(block)
+
+    elif fmt == "csv":
+        with open(path, newline = "") as file:
+            for line_number, row in enumerate(csv.reader(file)):
+                if not row:
+                    continue
+                try:
+                    yield _parse_number(row[0]), _parse_number(row[1])
+                except (ValueError, IndexError):
+                    # only the first line may be a header
+                    if line_number:
+                        raise ValueError(f"Invalid interval on line {line_number + 1}: {row}") from None
+
+    else:
+        raise ValueError(f"Unknown interval file format: {fmt!r}.")
+
+def write_intervals(path, intervals, fmt = "csv"):
+    """
+    Writes intervals to a file as they are produced.
+
+    Args:
+        path (str): File to write.
+        intervals (Iterable[Tuple[float, float]]): Intervals to write, consumed once.
+        fmt (str): "csv" or "binary", see read_intervals.
+
+    Returns:
+        int: The number of intervals written.
+    """
+    count = 0
+    if fmt == "binary":
+        with open(path, "wb") as file:
+            for start, end in intervals:
+                file.write(_PAIR.pack(start, end))
+                count += 1
+
+    elif fmt == "csv":
+        with open(path, "w", newline = "") as file:
+            writer = csv.writer(file)
+            for interval in intervals:
+                writer.writerow(interval)
+                count += 1
+
+    else:
+        raise ValueError(f"Unknown interval file format: {fmt!r}.")
+
+    return count
+
+def _spill(run, directory):
+    """
+    Writes a sorted run of intervals to a temporary file and returns its path.
+    """
+    descriptor, path = tempfile.mkstemp(suffix = ".run", dir = directory)
+    with os.fdopen(descriptor, "w", newline = "") as file:
+        # repr keeps integers as integers when the run is read back
+        file.writelines(f"{start!r},{end!r}\n" for start, end in run)
+    return path
+
+def _read_run(path):
+    """
+    Lazily reads a run written by _spill.
+    """
+    with open(path) as file:
+        for line in file:
+            start, end = line.split(",")
+            yield _parse_number(start), _parse_number(end)
+
+def external_sort_intervals(intervals, chunk_size = 1_000_000, fan_in = 64, tmp_dir = None):
+    """
+    Sorts a stream of intervals by start value with at most chunk_size intervals in memory.
+
+    The stream is cut into chunks that are validated, sorted and spilled to temporary files (runs).
+    The runs are then combined with a heap-based k-way merge, at most fan_in files at a time,
+    with extra merge passes when there are more runs than that.
+
+    Args:
+        intervals (Iterable): Intervals as [start, end] or (start, end) pairs, consumed once, or an (n, 2) ndarray.
+        chunk_size (int): Maximum number of intervals held in memory while sorting.
+        fan_in (int): Maximum number of runs open at the same time during a merge.
+        tmp_dir (str): Directory for the runs, the system temp directory by default.
+
+    Yields:
+        Tuple[float, float]: The intervals sorted by start value.
+
+    Time Complexity: O(n log n), with O(n log_f(n / c)) extra disk I/O for f = fan_in and c = chunk_size.
+    Space Complexity: O(c + f) memory.
+    """
+    if chunk_size < 1 or fan_in < 2:
+        raise ValueError("chunk_size must be at least 1 and fan_in at least 2.")
+
+    if np is not None and isinstance(intervals, np.ndarray):
+        # rows of an ndarray become lists of python numbers, one chunk at a time
+        array     = intervals
+        intervals = (row for i in range(0, len(array), chunk_size) for row in array[i:i + chunk_size].tolist())
+
+    stream = (_check_interval(interval) for interval in intervals)
+    first  = sorted(islice(stream, chunk_size), key = itemgetter(0))
+    peek   = list(islice(stream, 1))
+
+    # everything fits in one chunk, no need to touch the disk
+    if not peek:
+        yield from first
+        return
+
+    with tempfile.TemporaryDirectory(dir = tmp_dir) as directory:
+        runs  = [_spill(first, directory)]
+        chunk = peek
+        del first
+        while True:
+            chunk.extend(islice(stream, chunk_size - len(chunk)))
+            if not chunk:
+                break
+            chunk.sort(key = itemgetter(0))
+            runs.append(_spill(chunk, directory))
+            chunk = []
+
+        # merge groups of runs into bigger runs until a single merge can produce the output
+        while len(runs) > fan_in:
+            merged = []
+            for i in range(0, len(runs), fan_in):
+                group = runs[i:i + fan_in]
+                merged.append(_spill(heapq.merge(*map(_read_run, group), key = itemgetter(0)), directory))
+                for path in group:
+                    os.remove(path)
+            runs = merged
+
+        yield from heapq.merge(*map(_read_run, runs), key = itemgetter(0))
+
+def iter_merge_intervals(intervals, chunk_size = 1_000_000, fan_in = 64, tmp_dir = None):
+    """
+    Merges a stream of intervals that may not fit in memory, yielding each merged interval once it is complete.
+
+    Pipeline: external sort of spilled chunks, heap-based k-way merge of the runs, then the same sweep as merge_intervals.
+    See external_sort_intervals for the arguments.
+
+    Yields:
+        List[float]: The merged [start, end] intervals in ascending order.
+    """
+    yield from _sweep(external_sort_intervals(intervals, chunk_size, fan_in, tmp_dir))
+
+def merge_interval_file(source, destination, chunk_size = 1_000_000, fan_in = 64,
+                        source_fmt = "csv", destination_fmt = "csv", tmp_dir = None):
+    """
+    Merges the intervals of a file larger than memory into another file.
+
+    Args:
+        source (str): Input file, see read_intervals for the formats.
+        destination (str): Output file, written as a stream.
+        chunk_size, fan_in, tmp_dir: See external_sort_intervals, they bound the memory used.
+        source_fmt, destination_fmt (str): "csv" or "binary".
+
+    Returns:
+        int: The number of merged intervals written.
+    """
+    intervals = read_intervals(source, source_fmt)
+    merged    = iter_merge_intervals(intervals, chunk_size, fan_in, tmp_dir)
+    return write_intervals(destination, merged, destination_fmt)
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Please provide a list of intervals as an argument.")
         sys.exit(1)
     
+    # merge a file of intervals into another one: python interval_merging.py --file input.csv output.csv
+    if sys.argv[1] == "--file":
+        if len(sys.argv) != 4:
+            print("Please provide an input and an output file.")
+            sys.exit(1)
+        count = merge_interval_file(sys.argv[2], sys.argv[3])
+        print(f"Wrote {count} merged intervals to {sys.argv[3]}")
+        sys.exit(0)
+
     try:
         input_intervals = ast.literal_eval(sys.argv[1])  # parse the input string as a list
         if not isinstance(input_intervals, list):
@@ -0,0 +1,136 @@
+import argparse
+import os
+import sqlite3
+import time
+from itertools import islice
+
+from data_cleaning import COLUMN_NAMES, DATA_FILE, IMPORTS85_SPEC, CleaningPipeline, load_imports85
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "create_database.sql")
+
+# the cars table uses the imports-85 names with underscores
+CARS_COLUMNS = [column.replace('-', '_') for column in COLUMN_NAMES]
+
+INSERT_CARS = f"INSERT INTO cars ({', '.join(CARS_COLUMNS)}) VALUES ({', '.join('?' * len(CARS_COLUMNS))})"
+
+# indexes for the usual lookups (name -> column), dropped before a load and created once the rows are in
+# so the load does not maintain them row by row
+CARS_INDEXES = {
+    'idx_cars_make':       'make',
+    'idx_cars_body_style': 'body_style',
+    'idx_cars_price':      'price',
+}
+
+# load phase settings: WAL journal, no fsync per transaction, a 256 MiB page cache and in-memory temp storage
+# (only the journal mode is stored in the database, the others end with the loading connection)
+LOAD_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA cache_size=-262144",
+    "PRAGMA temp_store=MEMORY",
+]
+
+def create_schema(conn, schema_file = SCHEMA_FILE):
+    """
+    Create the cars table with the CREATE statements of create_database.sql (its example INSERTs are skipped).
+    """
+    with open(schema_file) as file:
+        statements = file.read().split(';')
+    for statement in statements:
+        # drop the comment lines so the statement starts with its keyword
+        statement = "\n".join(line for line in statement.splitlines() if not line.strip().startswith('--')).strip()
+        if statement.upper().startswith('CREATE'):
+            conn.execute(statement)
+
+def iter_car_rows(data_file = DATA_FILE, pipeline = None, chunksize = 100_000, repeat = 1):
+    """
+    Stream the cleaned rows of a file with the imports-85 schema as tuples ready for executemany.
+
+    Args:
+        data_file (str): File with the imports-85 schema.
+        pipeline (CleaningPipeline): Fitted pipeline used to clean every chunk. If None, a pipeline with
+                                     IMPORTS85_SPEC is fitted on the first chunk (the whole file when it fits in one).
+        chunksize (int): Number of rows parsed at a time.
+        repeat (int): Number of times every cleaned chunk is yielded, to generate millions of synthetic rows
+                      from a small file. Chunks are parsed and cleaned once, not once per repeat.
+
+    Yields:
+        tuple: One row in CARS_COLUMNS order.
+    """
+    for chunk in load_imports85(data_file, chunksize=chunksize):
+        if pipeline is None:
+            pipeline = CleaningPipeline(IMPORTS85_SPEC).fit(chunk)
+        rows = list(pipeline.transform(chunk).itertuples(index=False, name=None))
+        for _ in range(repeat):
+            yield from rows
+
+def bulk_load(db_path, data_file = DATA_FILE, batch_size = 50_000, repeat = 1, pipeline = None, append = False):
+    """
+    Load the cleaned imports-85 rows into the cars table.
+
+    The table is emptied first (unless append is True) so running the load again does not duplicate the rows.
+    Rows are streamed in batches of batch_size, each batch inserted with one executemany (a single prepared
+    statement reused for every row) inside its own transaction. The indexes are dropped before the load
+    and created after it.
+
+    Args:
+        db_path (str): SQLite database file.
+        data_file (str): File with the imports-85 schema.
+        batch_size (int): Rows per transaction.
+        repeat (int): Number of times the file is loaded, see iter_car_rows.
+        pipeline (CleaningPipeline): Optional fitted pipeline, see iter_car_rows.
+        append (bool): Keep the rows already in the table and add the new ones after them.
+
+    Returns:
+        dict: The rows inserted, the elapsed seconds and the rows/sec.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)  # autocommit, transactions are explicit
+    try:
+        for pragma in LOAD_PRAGMAS:
+            conn.execute(pragma)
+        create_schema(conn)
+
+        rows  = iter_car_rows(data_file, pipeline, repeat=repeat)
+        total = 0
+        start = time.perf_counter()
+
+        # indexes left by a previous load would be updated on every insert
+        conn.execute("BEGIN")
+        for index in CARS_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {index}")
+        if not append:
+            conn.execute("DELETE FROM cars")  # SQLite truncates a table deleted without WHERE
+        conn.execute("COMMIT")
+
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            conn.execute("BEGIN")
+            conn.executemany(INSERT_CARS, batch)
+            conn.execute("COMMIT")
+            total += len(batch)
+
+        for index, column in CARS_INDEXES.items():
+            conn.execute(f"CREATE INDEX {index} ON cars({column})")
+        conn.execute("ANALYZE cars")
+        elapsed = time.perf_counter() - start
+    finally:
+        conn.close()
+
+    return {'rows': total, 'seconds': elapsed, 'rows_per_sec': total / elapsed if elapsed else float('inf')}
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load the cleaned imports-85 data into the SQLite cars table.")
+    parser.add_argument("--db", default="cars.sqlite", help="SQLite database file (default: cars.sqlite)")
+    parser.add_argument("--data", default=DATA_FILE, help="file with the imports-85 schema (default: data/imports-85.data)")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="rows per transaction (default: 50000)")
+    parser.add_argument("--repeat", type=int, default=1, help="load the file this many times to generate synthetic rows")
+    parser.add_argument("--append", action="store_true", help="keep the rows already in the table")
+    args = parser.parse_args()
+
+    result = bulk_load(args.db, args.data, args.batch_size, args.repeat, append=args.append)
+    print(f"Inserted {result['rows']} rows in {result['seconds']:.2f} s ({result['rows_per_sec']:.0f} rows/sec)")
+
+if __name__ == "__main__":
+    main()
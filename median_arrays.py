@@ -1,40 +1,489 @@
 import sys
 import ast
+import heapq
+import math
+import operator
+import random
+from itertools import islice
 
-def median_number_array(*arrays):
+from backends import np, use_numpy, as_numeric_array
+
+def median_number_array(*arrays, presorted = None, backend = "auto"):
     """
     Computes the median of multiple numeric arrays combined.
     This function does not use built-in median (from statistics) or chain (from itertools) to explicitly demonstrate sorting and median logic.
 
-    Time Complexity: O(n log n) due to sorting.
-    Space Complexity: O(n) since all values are stored in a list.
+    Args:
+        *arrays: Lists of integers or floats.
+        presorted (bool or None):
+            - None:  detects whether every array is sorted in ascending order and, if so, uses the merge-based selection.
+            - True:  trusts that every array is sorted and skips the linear validation scan.
+            - False: always combines the arrays and uses selection.
+        backend (str): "auto" (NumPy for ndarray inputs), "numpy" or "python", see backends.use_numpy.
+
+    Time Complexity: O(n) on average, the middle values are found with introselect instead of a full sort.
+                     O(K log K log n) for K sorted arrays, without combining them.
+    Space Complexity: O(n) since all values are stored in a list, O(K) for sorted arrays.
     """
-    
-    # creates empty list to store all numbers in the arrays
-    numbers = []
 
-    # checks if all elements in the arrays are integers or floats
+    if use_numpy(backend, *arrays):
+        return _median_numpy(arrays)
+
+    if presorted:
+        return _median_of_sorted(arrays)
+
+    # checks if all elements in the arrays are integers or floats, and whether every array is sorted
+    all_sorted = presorted is None
     for array in arrays:
         if not all( isinstance(x, (int, float)) for x in array):
             raise ValueError("All elements in the arrays must be integers or floats.")
-        
+
+        # the merge-based path only pays off while every array is sorted
+        if all_sorted:
+            all_sorted = _is_sorted(array)
+
+    # sorted arrays are passed as they are, the values are only combined for the selection path
+    if all_sorted and any(len(array) for array in arrays):
+        return _median_of_sorted(arrays)
+
+    # creates empty list to store all numbers in the arrays
+    numbers = []
+    for array in arrays:
         # extends the list of numbers with the values in each array
         numbers.extend(array)
 
+    return _median_of_list(numbers)
+
+def _median_of_list(numbers):
+    """
+    Returns the median of an unsorted list of numbers using selection.
+    """
     # if numbers list is empty raise an error
     if not numbers:
         raise ValueError("The input arrays contain no valid numbers.")
 
-    # sorts all values in ascending order
-    numbers.sort()
-    
     # n is the number of values in the list
     n = len(numbers)
 
     if n % 2 == 1:  # if number of values is odd, the median is the middle value
-        return numbers[n // 2]
+        return _select(numbers, n // 2)
     else:           # if number of values is even,the median is the average of the two middle values
-        return (numbers[n // 2 - 1] + numbers[n // 2]) / 2
+        return (_select(numbers, n // 2 - 1) + _select(numbers, n // 2)) / 2
+
+def _median_numpy(arrays):
+    """
+    Returns the median of the arrays combined using np.partition, validated with a single dtype check per array.
+    """
+    message = "All elements in the arrays must be integers or floats."
+    numbers = [as_numeric_array(array, message).ravel() for array in arrays]
+    numbers = np.concatenate(numbers) if numbers else np.empty(0)
+
+    if not numbers.size:
+        raise ValueError("The input arrays contain no valid numbers.")
+
+    n = numbers.size
+    if n % 2 == 1:
+        return np.partition(numbers, n // 2)[n // 2].item()
+
+    # one partition call places both middle values
+    low, high = np.partition(numbers, [n // 2 - 1, n // 2])[n // 2 - 1:n // 2 + 1].tolist()
+    return (low + high) / 2
+
+def _check_number(x):
+    """
+    Raises a ValueError if x is not an integer or a float.
+    """
+    if not isinstance(x, (int, float)):
+        raise ValueError("All elements in the arrays must be integers or floats.")
+    return x
+
+def _select(values, k):
+    """
+    Returns the k-th smallest value (0-based) of a list without sorting all of it.
+
+    Introselect: quickselect with a median-of-three random pivot and a three-way partition,
+    falling back to sorting once the recursion budget is spent so the worst case stays O(n log n).
+    The input list is not modified.
+
+    Time Complexity: O(n) on average, O(n log n) in the worst case.
+    Space Complexity: O(n) for the partitions.
+    """
+    # recursion budget of about 2 * log2(n) partition rounds before falling back to sorting
+    depth = 2 * len(values).bit_length()
+
+    while True:
+        if len(values) <= 32 or depth == 0:
+            return sorted(values)[k]
+        depth -= 1
+
+        # median of three random samples is a cheap pivot that avoids sorted input worst cases
+        pivot = sorted(random.sample(values, 3))[1]
+
+        lows = [x for x in values if x < pivot]
+        if k < len(lows):
+            values = lows
+            continue
+
+        highs   = [x for x in values if x > pivot]
+        n_equal = len(values) - len(lows) - len(highs)
+        if k < len(lows) + n_equal:
+            return pivot
+
+        # the k-th value is on the high side, skip everything lower or equal to the pivot
+        k     -= len(lows) + n_equal
+        values = highs
+
+def _is_sorted(array):
+    """
+    Returns True if the array is sorted in ascending order.
+    """
+    return all(map(operator.le, array, islice(array, 1, None)))
+
+def _kth_sorted(arrays, k, offsets = None):
+    """
+    Returns the k-th smallest value (0-based) across sorted arrays without combining them.
+
+    Works in phases with a fixed block size s = r // (2K), where r is the number of values still to skip over
+    and K the number of non-exhausted arrays. A heap holds the last value of the next block of every array;
+    the block with the smallest of those probes can be dropped as long as K * s <= r, since at most K * s values
+    are smaller or equal to that probe. About K blocks are dropped per phase and r halves, so there are
+    O(log n) phases of O(K log K) heap operations.
+
+    Args:
+        arrays (List[List[float]]): Arrays sorted in ascending order.
+        k (int): 0-based rank across all the arrays.
+        offsets (List[int] or None): Number of values already dropped from the front of each array, updated in place.
+                                     The dropped values are always the smallest ones, so a call for a larger k
+                                     can resume from the offsets left by a previous call instead of starting over.
+
+    Time Complexity: O(K log K log n), where K is the number of arrays.
+    Space Complexity: O(K) for the offsets and the heap.
+    """
+    if offsets is None:
+        offsets = [0] * len(arrays)
+    rank = k + 1 - sum(offsets)  # number of values up to and including the k-th value, after the dropped ones
+
+    if not 0 <= k < sum(len(array) for array in arrays) or rank < 1:
+        raise ValueError("k is out of range for the input arrays.")
+
+    def probe(i, step):
+        # last value of the next block of array i, shorter at the end of the array
+        return _check_number(arrays[i][min(offsets[i] + step, len(arrays[i])) - 1])
+
+    while True:
+        active = [i for i, array in enumerate(arrays) if offsets[i] < len(array)]
+
+        # with one array left the answer is a direct index
+        if len(active) == 1:
+            i = active[0]
+            return _check_number(arrays[i][offsets[i] + rank - 1])
+
+        # the next value is simply the smallest head
+        if rank == 1:
+            return min(probe(i, 1) for i in active)
+
+        # with blocks of a single value the smallest head can always be dropped while rank > 1
+        step  = max(1, rank // (2 * len(active)))
+        limit = len(active) * step if step > 1 else 2
+        heap  = [(probe(i, step), i) for i in active]
+        heapq.heapify(heap)
+
+        while len(heap) > 1 and rank >= limit:
+            _, i = heapq.heappop(heap)
+            size = min(step, len(arrays[i]) - offsets[i])
+            offsets[i] += size
+            rank       -= size
+            if offsets[i] < len(arrays[i]):
+                heapq.heappush(heap, (probe(i, step), i))
+
+def _median_of_sorted(arrays):
+    """
+    Returns the median across sorted arrays using the merge-based selection.
+    """
+    n = sum(len(array) for array in arrays)
+    if not n:
+        raise ValueError("The input arrays contain no valid numbers.")
+
+    if n % 2 == 1:
+        return _kth_sorted(arrays, n // 2)
+
+    # the second middle value resumes from the offsets left by the first one
+    offsets = [0] * len(arrays)
+    low     = _kth_sorted(arrays, n // 2 - 1, offsets)
+    return (low + _kth_sorted(arrays, n // 2, offsets)) / 2
+
+def kth_smallest(arrays, k, presorted = True):
+    """
+    Returns the k-th smallest value across several arrays, without combining them.
+
+    Args:
+        arrays (List[List[float]]): Arrays of integers or floats, each sorted in ascending order.
+        k (int): 1-based rank, kth_smallest(arrays, 1) is the minimum.
+        presorted (bool): If False, each array is sorted on its own first (still no concatenation).
+
+    Returns:
+        int or float: The k-th smallest value.
+
+    Raises:
+        ValueError: If k is out of range or a probed value is not numeric.
+
+    Time Complexity: O(K log K log n) for K sorted arrays holding n values in total.
+    Space Complexity: O(K), plus O(n) when the arrays have to be sorted.
+    """
+    if not presorted:
+        arrays = [sorted(array) for array in arrays]
+    return _kth_sorted(arrays, k - 1)
+
+def quantiles(arrays, qs, presorted = True):
+    """
+    Computes several quantiles (for example p50, p95 and p99) across several arrays in one call.
+
+    Quantiles are linearly interpolated between the two closest ranks, like numpy's default method,
+    so quantiles(arrays, [0.5]) matches the median.
+
+    Args:
+        arrays (List[List[float]]): Arrays of integers or floats, each sorted in ascending order.
+        qs (List[float]): Quantiles between 0 and 1.
+        presorted (bool): If False, each array is sorted on its own once before all quantiles are computed.
+
+    Returns:
+        List[float]: One value per requested quantile, in the same order as qs.
+
+    The ranks are selected in ascending order and every selection resumes from the values dropped by the previous
+    one, so each quantile only pays for the distance from the previous rank instead of a full selection.
+
+    Time Complexity: O(q K log K log n) in the worst case for q quantiles over K sorted arrays, less when they are close.
+    Space Complexity: O(K + q), plus O(n) when the arrays have to be sorted.
+    """
+    if not presorted:
+        arrays = [sorted(array) for array in arrays]
+
+    n = sum(len(array) for array in arrays)
+    if not n:
+        raise ValueError("The input arrays contain no valid numbers.")
+
+    for q in qs:
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1.")
+
+    # every rank needed by the quantiles, with the next rank when the position falls between two values
+    positions = [q * (n - 1) for q in qs]
+    ranks     = sorted({rank for position in positions for rank in {int(position), math.ceil(position)}})
+
+    offsets = [0] * len(arrays)
+    values  = {rank: _kth_sorted(arrays, rank, offsets) for rank in ranks}
+
+    results = []
+    for position in positions:
+        low      = int(position)
+        fraction = position - low
+        value    = values[low]
+
+        # interpolate towards the next rank only when the position falls between two values
+        if fraction:
+            value = value * (1 - fraction) + values[low + 1] * fraction
+        results.append(value)
+
+    return results
+
+class StreamingMedian:
+    """
+    Exact running median of a stream of numbers using two heaps.
+
+    The lower half of the values is kept in a max-heap (stored negated) and the upper half in a min-heap,
+    with the lower half holding at most one extra value. The median is read from the heap tops.
+
+    Time Complexity: O(log n) per add, O(1) per median.
+    Space Complexity: O(n) since every value is kept.
+    """
+
+    def __init__(self):
+        self._low  = []  # max-heap of the lower half (negated values)
+        self._high = []  # min-heap of the upper half
+
+    def __len__(self):
+        return len(self._low) + len(self._high)
+
+    def add(self, x):
+        """
+        Adds a number to the stream.
+        """
+        _check_number(x)
+
+        # push into the lower half, then move its largest value to the upper half
+        heapq.heappush(self._high, -heapq.heappushpop(self._low, -x))
+
+        # rebalance so the lower half always holds the extra value
+        if len(self._high) > len(self._low):
+            heapq.heappush(self._low, -heapq.heappop(self._high))
+
+    def median(self):
+        """
+        Returns the median of the values added so far.
+        """
+        if not self._low:
+            raise ValueError("The input arrays contain no valid numbers.")
+
+        if len(self._low) > len(self._high):  # odd number of values
+            return -self._low[0]
+        return (-self._low[0] + self._high[0]) / 2
+
+class TDigest:
+    """
+    Approximate quantiles of a stream of numbers in bounded memory (merging t-digest).
+
+    Values are buffered and periodically compressed into weighted centroids. Centroids near the
+    tails are kept small and the ones near the median are allowed to grow, following the k1 scale function.
+
+    Args:
+        compression (float): Controls the accuracy/memory trade-off. At most about `compression` centroids are kept
+                             and the rank error of a quantile estimate is roughly proportional to 1 / compression.
+
+    Time Complexity: O(log c) amortized per add, O(c) per quantile, where c is the compression.
+    Space Complexity: O(c) independent of the number of values.
+    """
+
+    def __init__(self, compression = 100):
+        if compression < 10:
+            raise ValueError("Compression must be at least 10.")
+        self.compression = compression
+        self._centroids  = []    # list of (mean, weight) sorted by mean
+        self._buffer     = []    # values not yet merged into the centroids
+        self._count      = 0
+        self._min        = math.inf
+        self._max        = -math.inf
+
+    def __len__(self):
+        return self._count
+
+    def add(self, x):
+        """
+        Adds a number to the digest.
+        """
+        _check_number(x)
+        self._buffer.append(x)
+        self._count += 1
+        if x < self._min:
+            self._min = x
+        if x > self._max:
+            self._max = x
+
+        # the buffer is bounded by a multiple of the compression so memory never depends on the stream length
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def _q_limit(self, q):
+        """
+        Returns the largest quantile a centroid starting at quantile q may reach (k1 scale function).
+        """
+        scale = self.compression / (2 * math.pi)
+        k     = scale * math.asin(2 * q - 1) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(k / scale) + 1) / 2
+
+    def _compress(self):
+        """
+        Merges the buffered values into the centroids.
+        """
+        if not self._buffer:
+            return
+
+        points = sorted(self._centroids + [(x, 1) for x in self._buffer])
+        self._buffer = []
+
+        merged        = []
+        mean, weight  = points[0]
+        weight_before = 0                      # total weight of the centroids already closed
+        q_limit       = self._q_limit(0)
+
+        for point_mean, point_weight in points[1:]:
+            if (weight_before + weight + point_weight) / self._count <= q_limit:
+                # the point fits in the current centroid, update its weighted mean
+                weight += point_weight
+                mean   += (point_mean - mean) * point_weight / weight
+            else:
+                # close the current centroid and start a new one at this point
+                merged.append((mean, weight))
+                weight_before += weight
+                q_limit        = self._q_limit(weight_before / self._count)
+                mean, weight   = point_mean, point_weight
+
+        merged.append((mean, weight))
+        self._centroids = merged
+
+    def quantile(self, q):
+        """
+        Returns the estimated q-quantile (0 <= q <= 1) of the values added so far.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1.")
+        if not self._count:
+            raise ValueError("The input arrays contain no valid numbers.")
+
+        self._compress()
+        centroids = self._centroids
+        if len(centroids) == 1:
+            return centroids[0][0]
+
+        # each centroid's weight is centered on its mean, interpolate linearly between neighbouring centers
+        # with the exact minimum and maximum anchoring both tails
+        target      = q * self._count
+        prev_mean   = self._min
+        prev_center = 0
+        cumulative  = 0
+        for mean, weight in centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                fraction = (target - prev_center) / (center - prev_center)
+                return prev_mean + fraction * (mean - prev_mean)
+            prev_mean, prev_center = mean, center
+            cumulative += weight
+
+        fraction = (target - prev_center) / (self._count - prev_center) if self._count > prev_center else 1
+        return prev_mean + fraction * (self._max - prev_mean)
+
+    def median(self):
+        """
+        Returns the estimated median of the values added so far.
+        """
+        return self.quantile(0.5)
+
+def streaming_median(*iterables, method = "heap", compression = 100):
+    """
+    Computes the median of numbers coming from one or more iterables (lists, generators, file readers...).
+
+    Args:
+        *iterables: Iterables of integers or floats, consumed only once.
+        method (str):
+            - "heap":    exact, two-heap running median (StreamingMedian).
+            - "select":  exact, collects the values once and runs introselect, fastest when the data fits in memory.
+            - "tdigest": approximate, bounded memory (TDigest) with the accuracy set by `compression`.
+        compression (float): t-digest compression, only used by the "tdigest" method.
+
+    Returns:
+        float or int: The median of all values.
+
+    Raises:
+        ValueError: If there are no values, a value is not numeric or the method is unknown.
+
+    Time Complexity: O(n log n) for "heap", O(n) on average for "select", O(n log c) for "tdigest".
+    Space Complexity: O(n) for "heap" and "select", O(c) for "tdigest".
+    """
+    if method == "select":
+        return _median_of_list([_check_number(x) for iterable in iterables for x in iterable])
+
+    if method == "heap":
+        estimator = StreamingMedian()
+    elif method == "tdigest":
+        estimator = TDigest(compression)
+    else:
+        raise ValueError(f"Unknown median method: {method!r}.")
+
+    for iterable in iterables:
+        for x in iterable:
+            estimator.add(x)
+    return estimator.median()
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
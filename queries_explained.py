@@ -1,86 +1,336 @@
+import os
 import sqlite3
+from collections import namedtuple
+
 import pandas as pd
 
-def query_a(cursor):
-    query = """
-    WITH Recent_Salaries AS (                               -- Creates subquery to get the most recent salary for each employee                        
-        SELECT employee_id, MAX(month_id) AS recent_month   -- Gets the most recent month for each employee
-        FROM tb_salary
-        GROUP BY employee_id
-    ),
-    Overpaid_Employees AS (                                                         -- Creates subquery to get employees who are overpaid
-        SELECT s.employee_id, s.month_id, s.salary_value, r.maximum_ref_value       -- Gets the salary and maximum reference salary for each employee
-        FROM tb_salary s
-        JOIN tb_employee e ON s.employee_id = e.employee_id                                           -- Joins the salary and employee tables
-        JOIN tb_reference_salary r ON e.position = r.position                                         -- Joins the employee and reference salary tables
-        JOIN Recent_Salaries rs ON s.employee_id = rs.employee_id AND s.month_id = rs.recent_month    -- Joins the recent salary subquery
-        WHERE e.department = 'market_insights'                                     -- Filters for employees in the market_insights department in Plzen, Czech Republic
-        AND e.district = 'Plzen'
-        AND e.country = 'Czech Republic'
-        AND r.year = CAST(SUBSTR(s.month_id, 1, 4) AS INTEGER)                     -- Filters for the reference salary year matching the salary year
-        AND s.salary_value > r.maximum_ref_value
-    ),
-    Overpaid_Duration AS (                                      -- Creates subquery to get the number of months each employee has been overpaid
-        SELECT s.employee_id, COUNT(*) AS months_above_max      -- Counts the number of months each employee has been overpaid
-        FROM tb_salary s
-        JOIN tb_employee e ON s.employee_id = e.employee_id     -- Joins the salary and employee tables
-        JOIN tb_reference_salary r ON e.position = r.position   -- Joins the employee and reference salary tables
-        WHERE e.department = 'market_insights'                  -- Filters for employees in the market_insights department in Plzen, Czech Republic
-        AND e.district = 'Plzen'
-        AND e.country = 'Czech Republic'
-        AND r.year = CAST(SUBSTR(s.month_id, 1, 4) AS INTEGER)
-        AND s.salary_value > r.maximum_ref_value
-        GROUP BY s.employee_id                                  -- Groups the results by employee_id
-    )
-    SELECT o.employee_id, e.position, e.department, e.country, e.district,
-           o.salary_value, o.maximum_ref_value, o.month_id, d.months_above_max      -- Selects the columns to display in the final result
-    FROM Overpaid_Employees o                                                       -- Joins the subqueries created above
-    JOIN tb_employee e ON o.employee_id = e.employee_id
-    JOIN Overpaid_Duration d ON o.employee_id = d.employee_id
-    ORDER BY d.months_above_max DESC, o.salary_value - o.maximum_ref_value DESC;    -- BONUS: Orders the results by the number of months overpaid and the difference between salary and maximum reference salary
+# covering indexes for the joins and filters of query_a and query_b
+QUERY_INDEXES = {
+    'idx_salary_employee_month':  "CREATE INDEX IF NOT EXISTS idx_salary_employee_month ON tb_salary(employee_id, month_id, salary_value, year)",
+    'idx_employee_location':      "CREATE INDEX IF NOT EXISTS idx_employee_location ON tb_employee(department, district, country)",
+    'idx_reference_position_year': "CREATE INDEX IF NOT EXISTS idx_reference_position_year ON tb_reference_salary(position, year, maximum_ref_value)",
+    'idx_salary_year':             "CREATE INDEX IF NOT EXISTS idx_salary_year ON tb_salary(year, employee_id, month_id, salary_value)",
+}
+
+# materialized aggregates of tb_salary, kept up to date by refresh()
+SUMMARY_TABLES = {
+    # salary totals and overpaid months of every employee in every year
+    'tb_salary_year_summary': """
+        CREATE TABLE tb_salary_year_summary (
+            employee_id INTEGER,
+            year INTEGER,
+            total_salary REAL,
+            payments INTEGER,
+            overpaid_months INTEGER,
+            PRIMARY KEY(employee_id, year)
+        ) WITHOUT ROWID""",
+    # overpaid months of every employee and its most recent salary with the reference maximum of that month
+    'tb_employee_overpaid': """
+        CREATE TABLE tb_employee_overpaid (
+            employee_id INTEGER PRIMARY KEY,
+            months_above_max INTEGER,
+            month_id INTEGER,
+            salary_value REAL,
+            maximum_ref_value REAL
+        )""",
+}
+
+# tb_salary with a stored year column, ALTER TABLE can only add virtual generated columns so the table is rebuilt
+SALARY_TABLE = """
+CREATE TABLE tb_salary_new (
+    payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    month_id INTEGER,
+    employee_id INTEGER,
+    salary_value REAL,
+    year INTEGER GENERATED ALWAYS AS (month_id / 100) STORED,
+    FOREIGN KEY(employee_id) REFERENCES tb_employee(employee_id)
+)
+"""
+
+# raised instead of "no such table" errors once split_salaries(drop=True) moved the salaries out of the database
+PARTITIONED_MESSAGE = "tb_salary was moved to yearly partition files by salary_partitions.py, query it through SalaryPartitions."
+
+def _salaries_partitioned(conn):
+    # True when tb_salary is gone and the partition catalog of salary_partitions.py is there instead
+    tables = {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return 'tb_salary' not in tables and 'tb_salary_partition' in tables
+
+def migrate(conn):
+    """
+    Brings a database created by an older dummy_sql_data.py up to date: adds the stored year column to tb_salary,
+    creates the covering indexes of the queries and builds the summary tables. Running it again on an up to date
+    database does nothing.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database, without an open transaction.
+
+    Returns:
+        list: Names of the changes applied ('year', index names and/or 'summaries').
+
+    Raises:
+        ValueError: If the connection has an open transaction (it would be committed with the migration),
+                    or tb_salary was moved to yearly partitions (salary_partitions.split_salaries with drop=True).
+    """
+    if conn.in_transaction:
+        raise ValueError("Commit or roll back the open transaction before migrating.")
+    if _salaries_partitioned(conn):
+        raise ValueError(PARTITIONED_MESSAGE)
+
+    applied = []
+    conn.execute("BEGIN")  # the rebuild and the indexes are applied all together or not at all
+    try:
+        columns = [row[1] for row in conn.execute("PRAGMA table_xinfo(tb_salary)")]
+        if 'year' not in columns:
+            conn.execute(SALARY_TABLE)
+            conn.execute("""INSERT INTO tb_salary_new (payment_id, month_id, employee_id, salary_value)
+                            SELECT payment_id, month_id, employee_id, salary_value FROM tb_salary""")
+            conn.execute("DROP TABLE tb_salary")
+            conn.execute("ALTER TABLE tb_salary_new RENAME TO tb_salary")
+            applied.append('year')
+
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        for name, statement in QUERY_INDEXES.items():
+            if name not in existing:
+                conn.execute(statement)
+                applied.append(name)
+
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if not tables >= SUMMARY_TABLES.keys():
+            for name, statement in SUMMARY_TABLES.items():
+                conn.execute(f"DROP TABLE IF EXISTS {name}")
+                conn.execute(statement)
+            _refresh(conn, None)
+            applied.append('summaries')
+
+        # statistics so the planner picks the new indexes
+        if applied:
+            conn.execute("ANALYZE")
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return applied
+
+# recompute the summaries of the years >= :year, :full also clears the employees without salaries any more
+REFRESH_STATEMENTS = [
+    "DELETE FROM tb_salary_year_summary WHERE year >= :year",
     """
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    rows = [row[:-1] for row in rows]
-    return pd.DataFrame(rows, columns=["employee_id", "position", "department", "country", "district", "salary_value", "maximum_ref_value", "month_id"])
-
-def query_b(cursor):
-    query = """
-    WITH annual_salary AS (                            -- Creates subquery to get the total salary for each employee in 2010
-        SELECT s.employee_id, 
-               SUM(s.salary_value) AS total_salary     -- Sums the salary for each employee
-        FROM tb_salary s
-        WHERE s.month_id BETWEEN 201001 AND 201012
-        GROUP BY s.employee_id                         -- Groups the results by employee_id
-    )
-    SELECT e.employee_id,
-           e.position, 
-           e.department, 
-           e.country, 
-           e.district, 
-           a.total_salary
-    FROM tb_employee e
-    JOIN annual_salary a ON e.employee_id = a.employee_id   -- Joins the annual salary subquery created above and filters for employees in the supercars department in Woking Borough, Surrey (England)
-    WHERE e.department = 'supercars'
-      AND e.district = 'Woking Borough'
-      AND e.country = 'Surrey (England)'
-    ORDER BY a.total_salary ASC;                            -- Orders the results by total salary in ascending order
+    INSERT INTO tb_salary_year_summary (employee_id, year, total_salary, payments, overpaid_months)
+    SELECT s.employee_id, s.year, SUM(s.salary_value), COUNT(*), COUNT(CASE WHEN s.salary_value > r.maximum_ref_value THEN 1 END)
+    FROM tb_salary s
+    LEFT JOIN tb_employee e ON e.employee_id = s.employee_id
+    LEFT JOIN tb_reference_salary r ON r.position = e.position AND r.year = s.year
+    WHERE s.year >= :year
+    GROUP BY s.year, s.employee_id
+    """,
+    "DELETE FROM tb_employee_overpaid WHERE :full",
+    # the most recent month of an employee with salaries since :year is in those salaries
     """
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    return pd.DataFrame(rows, columns=["employee_id", "position", "department", "country", "district", "total_salary_2010"])
+    INSERT OR REPLACE INTO tb_employee_overpaid (employee_id, months_above_max, month_id, salary_value, maximum_ref_value)
+    SELECT s.employee_id,
+           (SELECT SUM(y.overpaid_months) FROM tb_salary_year_summary y WHERE y.employee_id = s.employee_id),
+           MAX(s.month_id), s.salary_value, r.maximum_ref_value       -- bare columns from the row of the most recent month
+    FROM tb_salary s
+    LEFT JOIN tb_employee e ON e.employee_id = s.employee_id
+    LEFT JOIN tb_reference_salary r ON r.position = e.position AND r.year = s.year
+    WHERE s.year >= :year
+    GROUP BY s.employee_id
+    """,
+]
+
+def _refresh(conn, year):
+    params = {'year': 0 if year is None else year, 'full': year is None}
+    for statement in REFRESH_STATEMENTS:
+        conn.execute(statement, params)
+
+def refresh(conn, since_month_id = None):
+    """
+    Updates the summary tables with the salaries paid since a month.
+
+    The years from the year of since_month_id on are recomputed from tb_salary (whole years, so calling it twice
+    or with a month in the middle of a year gives the same totals), the earlier years are left untouched.
+    Changes to older salaries, to the positions of the employees or to tb_reference_salary need a full refresh.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database after migrate(), without an open transaction
+                                   (commit the new salaries first).
+        since_month_id (int): First month (YYYYMM) of the new salaries, None for a full refresh.
+
+    Raises:
+        ValueError: If the connection has an open transaction (it would be committed with the refresh),
+                    or tb_salary was moved to yearly partitions (salary_partitions.split_salaries with drop=True).
+
+    Time Complexity: O(n log n) for the n salaries since the start of the year of since_month_id.
+    """
+    if conn.in_transaction:
+        raise ValueError("Commit or roll back the open transaction before refreshing the summaries.")
+    if _salaries_partitioned(conn):
+        raise ValueError(PARTITIONED_MESSAGE)
+
+    year = None if since_month_id is None else since_month_id // 100
+    conn.execute("BEGIN")  # readers never see the summaries half refreshed
+    try:
+        _refresh(conn, year)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+QUERY_A = """
+SELECT e.employee_id, e.position, e.department, e.country, e.district,
+       s.salary_value, r.maximum_ref_value,                       -- With MAX() these come from the row of the most recent month (SQLite bare columns)
+       MAX(s.month_id) AS month_id,                               -- Gets the most recent month for each employee
+       SUM(s.salary_value > r.maximum_ref_value) AS months_above_max   -- Counts the number of months each employee has been overpaid
+FROM tb_employee e
+JOIN tb_salary s ON s.employee_id = e.employee_id                                   -- Joins the salary and employee tables
+LEFT JOIN tb_reference_salary r ON r.position = e.position AND r.year = s.year      -- Joins the reference salary of the salary year (a month without reference still counts as the most recent)
+WHERE e.department = :department                                                    -- Filters for employees of a department and location (market_insights in Plzen, Czech Republic by default)
+  AND e.district = :district
+  AND e.country = :country
+GROUP BY e.employee_id                                                              -- One pass over the salaries of each employee
+HAVING s.salary_value > r.maximum_ref_value                                         -- Keeps the employees overpaid in their most recent month
+ORDER BY months_above_max DESC, s.salary_value - r.maximum_ref_value DESC;          -- BONUS: Orders the results by the number of months overpaid and the difference between salary and maximum reference salary
+"""
+
+# query_a on the summary tables, one row per filtered employee
+SUMMARY_QUERY_A = """
+SELECT e.employee_id, e.position, e.department, e.country, e.district,
+       o.salary_value, o.maximum_ref_value, o.month_id, o.months_above_max
+FROM tb_employee e
+JOIN tb_employee_overpaid o ON o.employee_id = e.employee_id
+WHERE e.department = :department
+  AND e.district = :district
+  AND e.country = :country
+  AND o.salary_value > o.maximum_ref_value
+ORDER BY o.months_above_max DESC, o.salary_value - o.maximum_ref_value DESC;
+"""
+
+QUERY_B = """
+SELECT e.employee_id,
+       e.position,
+       e.department,
+       e.country,
+       e.district,
+       SUM(s.salary_value) AS total_salary                   -- Sums the salary for each employee in the year
+FROM tb_employee e
+JOIN tb_salary s ON s.employee_id = e.employee_id            -- Joins the salaries of the year, read from the (employee_id, month_id) index
+               AND s.month_id BETWEEN :year * 100 + 1 AND :year * 100 + 12
+WHERE e.department = :department                             -- Filters for employees of a department and location (supercars in Woking Borough, Surrey (England) by default)
+  AND e.district = :district
+  AND e.country = :country
+GROUP BY e.employee_id                                       -- Groups the results by employee_id
+ORDER BY total_salary ASC;                                   -- Orders the results by total salary in ascending order
+"""
+
+# query_b on the summary tables
+SUMMARY_QUERY_B = """
+SELECT e.employee_id, e.position, e.department, e.country, e.district, y.total_salary
+FROM tb_employee e
+JOIN tb_salary_year_summary y ON y.employee_id = e.employee_id AND y.year = :year
+WHERE e.department = :department
+  AND e.district = :district
+  AND e.country = :country
+ORDER BY y.total_salary ASC;
+"""
+
+# SQL on tb_salary, SQL on the summary tables, filters with their defaults, result columns and hidden columns
+Report = namedtuple('Report', ['sql', 'summary_sql', 'filters', 'columns', 'exclude'])
+
+REPORTS = {
+    'query_a': Report(QUERY_A, SUMMARY_QUERY_A,
+                      {'department': 'market_insights', 'district': 'Plzen', 'country': 'Czech Republic'},
+                      ["employee_id", "position", "department", "country", "district", "salary_value", "maximum_ref_value", "month_id", "months_above_max"],
+                      ["months_above_max"]),
+    'query_b': Report(QUERY_B, SUMMARY_QUERY_B,
+                      {'department': 'supercars', 'district': 'Woking Borough', 'country': 'Surrey (England)', 'year': 2010},
+                      ["employee_id", "position", "department", "country", "district", "total_salary_{year}"],
+                      []),
+}
+
+def report_params(name, filters):
+    """
+    Returns the bound parameters of a report: its default filters updated with the given ones.
+
+    Raises:
+        ValueError: If the report or a filter is unknown.
+    """
+    if name not in REPORTS:
+        raise ValueError(f"Unknown report: {name!r}. Choose from {', '.join(REPORTS)}.")
+    unknown = filters.keys() - REPORTS[name].filters.keys()
+    if unknown:
+        raise ValueError(f"Unknown filters for {name}: {', '.join(sorted(unknown))}.")
+    return {**REPORTS[name].filters, **filters}
+
+def iter_report(cursor, name, summary = False, chunksize = None, **filters):
+    """
+    Runs a report with bound filters and yields its rows as DataFrames.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database.
+        name (str): 'query_a' or 'query_b'.
+        summary (bool): Read the summary tables instead of aggregating tb_salary. They only match tb_salary
+                        after migrate() and a refresh() following every change to the salaries.
+        chunksize (int): Rows per DataFrame, fetched with fetchmany so only one chunk is in memory.
+                         None yields a single DataFrame with all the rows (possibly empty).
+        **filters: department, district, country (and year for query_b), see REPORTS for the defaults.
+
+    Yields:
+        pd.DataFrame: The rows of the report.
+
+    Raises:
+        ValueError: If a report or a filter is unknown, or tb_salary was moved to yearly partitions.
+    """
+    params  = report_params(name, filters)
+    report  = REPORTS[name]
+    columns = [column.format(**params) for column in report.columns]
+    try:
+        cursor.execute(report.summary_sql if summary else report.sql, params)
+    except sqlite3.OperationalError as error:
+        if _salaries_partitioned(cursor.connection):
+            raise ValueError(PARTITIONED_MESSAGE) from error
+        raise
+
+    if chunksize is None:
+        yield pd.DataFrame.from_records(cursor.fetchall(), columns=columns, exclude=report.exclude)
+        return
+    while rows := cursor.fetchmany(chunksize):
+        yield pd.DataFrame.from_records(rows, columns=columns, exclude=report.exclude)
+
+def query_a(cursor, summary = False, **filters):
+    """
+    Employees of a department and location (market_insights in Plzen, Czech Republic by default) paid above
+    the reference maximum in their most recent month, see iter_report for the arguments.
+    """
+    return next(iter_report(cursor, 'query_a', summary, **filters))
+
+def query_b(cursor, summary = False, **filters):
+    """
+    Total salary in a year of the employees of a department and location (supercars in Woking Borough,
+    Surrey (England) in 2010 by default), see iter_report for the arguments.
+    """
+    return next(iter_report(cursor, 'query_b', summary, **filters))
 
 def main():
     conn = sqlite3.connect("company_db.sqlite")
     cursor = conn.cursor()
 
-    # Run and display results for query A
-    df_a = query_a(cursor)
+    if _salaries_partitioned(conn):
+        # salary_partitions.py --drop moved the salaries to yearly files, run the queries partition by partition
+        from salary_partitions import SalaryPartitions
+
+        directory  = os.path.dirname(conn.execute("SELECT path FROM tb_salary_partition").fetchone()[0])
+        partitions = SalaryPartitions(conn, directory)
+        df_a, df_b = partitions.query_a(), partitions.query_b()
+    else:
+        # Add the year column, the indexes and the summary tables if the database predates them
+        migrate(conn)
+        df_a, df_b = query_a(cursor), query_b(cursor)
+
+    # Display results for query A
     print(df_a)
     print("---------------------------------------------------------------------------------------------------------------")
 
-    # Run and display results for query B
-    df_b = query_b(cursor)
+    # Display results for query B
     print(df_b)
     print("---------------------------------------------------------------------------------------------------------------")
 
@@ -88,17 +338,20 @@ def main():
     conn.close()
 
 # Performance considerations:
-# Since it's a small dataset, we can run the queries as is. 
-# However, if the dataset grows significantly, we might need to consider indexing the columns used in the JOIN and WHERE clauses to improve query performance.
-# For example in salary table indexing the columns employee_id and month_id could help speed up the queries. 
-# Indexing on department, country, and district columns in the employee table could also help improve performance.
-# Also since the salary reference table is joined with the employee table, indexing the position column in the reference salary table could also speed up.
-
-# If the data grows significantly, we might also consider partitioning the tables to improve query performance.
-# For example the salary table could partitioned by month_id to make it easier to query data for specific time periods.
+# migrate() creates covering indexes for the JOIN and WHERE clauses: tb_salary(employee_id, month_id, salary_value, year),
+# tb_employee(department, district, country) and tb_reference_salary(position, year, maximum_ref_value), so both queries
+# read only the salaries of the filtered employees and never touch the table rows.
+# The stored year column of tb_salary replaces CAST(SUBSTR(month_id, 1, 4) AS INTEGER) in the reference salary join,
+# and query_a gets the most recent month and the overpaid months in a single grouped pass instead of joining the salaries twice
+# (one row per employee, so an employee paid twice in the most recent month is listed once).
+
+# If the data grows significantly, the salary table can be partitioned by year with salary_partitions.py: every year
+# is a separate database file, queries attach only the years they read and archiving a year is detaching its file.
 # The queries also use a lot of Joins, so we might consider denormalizing the data to reduce the number of joins and improve query performance.
 
-# We could also consider using materialized views to store the results of the subqueries and improve query performance.
+# tb_salary_year_summary and tb_employee_overpaid act as materialized views: after loading new salaries,
+# refresh(conn, first_new_month_id) recomputes only the years from that month on, and both queries read a few summary rows
+# with summary=True (the default stays on tb_salary, which is never stale).
 # If the dataset grows significantly we should consider transitioning to a more scalable database solution like PostgreSQL or MySQL and implement a star or snowflake schem solution.
 
 if __name__ == "__main__":
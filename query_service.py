@@ -0,0 +1,255 @@
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+from queries_explained import iter_report, report_params
+
+# SQLite virtual machine instructions between two checks of the interrupt callback of a query
+PROGRESS_STEPS = 1_000
+
+class ConnectionPool:
+    """
+    Thread-safe pool of read-only SQLite connections.
+
+    Every connection is opened with mode=ro (the file is never written, not even to create it), check_same_thread=False
+    (a connection goes to whichever thread borrows it) and PRAGMA query_only. A separate connection only reads
+    PRAGMA data_version, which changes whenever another connection commits to the database.
+
+    Args:
+        database (str): Path of an existing SQLite database.
+        size (int): Number of connections, the maximum number of concurrent queries.
+        timeout (float): Seconds to wait for a free connection, None to wait forever.
+    """
+
+    def __init__(self, database, size = 4, timeout = None):
+        if size < 1:
+            raise ValueError("The pool size must be at least 1.")
+        self.uri     = f"file:{pathname2url(os.path.abspath(database))}?mode=ro"
+        self.timeout = timeout
+        self._closed = False
+        self._idle   = queue.LifoQueue()  # the most recently used connection has the warmest page cache
+        for _ in range(size):
+            self._idle.put(self._connect())
+
+        self._monitor      = self._connect()
+        self._monitor_lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrows a connection for the duration of a with block.
+
+        Raises:
+            TimeoutError: If no connection is free after timeout seconds.
+        """
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No free connection after {self.timeout} s.") from None
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:  # never return a connection holding a read snapshot
+                conn.rollback()
+            if self._closed:
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+    def data_version(self):
+        """
+        Returns PRAGMA data_version of the monitor connection, it changes after every commit to the database.
+        """
+        with self._monitor_lock:
+            return self._monitor.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        """
+        Closes the idle connections and the monitor. Connections still borrowed are closed when they are given back.
+        """
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._monitor_lock:
+            self._monitor.close()
+
+class QueryService:
+    """
+    Runs the reports of queries_explained for many concurrent readers.
+
+    Results are kept in an LRU cache keyed by report, source and filters. The whole cache is dropped as soon
+    as the database's data_version changes, so a report never outlives the data it was computed from.
+
+    Args:
+        database (str): Path of an existing SQLite database, after queries_explained.migrate().
+        pool_size (int): Number of read-only connections.
+        cache_size (int): Maximum number of cached results, 0 disables the cache.
+        timeout (float): Seconds to wait for a free connection, None to wait forever.
+
+    Example:
+        with QueryService("company_db.sqlite") as service:
+            df = service.report('query_b', department='supercars', year=2011)
+    """
+
+    def __init__(self, database, pool_size = 4, cache_size = 128, timeout = None):
+        self.pool       = ConnectionPool(database, pool_size, timeout)
+        self.cache_size = cache_size
+        self._cache     = OrderedDict()
+        self._version   = None
+        self._lock      = threading.Lock()
+        self.hits       = 0
+        self.misses     = 0
+
+    def report(self, name, summary = True, **filters):
+        """
+        Returns the DataFrame of a report, from the cache when the database has not changed since it was computed.
+
+        Args:
+            name (str): 'query_a' or 'query_b'.
+            summary (bool): Read the summary tables instead of aggregating tb_salary.
+            **filters: Bound filters of the report, see queries_explained.REPORTS.
+
+        Returns:
+            pd.DataFrame: A copy of the result, callers may modify it.
+        """
+        return self._report(name, summary, filters)
+
+    def _report(self, name, summary, filters, interrupted = None):
+        # interrupted() is polled by SQLite while the query runs, returning True aborts it with OperationalError
+        key     = (name, summary, tuple(sorted(report_params(name, filters).items())))
+        version = self.pool.data_version()  # read before the query, so a cached result is never older than its version
+
+        with self._lock:
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key].copy()
+            self.misses += 1
+
+        with self.pool.connection() as conn:
+            if interrupted is not None:
+                if interrupted():  # cancelled before a connection was free
+                    raise sqlite3.OperationalError("interrupted")
+                conn.set_progress_handler(interrupted, PROGRESS_STEPS)
+            try:
+                df = next(iter_report(conn.cursor(), name, summary, **filters))
+            finally:
+                if interrupted is not None:
+                    conn.set_progress_handler(None, 0)
+
+        with self._lock:
+            if self.cache_size and version == self._version:
+                self._cache[key] = df
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return df.copy()
+
+    def stream(self, name, chunksize = 10_000, summary = True, **filters):
+        """
+        Yields the rows of a report in DataFrames of chunksize rows, without caching them.
+
+        The connection stays borrowed until the generator is exhausted or closed.
+        """
+        with self.pool.connection() as conn:
+            yield from iter_report(conn.cursor(), name, summary, chunksize, **filters)
+
+    def cache_info(self):
+        """
+        Returns the cache hits, misses and current number of cached results.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._cache)}
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class AsyncQueryService:
+    """
+    asyncio front end of QueryService: the queries run on a dedicated thread pool, one thread per pooled
+    connection, so awaiting a report never blocks the event loop.
+
+    Cancelling the awaiting task, or reaching its timeout, also stops the query itself: the SQLite progress
+    handler of its connection aborts it within PROGRESS_STEPS instructions and the connection goes back to the pool.
+
+    Args:
+        database (str): Path of an existing SQLite database, after queries_explained.migrate().
+        pool_size (int): Number of read-only connections and worker threads.
+        cache_size (int): Maximum number of cached results, 0 disables the cache.
+
+    Example:
+        async with AsyncQueryService("company_db.sqlite") as service:
+            df = await service.report('query_a', timeout=0.5)
+    """
+
+    def __init__(self, database, pool_size = 4, cache_size = 128):
+        self.service  = QueryService(database, pool_size, cache_size)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="sqlite-query")
+
+    async def report(self, name, summary = True, timeout = None, **filters):
+        """
+        Returns the DataFrame of a report, see QueryService.report.
+
+        Args:
+            timeout (float): Seconds before the query is aborted, None to wait forever.
+
+        Raises:
+            TimeoutError: If the report takes longer than timeout (including the wait for a free thread).
+            asyncio.CancelledError: If the awaiting task is cancelled.
+        """
+        cancelled = threading.Event()
+        loop      = asyncio.get_running_loop()
+        future    = loop.run_in_executor(self.executor, self.service._report, name, summary, filters, cancelled.is_set)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except (asyncio.CancelledError, TimeoutError):
+            cancelled.set()  # stops the query if it is already running in its thread
+            raise
+
+    async def reports(self, variants, summary = True, timeout = None):
+        """
+        Runs several reports concurrently.
+
+        Args:
+            variants: Iterable of (name, filters) pairs, e.g. [('query_b', {'district': 'Lisbon'}), ('query_a', {})].
+            timeout (float): Timeout of every report.
+
+        Returns:
+            list: The DataFrames in the order of the variants.
+        """
+        return await asyncio.gather(*(self.report(name, summary, timeout, **filters) for name, filters in variants))
+
+    def cache_info(self):
+        return self.service.cache_info()
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.service.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)  # waits for the running queries off the loop
@@ -1,12 +1,93 @@
 import sys
 import ast
+import math
+import time
+from collections import deque
+from collections.abc import Sized
+from itertools import tee
 
-def running_average(numbers):
+from backends import np, use_numpy, as_numeric_array
+
+def iter_running_average(iterable, compensated = True):
+    """
+    Lazily yields the running average of a stream of numbers.
+
+    Args:
+        iterable (Iterable[float] or Iterable[int]): Any iterable of numbers, including unbounded generators.
+        compensated (bool): Uses Neumaier (improved Kahan) compensated summation so the rounding error of the
+                            running total does not grow with the number of samples. Plain summation otherwise.
+
+    Yields:
+        float: The running average after each number.
+
+    Raises:
+        ValueError: When a non-numeric value is reached (the averages before it have already been yielded).
+
+    Time Complexity:  O(1) per number.
+    Space Complexity: O(1), the stream is never stored.
+    """
+
+    total        = 0.0  # running sum
+    compensation = 0.0  # low-order bits lost by the running sum, only used when compensated
+    count        = 0
+
+    for number in iterable:
+        if not isinstance(number, (int, float)):
+            raise ValueError( "All elements in the list must be integers or floats." )
+        count += 1
+
+        if compensated:
+            new_total = total + number
+            # recover what the addition rounded away from whichever operand is smaller in magnitude
+            if abs(total) >= abs(number):
+                compensation += (total - new_total) + number
+            else:
+                compensation += (number - new_total) + total
+            total = new_total
+            yield (total + compensation) / count
+        else:
+            total += number
+            yield total / count
+
+def running_averages(numbers, backend = "auto"):
+    """
+    Computes the running average of a list of numbers without printing it.
+
+    Args:
+        numbers (List[float] or List[int] or np.ndarray): A list of numerical values.
+        backend (str): "auto" (NumPy for ndarray inputs), "numpy" or "python", see backends.use_numpy.
+
+    Returns:
+        List[float] or np.ndarray: The running average at each step, an ndarray with the NumPy backend.
+
+    Raises:
+        ValueError: If the input list is empty or contains non-numeric values.
+
+    Time Complexity:  O(n), vectorized with np.cumsum on the NumPy backend.
+    Space Complexity: O(n) for the returned averages.
+    """
+
+    if use_numpy(backend, numbers):
+        numbers = as_numeric_array(numbers, "All elements in the list must be integers or floats.")
+        if not numbers.size:
+            raise ValueError( "Input list cannot be empty." )
+        # cumulative sums divided by the count seen so far
+        return np.cumsum(numbers, dtype=float) / np.arange(1, numbers.size + 1)
+
+    averages = list(iter_running_average(numbers))
+
+    # Check if the list is empty
+    if not averages:
+        raise ValueError( "Input list cannot be empty." )
+    return averages
+
+def running_average(numbers, backend = "auto"):
     """
     Computes and prints the running average of a list of numbers.
 
     Args:
-        numbers (List[float] or List[int]): A list of numerical values.
+        numbers (Iterable[float] or Iterable[int]): A list (or any iterable) of numerical values.
+        backend (str): "auto" (NumPy for ndarray inputs), "numpy" or "python", see backends.use_numpy.
 
     Output:
         Prints the current number and the running average at each step.
@@ -15,30 +96,328 @@ def running_average(numbers):
         average = (sum of all numbers seen so far) / (count of numbers seen so far)
 
     Raises:
-        ValueError: If the input list is empty or contains non-numeric values.
+        ValueError: If the input list is empty or contains non-numeric values. A list (any sized input) is checked
+                    before anything is printed; a generator can only be checked as it is read, so the averages
+                    before its first non-numeric value have already been printed.
 
     Time Complexity:  O(n), where n is the number of elements in the list.
-    Space Complexity: O(1), since we only use a few variables (total, index, number).
+    Space Complexity: O(1) with the python backend, since the averages are printed as they are produced.
     """
 
-    # Check if the list is empty
-    if not numbers:
+    if use_numpy(backend, numbers):
+        averages = running_averages(numbers, backend)
+    else:
+        # Check if all elements are integers or floats before printing, when the input can be read twice
+        if isinstance(numbers, Sized) and not all(isinstance(num, (int, float)) for num in numbers):
+            raise ValueError( "All elements in the list must be integers or floats." )
+
+        # one copy of the stream is printed and the other one feeds the averages, tee only buffers one value
+        numbers, stream = tee(numbers)
+        averages = iter_running_average(stream)
+
+    count = 0
+    for number, average in zip(numbers, averages):
+        count  += 1
+        average = round(float(average), 2)  # round the average to 2 decimal places
+        print(f"Current number: {number:.2f}, Running average: {average:.2f}") # Output the result
+        print() 
+
+    # Check if the list was empty
+    if not count:
         raise ValueError( "Input list cannot be empty." )
 
-    # Check if all elements are integers or floats
-    if not all(isinstance(num, (int, float)) for num in numbers):
+
+def _check_number(x):
+    """
+    Raises a ValueError if x is not an integer or a float.
+    """
+    if not isinstance(x, (int, float)):
         raise ValueError( "All elements in the list must be integers or floats." )
+    return x
 
-    # Initialize total sum to zero
-    total = 0
+class RunningStats:
+    """
+    Cumulative count, mean, variance, min and max of a stream of numbers.
 
-    # Iterate over the list, keeping track of index and number
-    for index, number in enumerate(numbers):
-        total  += number                         # Update the cumulative sum
-        average = round(total / (index + 1), 2)  # Compute the running average
-        print(f"Current number: {number:.2f}, Running average: {average:.2f}") # Output the result rounding the average to 2 decimal places 
-        print() 
+    The mean and variance are updated with Welford's method, which stays accurate where the naive
+    sum of squares would cancel. Partial statistics computed on separate shards (or processes)
+    can be combined with merge, using Chan's parallel formula.
+
+    Time Complexity:  O(1) per update and per merge.
+    Space Complexity: O(1).
+    """
+
+    __slots__ = ("count", "mean", "_m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean  = 0.0
+        self._m2   = 0.0        # sum of squared deviations from the mean
+        self.min   = math.inf
+        self.max   = -math.inf
+
+    @property
+    def variance(self):
+        """Population variance of the values seen so far."""
+        return self._m2 / self.count if self.count else math.nan
+
+    @property
+    def sample_variance(self):
+        """Sample (n - 1) variance of the values seen so far."""
+        return self._m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self):
+        """Population standard deviation of the values seen so far."""
+        return math.sqrt(self.variance)
+
+    def update(self, x):
+        """
+        Adds one number.
+        """
+        _check_number(x)
+        self.count += 1
+        delta       = x - self.mean
+        self.mean  += delta / self.count
+        self._m2   += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+        return self
+
+    def update_many(self, values):
+        """
+        Adds a batch of numbers.
+
+        The batch statistics are computed on local variables (vectorized for ndarrays) and merged once,
+        which avoids the attribute updates of calling update per value.
+        """
+        batch = RunningStats()
+
+        if np is not None and isinstance(values, np.ndarray):
+            values = as_numeric_array(values, "All elements in the list must be integers or floats.").ravel()
+            if not values.size:
+                return self
+            batch.count = int(values.size)
+            batch.mean  = float(values.mean())
+            batch._m2   = float(((values - batch.mean) ** 2).sum())
+            batch.min   = values.min().item()
+            batch.max   = values.max().item()
+            return self.merge(batch)
+
+        count, mean, m2 = 0, 0.0, 0.0
+        low, high       = math.inf, -math.inf
+        for x in values:
+            _check_number(x)
+            count += 1
+            delta  = x - mean
+            mean  += delta / count
+            m2    += delta * (x - mean)
+            if x < low:
+                low = x
+            if x > high:
+                high = x
+
+        batch.count, batch.mean, batch._m2, batch.min, batch.max = count, mean, m2, low, high
+        return self.merge(batch)
+
+    def merge(self, other):
+        """
+        Combines the statistics of another RunningStats into this one, as if all values were added here.
+        """
+        if not other.count:
+            return self
+        if not self.count:
+            self.count, self.mean, self._m2, self.min, self.max = other.count, other.mean, other._m2, other.min, other.max
+            return self
+
+        count      = self.count + other.count
+        delta      = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self._m2  += other._m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min   = min(self.min, other.min)
+        self.max   = max(self.max, other.max)
+        return self
+
+class WindowedStats:
+    """
+    Mean, variance, min and max over a sliding window of the last `size` values and/or the last `duration` seconds.
+
+    The window is a ring buffer (deque). The mean and variance are kept with Welford's method, adding the new value
+    and removing the evicted ones, while min and max come from monotonic deques whose front is always the answer.
+
+    Args:
+        size (int): Maximum number of values in the window.
+        duration (float): Maximum age of the values in the window, in seconds (or in the unit of the timestamps).
+
+    Time Complexity:  O(1) amortized per update.
+    Space Complexity: O(w), where w is the number of values in the window.
+    """
+
+    __slots__ = ("size", "duration", "_window", "_mins", "_maxs", "_index", "mean", "_m2")
+
+    def __init__(self, size = None, duration = None):
+        if size is None and duration is None:
+            raise ValueError( "A window size or duration is required." )
+        if size is not None and size < 1:
+            raise ValueError( "Window size must be at least 1." )
+        if duration is not None and duration <= 0:
+            raise ValueError( "Window duration must be positive." )
+
+        self.size     = size
+        self.duration = duration
+        self._window  = deque()   # (index, timestamp, value) in arrival order
+        self._mins    = deque()   # (index, value) with increasing values
+        self._maxs    = deque()   # (index, value) with decreasing values
+        self._index   = 0         # arrival index of the next value
+        self.mean     = 0.0
+        self._m2      = 0.0
+
+    @property
+    def count(self):
+        """Number of values in the window."""
+        return len(self._window)
+
+    @property
+    def variance(self):
+        """Population variance of the values in the window."""
+        return max(self._m2, 0.0) / self.count if self.count else math.nan
+
+    @property
+    def std(self):
+        """Population standard deviation of the values in the window."""
+        return math.sqrt(self.variance)
+
+    @property
+    def min(self):
+        """Smallest value in the window."""
+        return self._mins[0][1] if self._mins else math.nan
+
+    @property
+    def max(self):
+        """Largest value in the window."""
+        return self._maxs[0][1] if self._maxs else math.nan
+
+    def update(self, x, timestamp = None):
+        """
+        Adds one number, evicting the values that fall out of the window.
+
+        Args:
+            x (int or float): The new value.
+            timestamp (float): Arrival time of the value, defaults to time.monotonic() for time windows.
+        """
+        _check_number(x)
+        if timestamp is None and self.duration is not None:
+            timestamp = time.monotonic()
+
+        index        = self._index
+        self._index += 1
+        self._window.append((index, timestamp, x))
+
+        # add the value to the mean and variance
+        delta      = x - self.mean
+        self.mean += delta / len(self._window)
+        self._m2  += delta * (x - self.mean)
+
+        # values dominated by the new one can never be the min (or max) again
+        while self._mins and self._mins[-1][1] >= x:
+            self._mins.pop()
+        self._mins.append((index, x))
+        while self._maxs and self._maxs[-1][1] <= x:
+            self._maxs.pop()
+        self._maxs.append((index, x))
+
+        self._evict(timestamp)
+        return self
+
+    def update_many(self, values, timestamps = None):
+        """
+        Adds a batch of numbers, with one optional timestamp per value.
+        """
+        if timestamps is None:
+            for x in values:
+                self.update(x)
+        else:
+            for x, timestamp in zip(values, timestamps):
+                self.update(x, timestamp)
+        return self
+
+    def _evict(self, now):
+        """
+        Removes the values beyond the window size or older than the window duration.
+        """
+        window = self._window
+        while window and ((self.size is not None and len(window) > self.size)
+                          or (self.duration is not None and window[0][1] <= now - self.duration)):
+            _, _, x = window.popleft()
+
+            # remove the value from the mean and variance
+            if window:
+                delta      = x - self.mean
+                self.mean -= delta / len(window)
+                self._m2  -= delta * (x - self.mean)
+            else:
+                self.mean, self._m2 = 0.0, 0.0
+
+        # drop min/max candidates that left the window
+        oldest = window[0][0] if window else self._index
+        while self._mins and self._mins[0][0] < oldest:
+            self._mins.popleft()
+        while self._maxs and self._maxs[0][0] < oldest:
+            self._maxs.popleft()
+
+class EWMA:
+    """
+    Exponentially weighted moving mean and variance.
+
+    Args:
+        alpha (float): Weight of the newest value, between 0 (never moves) and 1 (only the last value counts).
+
+    Time Complexity:  O(1) per update.
+    Space Complexity: O(1).
+    """
+
+    __slots__ = ("alpha", "count", "mean", "variance")
+
+    def __init__(self, alpha):
+        if not 0 < alpha <= 1:
+            raise ValueError( "Alpha must be between 0 and 1." )
+        self.alpha    = alpha
+        self.count    = 0
+        self.mean     = math.nan
+        self.variance = math.nan
+
+    @property
+    def std(self):
+        """Exponentially weighted standard deviation."""
+        return math.sqrt(self.variance)
+
+    def update(self, x):
+        """
+        Adds one number.
+        """
+        _check_number(x)
+        self.count += 1
+        if self.count == 1:
+            self.mean, self.variance = float(x), 0.0
+            return self
+
+        # incremental form of the weighted mean and variance
+        delta         = x - self.mean
+        increment     = self.alpha * delta
+        self.mean    += increment
+        self.variance = (1 - self.alpha) * (self.variance + delta * increment)
+        return self
 
+    def update_many(self, values):
+        """
+        Adds a batch of numbers in order.
+        """
+        for x in values:
+            self.update(x)
+        return self
 
 # to run the code, pass a list of numbers as a command-line argument
 if __name__ == "__main__":
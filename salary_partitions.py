@@ -0,0 +1,372 @@
+import argparse
+import os
+import sqlite3
+from contextlib import contextmanager
+
+import pandas as pd
+
+from queries_explained import REPORTS, SUMMARY_TABLES, query_b, report_params
+
+# salaries of one year in their own database file, the year is also stored in PRAGMA user_version
+PARTITION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tb_salary (
+    payment_id INTEGER PRIMARY KEY,
+    month_id INTEGER,
+    employee_id INTEGER,
+    salary_value REAL,
+    year INTEGER GENERATED ALWAYS AS (month_id / 100) STORED,
+    CHECK (month_id / 100 = {year})
+);
+CREATE INDEX IF NOT EXISTS idx_salary_employee_month ON tb_salary(employee_id, month_id, salary_value, year);
+PRAGMA user_version = {year};
+"""
+
+# catalog of the partitions in the main database, attaching or archiving a year only adds or removes its row
+CATALOG = """
+CREATE TABLE IF NOT EXISTS tb_salary_partition (
+    year INTEGER PRIMARY KEY,
+    path TEXT NOT NULL
+)
+"""
+
+# last payment_id given to a salary of any partition (archived ones included), so ids stay unique across years
+PAYMENT_SEQUENCE = """
+CREATE TABLE IF NOT EXISTS tb_salary_payment_sequence (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    last_payment_id INTEGER NOT NULL
+)
+"""
+
+# raises the sequence to the ids of a registered partition, it never goes back so archived ids are not reused
+ADVANCE_PAYMENT_ID = """
+INSERT INTO tb_salary_payment_sequence VALUES (0, :last)
+ON CONFLICT (id) DO UPDATE SET last_payment_id = MAX(last_payment_id, excluded.last_payment_id)
+"""
+
+# reserves the next :count ids
+RESERVE_PAYMENT_IDS = """
+INSERT INTO tb_salary_payment_sequence VALUES (0, :count)
+ON CONFLICT (id) DO UPDATE SET last_payment_id = last_payment_id + :count
+"""
+
+# per-partition step of query_a: most recent month and overpaid months of every filtered employee in one year
+PARTIAL_QUERY_A = """
+INSERT INTO temp.query_a_partial
+SELECT e.employee_id, MAX(s.month_id), s.salary_value, r.maximum_ref_value,
+       COUNT(CASE WHEN s.salary_value > r.maximum_ref_value THEN 1 END)
+FROM tb_employee e
+JOIN {partition}.tb_salary s ON s.employee_id = e.employee_id
+LEFT JOIN tb_reference_salary r ON r.position = e.position AND r.year = s.year
+WHERE e.department = :department
+  AND e.district = :district
+  AND e.country = :country
+GROUP BY e.employee_id
+"""
+
+# combines the partial results: the row of the most recent month of every employee and the sum of its overpaid months
+MERGE_QUERY_A = """
+SELECT e.employee_id, e.position, e.department, e.country, e.district,
+       p.salary_value, p.maximum_ref_value, MAX(p.month_id) AS month_id, SUM(p.overpaid_months) AS months_above_max
+FROM temp.query_a_partial p
+JOIN tb_employee e ON e.employee_id = p.employee_id
+GROUP BY p.employee_id
+HAVING p.salary_value > p.maximum_ref_value
+ORDER BY months_above_max DESC, p.salary_value - p.maximum_ref_value DESC
+"""
+
+class SalaryPartitions:
+    """
+    Salary storage partitioned by year: every year of tb_salary lives in its own database file, registered in
+    the tb_salary_partition catalog of the main database (which keeps tb_employee and tb_reference_salary).
+
+    Queries only attach the partitions of the months they read (partition pruning). Loading a year is
+    registering its file and archiving it is unregistering it, no salary row is copied. payment_id values
+    come from one sequence in the main database and are unique across all partitions.
+
+    The catalog methods commit their own changes: they raise ValueError instead when the connection has an
+    open transaction, which they would otherwise commit along with them.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the main database.
+        directory (str): Directory of the partition files, created if missing.
+    """
+
+    def __init__(self, conn, directory):
+        self.conn      = conn
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        conn.execute(CATALOG)
+        conn.execute(PAYMENT_SEQUENCE)
+        # SQLite attaches at most this many databases to a connection at once
+        self.max_attached = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+
+    def _check_no_transaction(self, action):
+        if self.conn.in_transaction:
+            raise ValueError(f"Commit or roll back the open transaction before {action}.")
+
+    def path(self, year):
+        return os.path.join(self.directory, f"salary_{year}.sqlite")
+
+    def years(self, first_month_id = None, last_month_id = None):
+        """
+        Returns the years of the registered partitions overlapping a month range (both ends inclusive, None for open).
+        """
+        first = 0 if first_month_id is None else first_month_id // 100
+        last  = 9999 if last_month_id is None else last_month_id // 100
+        return [year for year, in self.conn.execute(
+            "SELECT year FROM tb_salary_partition WHERE year BETWEEN ? AND ? ORDER BY year", (first, last))]
+
+    def create(self, year):
+        """
+        Creates the (empty) partition file of a year if needed and registers it.
+
+        Returns:
+            str: Path of the partition file.
+        """
+        self._check_no_transaction("creating a partition")
+        path = self.path(year)
+        partition = sqlite3.connect(path)
+        partition.executescript(PARTITION_SCHEMA.format(year=int(year)))
+        partition.close()
+        self.attach(path)
+        return path
+
+    def attach(self, path):
+        """
+        Registers an existing partition file, e.g. a year brought back from the archive.
+
+        Returns:
+            int: The year of the partition.
+
+        Raises:
+            ValueError: If the connection has an open transaction, the file does not exist, is not a partition or
+                        its year is already registered from another file.
+        """
+        self._check_no_transaction("attaching a partition")
+        if not os.path.isfile(path):
+            raise ValueError(f"{path} does not exist.")
+        try:
+            partition = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+            try:
+                year   = partition.execute("PRAGMA user_version").fetchone()[0]
+                tables = {name for name, in partition.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+                if 'tb_salary' in tables:
+                    last_id = partition.execute("SELECT IFNULL(MAX(payment_id), 0) FROM tb_salary").fetchone()[0]
+            finally:
+                partition.close()
+        except sqlite3.DatabaseError as error:
+            raise ValueError(f"{path} is not a salary partition.") from error
+        if not year or 'tb_salary' not in tables:
+            raise ValueError(f"{path} is not a salary partition.")
+
+        registered = self.conn.execute("SELECT path FROM tb_salary_partition WHERE year = ?", (year,)).fetchone()
+        if registered and os.path.abspath(registered[0]) != os.path.abspath(path):
+            raise ValueError(f"The partition of {year} is already registered from {registered[0]}.")
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO tb_salary_partition VALUES (?, ?)", (year, os.path.abspath(path)))
+            self.conn.execute(ADVANCE_PAYMENT_ID, {'last': last_id})
+        return year
+
+    def detach(self, year):
+        """
+        Unregisters the partition of a year (archiving it), its file is left untouched.
+
+        Returns:
+            str: Path of the partition file, to attach it again later.
+        """
+        self._check_no_transaction("detaching a partition")
+        registered = self.conn.execute("SELECT path FROM tb_salary_partition WHERE year = ?", (year,)).fetchone()
+        if registered is None:
+            raise ValueError(f"No partition registered for {year}.")
+        with self.conn:
+            self.conn.execute("DELETE FROM tb_salary_partition WHERE year = ?", (year,))
+        return registered[0]
+
+    def insert(self, rows, batch_size = 100_000):
+        """
+        Routes (month_id, employee_id, salary_value) rows to the partition of their year, creating missing ones.
+        Rows are buffered per year and written with executemany, one transaction per batch. The payment_id of
+        every batch is reserved from the shared sequence first, ids of a batch that fails to write are skipped.
+
+        Returns:
+            int: The number of rows inserted.
+        """
+        self._check_no_transaction("inserting salaries")
+        buffers = {}
+        total   = 0
+
+        def flush(year):
+            buffer = buffers.pop(year)
+            with self.conn:
+                self.conn.execute(RESERVE_PAYMENT_IDS, {'count': len(buffer)})
+                first_id = self.conn.execute("SELECT last_payment_id FROM tb_salary_payment_sequence").fetchone()[0] - len(buffer) + 1
+            partition = sqlite3.connect(paths[year])
+            with partition:
+                partition.executemany("INSERT INTO tb_salary (payment_id, month_id, employee_id, salary_value) VALUES (?, ?, ?, ?)",
+                                      ((payment_id, *row) for payment_id, row in enumerate(buffer, first_id)))
+            partition.close()
+
+        paths = dict(self.conn.execute("SELECT year, path FROM tb_salary_partition"))
+        if self.conn.execute("SELECT 1 FROM tb_salary_payment_sequence").fetchone() is None:
+            # a catalog registered before the sequence existed starts above the ids of its partitions
+            with self.conn:
+                for path in paths.values():
+                    partition = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+                    last_id   = partition.execute("SELECT IFNULL(MAX(payment_id), 0) FROM tb_salary").fetchone()[0]
+                    partition.close()
+                    self.conn.execute(ADVANCE_PAYMENT_ID, {'last': last_id})
+        for row in rows:
+            year = row[0] // 100
+            if year not in paths:
+                paths[year] = self.create(year)
+            buffer = buffers.setdefault(year, [])
+            buffer.append(row)
+            total += 1
+            if len(buffer) >= batch_size:
+                flush(year)
+        for year in list(buffers):
+            flush(year)
+        return total
+
+    @contextmanager
+    def view(self, first_month_id = None, last_month_id = None):
+        """
+        Attaches the partitions overlapping a month range and exposes them as a temporary tb_salary view
+        (a UNION ALL of the partitions), which hides any tb_salary of the main database for the duration of the block.
+        A single partition is read through its own indexes; joins on a view of several partitions materialize it,
+        so the report helpers below query one partition at a time.
+
+        ATTACH and DETACH are not allowed inside a transaction: the connection must not have one open when the
+        block starts, and a transaction opened inside the block is committed when it ends, or rolled back if
+        the block raises.
+
+        Yields:
+            list: The years of the attached partitions.
+
+        Raises:
+            ValueError: If the connection has an open transaction, or the range needs more partitions
+                        than SQLite can attach at once.
+        """
+        years = self.years(first_month_id, last_month_id)
+        if len(years) > self.max_attached:
+            raise ValueError(f"The range spans {len(years)} partitions, at most {self.max_attached} can be attached at once.")
+        self._check_no_transaction("attaching partitions")
+
+        attached = []
+        try:
+            for year, path in self.conn.execute(
+                    f"SELECT year, path FROM tb_salary_partition WHERE year IN ({', '.join('?' * len(years))})", years).fetchall():
+                self.conn.execute("ATTACH DATABASE ? AS ?", (path, f"p{year}"))
+                attached.append(year)
+            union = " UNION ALL ".join(f"SELECT * FROM p{year}.tb_salary" for year in attached) or \
+                    "SELECT NULL AS payment_id, NULL AS month_id, NULL AS employee_id, NULL AS salary_value, NULL AS year WHERE 0"
+            self.conn.execute(f"CREATE TEMP VIEW tb_salary AS {union}")
+            yield attached
+        except BaseException:
+            self.conn.rollback()
+            raise
+        else:
+            self.conn.commit()
+        finally:
+            self.conn.execute("DROP VIEW IF EXISTS temp.tb_salary")
+            for year in attached:
+                self.conn.execute(f"DETACH DATABASE p{year}")
+
+    def query_b(self, **filters):
+        """
+        query_b on the partition of its year only, see queries_explained.query_b for the filters.
+        """
+        year = report_params('query_b', filters)['year']
+        with self.view(year * 100 + 1, year * 100 + 12):
+            return query_b(self.conn.cursor(), summary=False, **filters)
+
+    def query_a(self, **filters):
+        """
+        query_a over every partition: each partition is attached alone, aggregated into a temporary table and
+        detached, then the partial results are merged. See queries_explained.query_a for the filters.
+        """
+        params = report_params('query_a', filters)
+        self.conn.execute("""CREATE TEMP TABLE IF NOT EXISTS query_a_partial (
+                                 employee_id INTEGER, month_id INTEGER, salary_value REAL, maximum_ref_value REAL, overpaid_months INTEGER)""")
+        try:
+            for year in self.years():
+                with self.view(year * 100 + 1, year * 100 + 12) as attached:
+                    if attached:
+                        self.conn.execute(PARTIAL_QUERY_A.format(partition=f"p{year}"), params)
+            rows = self.conn.execute(MERGE_QUERY_A).fetchall()
+        finally:
+            self.conn.execute("DROP TABLE IF EXISTS temp.query_a_partial")
+        report = REPORTS['query_a']
+        return pd.DataFrame.from_records(rows, columns=report.columns, exclude=report.exclude)
+
+def split_salaries(conn, directory, drop = False):
+    """
+    Copies tb_salary of a database into yearly partitions and registers them.
+
+    Running it again replaces the content of the partitions with the current tb_salary, and does nothing once
+    tb_salary has been dropped.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the main database, without an open transaction.
+        directory (str): Directory of the partition files.
+        drop (bool): Drop tb_salary from the main database once copied (run VACUUM afterwards to shrink the file).
+                     The queries_explained functions need tb_salary, afterwards the salaries are only read through
+                     SalaryPartitions.
+
+    Returns:
+        SalaryPartitions: The partitioned storage.
+
+    Raises:
+        ValueError: If the connection has an open transaction, or drop is True while the summary tables of
+                    queries_explained exist (refresh() could not keep them up to date without tb_salary).
+    """
+    if conn.in_transaction:
+        raise ValueError("Commit or roll back the open transaction before splitting the salaries.")
+    tables = {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if drop and tables & SUMMARY_TABLES.keys():
+        raise ValueError(f"tb_salary cannot be dropped while the summary tables {', '.join(sorted(tables & SUMMARY_TABLES.keys()))} "
+                         "exist: refresh() needs it to keep them up to date.")
+
+    partitions = SalaryPartitions(conn, directory)
+    if 'tb_salary' not in tables:  # already split and dropped
+        return partitions
+
+    # the year column and its index of a migrated database avoid a full scan per year
+    columns = [row[1] for row in conn.execute("PRAGMA table_xinfo(tb_salary)")]
+    where   = "year = :year" if 'year' in columns else "month_id BETWEEN :year * 100 + 1 AND :year * 100 + 12"
+    years   = [year for year, in conn.execute("SELECT DISTINCT month_id / 100 FROM tb_salary ORDER BY 1")]
+    for year in years:
+        path = partitions.create(year)
+        conn.execute("ATTACH DATABASE ? AS target", (path,))
+        try:
+            # the partition is emptied first, so splitting again does not insert the same payments twice
+            with conn:
+                conn.execute("DELETE FROM target.tb_salary")
+                conn.execute(f"""INSERT INTO target.tb_salary (payment_id, month_id, employee_id, salary_value)
+                                SELECT payment_id, month_id, employee_id, salary_value FROM main.tb_salary
+                                WHERE {where}""", {'year': year})
+                last_id = conn.execute("SELECT IFNULL(MAX(payment_id), 0) FROM target.tb_salary").fetchone()[0]
+                conn.execute(ADVANCE_PAYMENT_ID, {'last': last_id})
+        finally:
+            conn.execute("DETACH DATABASE target")
+    if drop:
+        with conn:
+            conn.execute("DROP TABLE main.tb_salary")
+    return partitions
+
+def main():
+    parser = argparse.ArgumentParser(description="Split the salaries of a database into yearly partition files.")
+    parser.add_argument("--db", default="company_db.sqlite", help="SQLite database file (default: company_db.sqlite)")
+    parser.add_argument("--dir", default="salary_partitions", help="directory of the partition files (default: salary_partitions)")
+    parser.add_argument("--drop", action="store_true", help="drop tb_salary from the database once partitioned")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    partitions = split_salaries(conn, args.dir, args.drop)
+    print(f"Partitions: {', '.join(map(str, partitions.years()))}")
+    print(partitions.query_a())
+    print(partitions.query_b())
+    conn.close()
+
+if __name__ == "__main__":
+    main()
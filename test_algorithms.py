@@ -1,10 +1,13 @@
 import pytest
 
 # import the functions to test
-from running_avg        import running_average  
-from median_arrays      import median_number_array
-from bracket_validation import validate_brackets, is_valid_bracket_sequence
-from interval_merging   import merge_intervals  
+from running_avg        import running_average, running_averages, iter_running_average, RunningStats, WindowedStats, EWMA
+from itertools          import count, islice
+from median_arrays      import median_number_array, streaming_median, StreamingMedian, TDigest, kth_smallest, quantiles
+from bracket_validation import validate_brackets, is_valid_bracket_sequence, validate_stream, BracketValidator, validate_many
+import io
+import random
+from interval_merging   import merge_intervals, IntervalSet, iter_merge_intervals, merge_interval_file, read_intervals, write_intervals, merge_intervals_parallel
 
 def test_running_average_valid(capfd):
     """
@@ -49,12 +52,87 @@ def test_running_average_empty():
     with pytest.raises(ValueError, match = "Input list cannot be empty."):
         running_average([])
 
-def test_running_average_non_numeric():
+def test_running_average_non_numeric(capfd):
 
     """tests running_average with non-numeric values (should raise valueerror)."""
 
+    # a list is checked before anything is printed
     with pytest.raises(ValueError, match = "All elements in the list must be integers or floats."):
         running_average([1, "two", 3.0])
+    assert capfd.readouterr().out == ""
+
+    # a generator is checked as it is read, the averages before the bad value are already printed
+    with pytest.raises(ValueError, match = "All elements in the list must be integers or floats."):
+        running_average(x for x in [1, "two", 3.0])
+    assert [line for line in capfd.readouterr().out.split("\n") if line.strip()] == ["Current number: 1.00, Running average: 1.00"]
+
+def test_iter_running_average():
+    """
+    tests iter_running_average yields averages lazily, also from unbounded generators.
+    """
+
+    assert list(iter_running_average([0.5, 3.0, 7.5])) == [0.5, 1.75, 11 / 3]
+    assert list(iter_running_average(iter([])))        == []
+
+    # unbounded stream 1, 2, 3, ... only consumed as far as needed
+    assert list(islice(iter_running_average(count(1)), 4)) == [1, 1.5, 2, 2.5]
+
+    # compensated summation keeps the mean of many small values exact
+    stream = (0.1 for _ in range(1000000))
+    *_, last = iter_running_average(stream)
+    assert last == 0.1
+
+    with pytest.raises(ValueError):
+        list(iter_running_average([1, "two", 3.0]))
+
+    # the printing wrapper also accepts generators
+    with pytest.raises(ValueError, match = "Input list cannot be empty."):
+        running_average(x for x in [])
+
+def test_running_stats_merge():
+    """
+    tests RunningStats updates and that merging shard statistics matches a single pass.
+    """
+
+    values = [2, 4, 4, 4, 5, 5, 7, 9]
+    single = RunningStats().update_many(values)
+    assert (single.count, single.mean, single.variance, single.min, single.max) == (8, 5, 4, 2, 9)
+    assert single.sample_variance == pytest.approx(32 / 7)
+
+    # partial statistics from separate workers
+    left  = RunningStats().update_many(values[:3])
+    right = RunningStats()
+    for x in values[3:]:
+        right.update(x)
+    merged = left.merge(right)
+    assert (merged.count, merged.mean, merged.min, merged.max) == (8, 5, 2, 9)
+    assert merged.variance == pytest.approx(4)
+
+    # __slots__ keeps the objects small
+    with pytest.raises(AttributeError):
+        merged.benfica = 1904
+    with pytest.raises(ValueError):
+        RunningStats().update("two")
+
+def test_windowed_stats_and_ewma():
+    """
+    tests sliding window statistics by count and by time, and the EWMA.
+    """
+
+    window = WindowedStats(size = 3).update_many([5, 1, 3, 8, 2])
+    assert (window.count, window.mean, window.min, window.max) == (3, 13 / 3, 2, 8)
+    assert window.variance == pytest.approx(((3 - 13 / 3) ** 2 + (8 - 13 / 3) ** 2 + (2 - 13 / 3) ** 2) / 3)
+
+    # only the values of the last 10 seconds are kept
+    timed = WindowedStats(duration = 10).update_many([100, 1, 2, 3], timestamps = [0, 5, 12, 14])
+    assert (timed.count, timed.min, timed.max) == (3, 1, 3)
+    assert timed.mean == pytest.approx(2)
+
+    ewma = EWMA(alpha = 0.5).update_many([10, 20, 20])
+    assert ewma.mean == 17.5
+
+    with pytest.raises(ValueError):
+        WindowedStats()
 
 def test_median_number_array():
     """
@@ -90,6 +168,93 @@ def test_median_number_array():
     with pytest.raises(ValueError):
         median_number_array([1904, 2025, "benfica"], [123, 456])
 
+def test_streaming_median_exact_methods():
+    """
+    tests streaming_median exact methods against median_number_array, including generator inputs.
+    """
+
+    cases = [([4, 2, 1], [2, 5], [7, 6]), ([1, 3, 5], [2, 4, 6]), ([-5, -10, 0], [10, 5]), ([7],)]
+    for arrays in cases:
+        expected = median_number_array(*arrays)
+        assert streaming_median(*arrays)                                      == expected
+        assert streaming_median(*(iter(a) for a in arrays), method = "select") == expected
+
+    # running median after each value
+    running = StreamingMedian()
+    medians = []
+    for x in [5, 1, 3, 8]:
+        running.add(x)
+        medians.append(running.median())
+    assert medians == [5, 3, 3, 4]
+
+    # test with an empty input and invalid values
+    with pytest.raises(ValueError):
+        streaming_median(iter([]))
+    with pytest.raises(ValueError):
+        streaming_median([1, "benfica"], method = "select")
+    with pytest.raises(ValueError):
+        streaming_median([1, 2], method = "benfica")
+
+def test_streaming_median_tdigest():
+    """
+    tests the approximate t-digest median stays close to the exact one with bounded memory.
+    """
+
+    values = [(i * 7919) % 10007 for i in range(50000)]
+    digest = TDigest(compression = 100)
+    for x in values:
+        digest.add(x)
+
+    # the rank error is a small fraction of the range and the centroids stay bounded
+    assert abs(digest.median() - median_number_array(values)) < 100
+    assert len(digest._centroids) <= 100
+    assert digest.quantile(0) == min(values)
+    assert digest.quantile(1) == max(values)
+    assert abs(streaming_median(values, method = "tdigest") - median_number_array(values)) < 100
+
+def test_median_number_array_presorted():
+    """
+    tests the merge-based median on sorted arrays, flagged and auto-detected.
+    """
+
+    assert median_number_array([1, 2, 4], [2, 5], [6, 7])                    == 4
+    assert median_number_array([1, 3, 5], [2, 4, 6], presorted = True)       == 3.5
+    assert median_number_array([-10, -5, 0], [5, 10], presorted = True)     == 0
+    assert median_number_array([2, 2, 2], [], [2, 2], presorted = True)      == 2
+
+    # test with an empty array
+    with pytest.raises(ValueError):
+        median_number_array([], presorted = True)
+
+def test_kth_smallest_and_quantiles():
+    """
+    tests kth_smallest and quantiles across several sorted arrays.
+    """
+
+    arrays = [[1, 4, 9], [2, 3], [5, 6, 7, 8, 10]]
+    assert [kth_smallest(arrays, k) for k in range(1, 11)] == list(range(1, 11))
+    assert kth_smallest([[9, 1], [5]], 2, presorted = False) == 5
+
+    # p0, p50, p95 and p100 with linear interpolation between ranks
+    assert quantiles(arrays, [0, 0.5, 0.95, 1]) == pytest.approx([1, 5.5, 9.55, 10])
+    assert quantiles([[3, 1], [2]], [0.5], presorted = False) == [2]
+
+    # random sorted arrays of very different lengths, with duplicates, against a full sort
+    rng = random.Random(7)
+    for _ in range(200):
+        shards = [sorted(rng.randint(0, 50) for _ in range(rng.choice([0, 1, 5, 40]))) for _ in range(rng.randint(1, 12))]
+        values = sorted(x for shard in shards for x in shard)
+        assert [kth_smallest(shards, k) for k in range(1, len(values) + 1)] == values
+        if values:
+            assert median_number_array(*shards) == pytest.approx((values[(len(values) - 1) // 2] + values[len(values) // 2]) / 2)
+            assert quantiles(shards, [1, 0, 0.5]) == [values[-1], values[0], pytest.approx(median_number_array(*shards))]
+
+    # test out of range rank and quantile
+    with pytest.raises(ValueError):
+        kth_smallest(arrays, 11)
+    with pytest.raises(ValueError):
+        quantiles(arrays, [1.5])
+
 # test for valid intervals that merge
 def test_merge_intervals_good():
     assert merge_intervals([[2, 4], [2, 5], [3, 6], [9, 11]]) == [[2, 6], [9, 11]]
@@ -133,6 +298,82 @@ def test_merge_intervals_single_interval():
     assert merge_intervals([[1, 5]]) == [[1, 5]]
     assert merge_intervals([[10, 10]]) == [[10, 10]]
 
+# test the input list is not sorted in place
+def test_merge_intervals_does_not_mutate_input():
+    intervals = [[9, 11], [2, 4], [3, 6]]
+    assert merge_intervals(intervals) == [[2, 6], [9, 11]]
+    assert intervals == [[9, 11], [2, 4], [3, 6]]
+
+# test incremental updates and queries on an interval set
+def test_interval_set():
+    calendar = IntervalSet([[9, 11], [2, 4]])
+    calendar.add(3, 6)
+    calendar.add(6, 7)       # touching intervals merge
+    calendar.add(20, 25)
+    assert calendar.to_list() == [[2, 7], [9, 11], [20, 25]]
+    assert len(calendar) == 3
+
+    # point and range queries
+    assert 5 in calendar and 7 in calendar
+    assert 8 not in calendar and 1 not in calendar
+    assert calendar.overlaps(7, 10)  == [[2, 7], [9, 11]]
+    assert calendar.overlaps(12, 19) == []
+
+    # removing a range keeps the cut points as boundaries
+    calendar.remove(4, 5)
+    calendar.remove(9, 11)
+    calendar.remove(18, 22)
+    assert list(calendar) == [[2, 4], [5, 7], [22, 25]]
+
+    # an add spanning several intervals merges them all
+    calendar.add(3, 23)
+    assert list(calendar) == [[2, 25]]
+
+    with pytest.raises(ValueError):
+        calendar.add(5, 4)
+    with pytest.raises(ValueError):
+        calendar.remove("Benfica", 4)
+
+# test the out-of-core pipeline with chunks small enough to force spills and several merge passes
+def test_merge_intervals_out_of_core(tmp_path):
+    intervals = [[(i * 37) % 1000, (i * 37) % 1000 + i % 5] for i in range(2000)]
+    expected  = merge_intervals(intervals)
+
+    assert list(iter_merge_intervals(intervals, chunk_size = 50, fan_in = 3)) == expected
+    assert list(iter_merge_intervals(iter([]))) == []
+
+    # csv in, binary out
+    source      = tmp_path / "intervals.csv"
+    destination = tmp_path / "merged.bin"
+    write_intervals(source, intervals)
+    count = merge_interval_file(source, destination, chunk_size = 64, destination_fmt = "binary")
+    assert count == len(expected)
+    assert [list(x) for x in read_intervals(destination, "binary")] == expected
+
+    with pytest.raises(ValueError):
+        list(iter_merge_intervals([[5, 4]]))
+
+# test spilled runs read back NumPy scalars, ndarray rows and bools as the numbers they stand for
+def test_merge_intervals_out_of_core_numpy_values():
+    np = pytest.importorskip("numpy")
+
+    floats = [(np.float64(i), np.float64(i + .5)) for i in range(10)]
+    assert list(iter_merge_intervals(floats, chunk_size = 3)) == [[i, i + .5] for i in range(10)]
+
+    array = np.array([[(i * 7) % 20, (i * 7) % 20 + 2] for i in range(20)])
+    assert list(iter_merge_intervals(array, chunk_size = 3)) == merge_intervals(array.tolist())
+    assert list(iter_merge_intervals(array.astype(float), chunk_size = 3)) == merge_intervals(array.tolist())
+
+    assert list(iter_merge_intervals([(True, True), (False, True), (3, 4)], chunk_size = 1)) == [[0, 1], [3, 4]]
+    with pytest.raises(ValueError):
+        list(iter_merge_intervals(np.array([["a", "b"]] * 5), chunk_size = 3))
+
+# test the parallel path gives exactly the serial result
+def test_merge_intervals_parallel():
+    intervals = [[(i * 7919) % 5000, (i * 7919) % 5000 + i % 4] for i in range(3000)]
+    assert merge_intervals_parallel(intervals, workers = 2, shards = 5) == merge_intervals(intervals)
+    assert merge_intervals_parallel([[2, 4], [3, 6]], workers = 2)     == [[2, 6]]
+
 # test the bracket_validation but only is_valid_bracket_sequence function since the other is a simple if statement that returns a string message
 def test_is_valid_bracket_sequence():
     """
@@ -157,3 +398,83 @@ def test_is_valid_bracket_sequence():
     # test cases with only opening or closing brackets
     assert is_valid_bracket_sequence("{[{") == False  # only opening brackets
     assert is_valid_bracket_sequence("}])") == False  # only closing brackets
+
+def test_numpy_backend():
+    """
+    tests the NumPy backend gives the same results as the pure python one.
+    """
+
+    np = pytest.importorskip("numpy")
+
+    # median with ndarray inputs and with lists converted once
+    assert median_number_array(np.array([4, 2, 1]), np.array([2, 5]), np.array([7, 6])) == 4
+    assert median_number_array([1, 3, 5], [2, 4, 6], backend = "numpy")                 == 3.5
+    with pytest.raises(ValueError):
+        median_number_array([1904, 2025, "benfica"], backend = "numpy")
+
+    # running averages with np.cumsum
+    assert running_averages(np.array([1, 2, 3, 6])).tolist()       == [1, 1.5, 2, 3]
+    assert running_averages([1, 2, 3, 6], backend = "python")      == [1, 1.5, 2, 3]
+    with pytest.raises(ValueError):
+        running_averages([1, "two", 3.0], backend = "numpy")
+
+    # intervals keep the input type: ndarray in, ndarray out
+    merged = merge_intervals(np.array([[2, 4], [2, 5], [3, 6], [9, 11]]))
+    assert isinstance(merged, np.ndarray)
+    assert merged.tolist() == [[2, 6], [9, 11]]
+    assert merge_intervals([[1, 10], [2, 6], [7, 8], [9, 15]], backend = "numpy") == [[1, 15]]
+    with pytest.raises(ValueError):
+        merge_intervals([[10, 8], [2, 6]], backend = "numpy")
+
+    # unknown backends are rejected
+    with pytest.raises(ValueError):
+        merge_intervals([[1, 2]], backend = "benfica")
+
+def test_validate_stream():
+    """
+    tests the streaming validator across chunks, with error positions and string literals.
+    """
+
+    # same answers as is_valid_bracket_sequence, whatever the chunking
+    for s in ["{[BENFICA 1904]}", "{[]()[]}", "", "{[benfica 1904}", "{[())}", "}])"]:
+        chunks = [s[i:i + 2] for i in range(0, len(s), 2)]
+        assert validate_stream(chunks).valid == is_valid_bracket_sequence(s)
+
+    # first error reported with offset, line and column
+    result = validate_stream(io.StringIO("{\n  [1, 2)\n}"), chunk_size = 3)
+    assert not result
+    assert (result.offset, result.line, result.column) == (9, 2, 8)
+
+    result = validate_stream("ok\n(((")
+    assert (result.offset, result.line, result.column, result.message) == (5, 2, 3, "Unclosed '('.")
+
+    # brackets inside string literals are skipped, escaped quotes do not end the literal
+    payload = '{"key": "value with } and \\" quote", "list": [1, 2]}'
+    assert not validate_stream(payload)
+    assert validate_stream(payload, quotes = '"')
+    assert validate_stream(['{"a": "\\', '"}"}'], quotes = '"')
+    assert validate_stream('["open', quotes = '"').message == 'Unterminated string literal opened with ".'
+
+    # configurable bracket pairs
+    validator = BracketValidator(pairs = "<>()")
+    validator.feed("<(a)")
+    validator.feed("[>")
+    assert validator.close().valid
+
+def test_validate_many():
+    """
+    tests batch validation agrees with is_valid_bracket_sequence, in process and with a process pool.
+    """
+
+    strings = ["{[BENFICA 1904]}", "[{Benfica}]", "", "{[benfica 1904}", "{[())}", "}])", "(]", "([)]",
+               "(" * 40 + ")" * 40, "(" * 40 + "]" * 40, "[(" * 50 + ")]" * 50, "[(" * 50 + "])" * 50,
+               "{\"benfica\": [1904, {\"águia\": \"vitória\"}]}", "{\"benfica\": [1904, {\"águia\": \"vitória\"]}}",
+               ")(benfica 1904 benfica 1904)(", "(benfica 1904 [benfica] 1904)"]
+    expected = [int(is_valid_bracket_sequence(s)) for s in strings]
+
+    results = validate_many(strings)
+    assert list(results) == expected
+    assert results.itemsize == 1
+
+    assert list(validate_many(strings * 3, workers = 2, batch_size = 5)) == expected * 3
+    assert list(validate_many(["<a>", "<(>)", "«benfica (1904) » «»", "«benfica (1904» ) «»"], pairs = "<>()«»")) == [1, 0, 1, 0]
@@ -0,0 +1,36 @@
+import shutil
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from batch_cleaning import output_names, run_batch
+from data_cleaning import DATA_FILE, load_imports85
+
+def test_run_batch(tmp_path):
+    """
+    tests the batch runner cleans every file, merges the summaries and keeps same-named inputs apart.
+    """
+    for day in ('day1', 'day2'):
+        (tmp_path / day).mkdir()
+        shutil.copy(DATA_FILE, tmp_path / day / 'extract.data')
+    shutil.copy(DATA_FILE, tmp_path / 'day1' / 'other.data')
+
+    summary = run_batch(str(tmp_path / '*' / '*.data'), str(tmp_path / 'out'), workers=2, fmt='feather')
+    rows    = len(load_imports85(DATA_FILE))
+    assert summary['files'] == 3
+    assert summary['rows'] == 3 * rows
+    assert summary['missing']['price'] == 3 * 4
+    assert summary['rows_per_sec'] > 0
+
+    # one output per input, the two extract.data files do not overwrite each other
+    outputs = sorted(path.name for path in (tmp_path / 'out').iterdir())
+    assert len(outputs) == 3 and 'other.feather' in outputs
+    assert all(name.startswith('extract-') for name in outputs if name != 'other.feather')
+    for path in (tmp_path / 'out').iterdir():
+        cleaned = pd.read_feather(path)
+        assert len(cleaned) == rows and not cleaned['price'].isna().any()
+
+    assert output_names(['a/x.data', 'b/y.data']) == ['x', 'y']
+    with pytest.raises(ValueError):
+        run_batch(str(tmp_path / '*.benfica'), str(tmp_path / 'out'))
@@ -0,0 +1,279 @@
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+import data_cleaning
+from data_cleaning import (COLUMN_NAMES, DATA_FILE, IMPORTS85_SPEC, CleaningPipeline, ColumnMoments, CorrelationAccumulator,
+                           PlotWriter, _plot, analysis_report, analyze_missing_values, memory_report, top_correlated,
+                           iter_outlier_masks, load_cleaned, load_imports85, outlier_mask, outlier_rows)
+
+@pytest.fixture
+def raw():
+    return load_imports85(DATA_FILE)
+
+def test_pipeline_fit_transform(raw):
+    """
+    tests the pipeline fills every spec column with statistics computed once, without touching its input.
+    """
+    pipeline = CleaningPipeline().fit(raw)
+    assert pipeline.fill_values_['price'] == raw['price'].median()
+    assert pipeline.fill_values_['num-of-doors'] == 4
+
+    cleaned = pipeline.transform(raw)
+    assert not cleaned[list(IMPORTS85_SPEC)].isna().any().any()
+    assert cleaned['num-of-doors'].dtype == 'int64' and cleaned['num-of-cylinders'].dtype == 'int64'
+    assert raw['price'].isna().sum() == 4  # the input frame is not modified
+
+    # the same result on the untyped read, with '?' and the words still in the columns
+    untyped = CleaningPipeline().fit_transform(pd.read_csv(DATA_FILE, names=COLUMN_NAMES))
+    columns = list(IMPORTS85_SPEC)
+    assert np.array_equal(untyped[columns].to_numpy(dtype=float), cleaned[columns].to_numpy(dtype=float))
+
+    with pytest.raises(ValueError):
+        CleaningPipeline().transform(raw)
+    with pytest.raises(ValueError):
+        CleaningPipeline({'price': {'impute': 'benfica'}})
+
+def test_pipeline_transform_new_batches(raw):
+    """
+    tests transform on later batches with missing values, unmapped words and unseen categories.
+    """
+    pipeline = CleaningPipeline().fit(raw)
+
+    batch = pd.read_csv(DATA_FILE, names=COLUMN_NAMES, nrows=4, dtype=str)
+    batch.loc[0, 'num-of-cylinders'] = '?'
+    batch.loc[1, 'num-of-cylinders'] = 'sixteen'
+    batch.loc[2, 'num-of-doors']     = 'benfica'
+    batch.loc[3, 'price']            = '?'
+    batch.loc[3, 'make']             = 'tesla'
+
+    cleaned = pipeline.transform(batch)
+    assert cleaned.loc[:1, 'num-of-cylinders'].tolist() == [pipeline.fill_values_['num-of-cylinders']] * 2
+    assert cleaned.loc[2, 'num-of-doors'] == 4
+    assert cleaned.loc[3, 'price'] == pipeline.fill_values_['price']
+    assert cleaned.loc[3, 'make'] == 'tesla'  # columns outside the spec are passed through
+
+    # an integer column without imputation keeps its missing values as the nullable Int64 dtype
+    pipeline = CleaningPipeline({'num-of-cylinders': {'mapping': IMPORTS85_SPEC['num-of-cylinders']['mapping'], 'dtype': 'int64'}})
+    cleaned  = pipeline.fit(raw).transform(batch)
+    assert cleaned['num-of-cylinders'].dtype == 'Int64'
+    assert cleaned['num-of-cylinders'].isna().sum() == 2
+
+def test_pipeline_mode_of_missing_column(raw):
+    """
+    tests a mode column without any value in the fitted data is left unfilled instead of failing.
+    """
+    empty = raw.assign(**{'num-of-doors': np.nan})
+    pipeline = CleaningPipeline().fit(empty)
+    assert 'num-of-doors' not in pipeline.fill_values_
+
+    cleaned = pipeline.transform(empty)
+    assert cleaned['num-of-doors'].dtype == 'Int64'
+    assert cleaned['num-of-doors'].isna().all()
+
+def test_analyze_missing_values_does_not_modify_input(raw):
+    """
+    tests the missing value summary of the typed load, without changing the frame.
+    """
+    before  = raw.copy()
+    summary = analyze_missing_values(raw, plot=False, verbose=False)
+    assert summary.loc['normalized-losses', 'Missing Count'] == 41
+    assert summary.loc['num-of-doors', 'Missing Count'] == 2
+    pd.testing.assert_frame_equal(raw, before)
+
+def test_memory_report(capsys):
+    """
+    tests the typed read is smaller than the untyped one, and the comparison is printed.
+    """
+    report = memory_report(DATA_FILE)
+    assert report['typed_bytes'] < report['untyped_bytes']
+    assert report['ratio'] == report['untyped_bytes'] / report['typed_bytes']
+    assert capsys.readouterr().out.startswith('Memory usage:')
+
+def test_main_headless_report(tmp_path, monkeypatch, capsys):
+    """
+    tests a headless run with a JSON report never imports matplotlib or seaborn, and writes the analysis of the cleaned data.
+    """
+    data_file = tmp_path / 'imports-85.data'
+    shutil.copy(DATA_FILE, data_file)
+    monkeypatch.chdir(tmp_path)
+    for name in [name for name in sys.modules if name.split('.')[0] in ('matplotlib', 'seaborn')]:
+        monkeypatch.delitem(sys.modules, name)
+
+    data_cleaning.main(['--headless', '--report', 'report.json', '--memory', str(data_file)])
+    assert not [name for name in sys.modules if name.split('.')[0] in ('matplotlib', 'seaborn')]
+
+    with open('report.json') as file:
+        report = json.load(file)
+    assert report == json.loads(json.dumps(analysis_report(load_cleaned(str(data_file)))))
+    assert report['shape'] == [205, 26]
+    assert not any(column['Missing Count'] for column in report['missing'].values())
+    assert report['correlation']['price']['price'] == 1
+    assert report['outliers'] and all(column in report['describe'] for column in report['outliers'])
+
+    output = capsys.readouterr().out
+    assert output.startswith('Memory usage:') and 'Features most correlated with price:' in output
+    assert os.listdir(tmp_path / '.cache')  # the frames were cached next to the data file
+
+def test_main_plots_written_in_background(tmp_path):
+    """
+    tests --plots renders every plot of the analysis to files, and _plot with a PlotWriter or False.
+    """
+    pytest.importorskip('matplotlib')
+    pytest.importorskip('seaborn')
+    data_file = tmp_path / 'imports-85.data'
+    shutil.copy(DATA_FILE, data_file)
+    plots = tmp_path / 'plots'
+
+    data_cleaning.main(['--plots', str(plots), str(data_file)])
+    outliers = analysis_report(load_cleaned(str(data_file)))['outliers']
+    expected = {'missing_values.png', 'missing_values_cleaned.png', 'correlation_matrix.png'} | {f'boxplot_{column}.png' for column in outliers}
+    assert set(os.listdir(plots)) == expected
+    assert all(os.path.getsize(plots / name) for name in expected)
+
+    def never_drawn(ax):
+        raise AssertionError('plot=False must not draw')
+
+    writer = PlotWriter(str(tmp_path / 'svg'), fmt='svg')
+    _plot(writer, 'line', (2, 2), lambda ax, values: ax.plot(values), [1, 9, 0, 4])
+    _plot(False, 'never', (2, 2), never_drawn)
+    assert writer.close() == [str(tmp_path / 'svg' / 'line.svg')]
+    assert os.listdir(tmp_path / 'svg') == ['line.svg']
+
+def test_outlier_mask_methods():
+    """
+    tests the zscore, mad and iqr methods on a column with one outlier, with missing values and a constant column.
+    """
+    values = [10, 11, 9, 10, 12, 8, 10, 11, 9, 10] * 2 + [100]
+    df = pd.DataFrame({'value':    values,
+                       'missing':  [np.nan] + values[1:],
+                       'constant': [5] * len(values),
+                       'name':     ['benfica'] * len(values)})
+
+    for method in ('zscore', 'mad', 'iqr'):
+        mask = outlier_mask(df, method=method)
+        assert list(mask.columns) == ['value', 'missing', 'constant']  # only numeric columns
+        assert mask['value'].tolist() == [False] * 20 + [True]
+        assert mask['missing'].tolist() == [False] * 20 + [True]       # NaN is never an outlier
+        assert not mask['constant'].any()
+        assert {column: rows.tolist() for column, rows in outlier_rows(mask).items()} == {'value': [20], 'missing': [20]}
+
+    # a spread of 0 flags nothing even when a few values differ from the median
+    mostly = pd.DataFrame({'doors': [4] * 17 + [2] * 3})
+    for method in ('zscore', 'mad', 'iqr'):
+        assert not outlier_mask(mostly, method=method)['doors'].any()
+    assert outlier_mask(mostly, method='zscore', threshold=1)['doors'].sum() == 3
+
+    with pytest.raises(ValueError):
+        outlier_mask(df, method='benfica')
+
+def test_iter_outlier_masks_two_pass(raw):
+    """
+    tests the chunked two-pass z-score flags match outlier_mask on the whole frame.
+    """
+    columns = raw.select_dtypes(include='number').columns
+    moments = ColumnMoments(columns)
+    for chunk in load_imports85(DATA_FILE, chunksize=50):
+        moments.update(chunk)
+
+    masks = pd.concat(iter_outlier_masks(load_imports85(DATA_FILE, chunksize=50), columns, moments=moments))
+    pd.testing.assert_frame_equal(masks, outlier_mask(raw, columns))
+
+def test_chunked_moments_and_correlations(raw):
+    """
+    tests chunked and merged ColumnMoments and CorrelationAccumulator against pandas on the whole frame.
+    """
+    df      = CleaningPipeline().fit_transform(raw)
+    columns = list(df.select_dtypes(include='number').columns)
+    chunks  = [df.iloc[start:start + 37] for start in range(0, len(df), 37)]
+
+    # two workers with a few chunks each, merged at the end
+    left, right = CorrelationAccumulator(columns), CorrelationAccumulator(columns)
+    moments     = ColumnMoments(columns), ColumnMoments(columns)
+    for i, chunk in enumerate(chunks):
+        (left if i % 2 else right).update(chunk)
+        moments[i % 2].update(chunk)
+    merged = left.merge(right)
+
+    pd.testing.assert_frame_equal(merged.corr(), df[columns].corr(), rtol=1e-10)
+    assert merged.count == len(df)
+    assert np.allclose(merged.mean, df[columns].mean())
+
+    merged_moments = moments[0].merge(moments[1])
+    assert np.allclose(merged_moments.mean, df[columns].mean(), rtol=1e-12)
+    assert np.allclose(merged_moments.std, df[columns].std(ddof=0), rtol=1e-12)
+
+    # the target mode only tracks the correlations with price, and gives the same values
+    target = CorrelationAccumulator(columns, 'price')
+    for chunk in chunks:
+        target.update(chunk)
+    expected = df[columns].corr()['price']
+    pd.testing.assert_series_equal(target.correlations(), expected, rtol=1e-10, check_names=False)
+
+    top = top_correlated(df, 'price', k=3, columns=columns)
+    assert list(top.index) == list(expected.drop('price').abs().sort_values(ascending=False).index[:3])
+    with pytest.raises(ValueError):
+        target.corr()
+
+    # missing values in a chunk: ColumnMoments skips them per column, like pandas
+    holes = raw[columns]
+    moments = ColumnMoments(columns)
+    for start in range(0, len(holes), 37):
+        moments.update(holes.iloc[start:start + 37])
+    assert np.allclose(moments.mean, holes.mean(), rtol=1e-12)
+    assert np.allclose(moments.std, holes.std(ddof=0), rtol=1e-12)
+
+def test_load_cleaned_cache(tmp_path, monkeypatch):
+    """
+    tests cache hits, misses on input and spec changes, and which stale files are removed.
+    """
+    data_file = tmp_path / 'imports-85.data'
+    shutil.copy(DATA_FILE, data_file)
+    cache_dir = tmp_path / 'cache'
+
+    parses = []
+    def counting_load(*args, **kwargs):
+        parses.append(args)
+        return load_imports85(*args, **kwargs)
+    monkeypatch.setattr(data_cleaning, 'load_imports85', counting_load)
+
+    # miss: one parse for both frames, then hits without parsing
+    raw, cleaned = load_cleaned(str(data_file), cache_dir=str(cache_dir), raw=True)
+    assert len(parses) == 1
+    pd.testing.assert_frame_equal(load_cleaned(str(data_file), cache_dir=str(cache_dir)), cleaned)
+    pd.testing.assert_frame_equal(load_cleaned(str(data_file), cache_dir=str(cache_dir), raw=True)[0], raw)
+    assert len(parses) == 1
+    assert not cleaned['price'].isna().any() and raw['price'].isna().sum() == 4
+
+    # another spec misses, and the caches of both specs are kept so alternating does not rebuild
+    spec = {**IMPORTS85_SPEC, 'price': {'impute': 'mean'}}
+    assert load_cleaned(str(data_file), spec, cache_dir=str(cache_dir))['price'].sum() != cleaned['price'].sum()
+    load_cleaned(str(data_file), cache_dir=str(cache_dir))
+    load_cleaned(str(data_file), spec, cache_dir=str(cache_dir))
+    assert len(parses) == 2
+    assert len(os.listdir(cache_dir)) == 3
+
+    # an input with the same name in another directory, and a temporary file of another writer, are left alone
+    other = tmp_path / 'other' / 'imports-85.data'
+    other.parent.mkdir()
+    shutil.copy(DATA_FILE, other)
+    load_cleaned(str(other), cache_dir=str(cache_dir))
+    (cache_dir / 'imports-85-writing.feather.tmp').write_text('benfica')
+    assert len(os.listdir(cache_dir)) == 5
+
+    # a changed input misses and replaces the caches of its older version only
+    with open(data_file) as file:
+        lines = file.readlines()
+    with open(data_file, 'w') as file:
+        file.writelines(lines[:100])
+    assert len(load_cleaned(str(data_file), cache_dir=str(cache_dir))) == 100
+    assert len(parses) == 4
+    assert len(os.listdir(cache_dir)) == 3
+    assert load_cleaned(str(other), cache_dir=str(cache_dir)).shape == cleaned.shape
+    assert len(parses) == 4
@@ -0,0 +1,405 @@
+import asyncio
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from dummy_sql_data import populate
+from queries_explained import (QUERY_A, QUERY_B, REPORTS, SUMMARY_QUERY_A, SUMMARY_QUERY_B, iter_report, migrate,
+                               query_a, query_b, refresh)
+from query_service import AsyncQueryService, ConnectionPool, QueryService
+from salary_partitions import SalaryPartitions, split_salaries
+from columnar_engine import ColumnarEngine
+from data_cleaning import DATA_FILE
+from load_cars import CARS_INDEXES, bulk_load
+
+A = REPORTS['query_a'].filters
+B = REPORTS['query_b'].filters
+
+# query_a before the migration, the reference for the results of the grouped version (bare column of MAX(month_id))
+LEGACY_QUERY_A = """
+WITH Recent_Salaries AS (
+    SELECT employee_id, MAX(month_id) AS recent_month FROM tb_salary GROUP BY employee_id
+),
+Overpaid_Employees AS (
+    SELECT s.employee_id, s.month_id, s.salary_value, r.maximum_ref_value
+    FROM tb_salary s
+    JOIN tb_employee e ON s.employee_id = e.employee_id
+    JOIN tb_reference_salary r ON e.position = r.position
+    JOIN Recent_Salaries rs ON s.employee_id = rs.employee_id AND s.month_id = rs.recent_month
+    WHERE e.department = 'market_insights' AND e.district = 'Plzen' AND e.country = 'Czech Republic'
+    AND r.year = CAST(SUBSTR(s.month_id, 1, 4) AS INTEGER) AND s.salary_value > r.maximum_ref_value
+),
+Overpaid_Duration AS (
+    SELECT s.employee_id, COUNT(*) AS months_above_max
+    FROM tb_salary s
+    JOIN tb_employee e ON s.employee_id = e.employee_id
+    JOIN tb_reference_salary r ON e.position = r.position
+    WHERE e.department = 'market_insights' AND e.district = 'Plzen' AND e.country = 'Czech Republic'
+    AND r.year = CAST(SUBSTR(s.month_id, 1, 4) AS INTEGER) AND s.salary_value > r.maximum_ref_value
+    GROUP BY s.employee_id
+)
+SELECT o.employee_id, e.position, e.department, e.country, e.district,
+       o.salary_value, o.maximum_ref_value, o.month_id, d.months_above_max
+FROM Overpaid_Employees o
+JOIN tb_employee e ON o.employee_id = e.employee_id
+JOIN Overpaid_Duration d ON o.employee_id = d.employee_id
+"""
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    populate(conn, n_employees=300, seed=7, overpaid_share=0.3)
+    # a few overpaid months for employees that are not overpaid at their last month
+    conn.execute("UPDATE tb_salary SET salary_value = 9000 WHERE employee_id % 5 = 0 AND month_id % 100 = 6")
+    conn.commit()
+    migrate(conn)
+    yield conn
+    conn.close()
+
+def plan(conn, query, params = ()):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+
+def test_bulk_load_cars_is_repeatable(tmp_path):
+    data_file = tmp_path / "cars.data"
+    with open(DATA_FILE) as file:
+        data_file.write_text("".join(file.readlines()[:20]))
+    db_path = str(tmp_path / "cars.sqlite")
+
+    # loading twice keeps one copy of every row, append adds a second one
+    assert bulk_load(db_path, str(data_file), batch_size=7)['rows'] == 20
+    assert bulk_load(db_path, str(data_file), batch_size=7)['rows'] == 20
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*), COUNT(DISTINCT make) FROM cars").fetchone() == (20, 4)
+        assert conn.execute("SELECT COUNT(*) FROM cars WHERE num_of_doors NOT IN (2, 4)").fetchone()[0] == 0
+        indexes = {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'cars'")}
+    assert indexes == set(CARS_INDEXES)
+
+    bulk_load(db_path, str(data_file), append=True)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM cars").fetchone()[0] == 40
+
+def test_migrate_rebuilds_salary_table_with_year():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript("""
+    CREATE TABLE tb_employee (employee_id INTEGER PRIMARY KEY, position TEXT, department TEXT, country TEXT, district TEXT);
+    CREATE TABLE tb_salary (payment_id INTEGER PRIMARY KEY AUTOINCREMENT, month_id INTEGER, employee_id INTEGER, salary_value REAL);
+    CREATE TABLE tb_reference_salary (position TEXT, year INTEGER, maximum_ref_value REAL, minimum_ref_value REAL, PRIMARY KEY(position, year));
+    INSERT INTO tb_salary (month_id, employee_id, salary_value) VALUES (201001, 1, 100), (202312, 1, 200);
+    """)
+    assert migrate(conn) == ['year', 'idx_salary_employee_month', 'idx_employee_location', 'idx_reference_position_year',
+                             'idx_salary_year', 'summaries']
+    assert conn.execute("SELECT payment_id, year, salary_value FROM tb_salary").fetchall() == [(1, 2010, 100.0), (2, 2023, 200.0)]
+
+    # new rows get the next payment_id and their year, and a second migration does nothing
+    conn.execute("INSERT INTO tb_salary (month_id, employee_id, salary_value) VALUES (201105, 1, 300)")
+    assert conn.execute("SELECT payment_id, year FROM tb_salary WHERE month_id = 201105").fetchone() == (3, 2011)
+
+    # the pending insert is left to the caller instead of being committed with the migration
+    with pytest.raises(ValueError, match="transaction"):
+        migrate(conn)
+    assert conn.in_transaction
+    conn.commit()
+    assert migrate(conn) == []
+
+def test_query_a_matches_legacy_query(conn):
+    expected = sorted(conn.execute(LEGACY_QUERY_A).fetchall())
+    assert expected  # the fixture has overpaid employees
+    assert sorted(conn.execute(QUERY_A, A).fetchall()) == expected
+
+    df = query_a(conn.cursor(), summary=False)
+    assert list(df.columns) == ["employee_id", "position", "department", "country", "district", "salary_value", "maximum_ref_value", "month_id"]
+    assert len(df) == len(expected)
+
+def test_query_b_totals(conn):
+    expected = dict(conn.execute("""
+        SELECT employee_id, SUM(salary_value) FROM tb_salary
+        WHERE month_id BETWEEN 201001 AND 201012
+          AND employee_id IN (SELECT employee_id FROM tb_employee
+                              WHERE department = 'supercars' AND district = 'Woking Borough' AND country = 'Surrey (England)')
+        GROUP BY employee_id"""))
+    df = query_b(conn.cursor(), summary=False)
+    assert dict(zip(df["employee_id"], df["total_salary_2010"])) == expected
+    assert df["total_salary_2010"].is_monotonic_increasing
+
+def test_iter_report_chunks(conn):
+    expected = query_b(conn.cursor(), summary=False, year=2012)
+    chunks   = list(iter_report(conn.cursor(), 'query_b', summary=False, chunksize=3, year=2012))
+    assert len(expected) > 3 and all(len(chunk) <= 3 for chunk in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+    # no rows: no chunk at all, or one empty frame with the report columns without chunksize
+    assert list(iter_report(conn.cursor(), 'query_b', summary=False, chunksize=3, department='benfica')) == []
+    empty, = iter_report(conn.cursor(), 'query_b', summary=False, department='benfica', year=2012)
+    assert empty.empty and list(empty.columns) == list(expected.columns)
+
+# a full scan of a table (or alias), scans of subqueries and co-routines are fine
+TABLE_SCAN = re.compile(r"^SCAN (tb_\w+|[esryo])\b(?!.*INDEX)")
+
+@pytest.mark.parametrize("query, params", [(QUERY_A, A), (QUERY_B, B)], ids=["query_a", "query_b"])
+def test_queries_use_indexes(conn, query, params):
+    details = plan(conn, query, params)
+    assert not [detail for detail in details if TABLE_SCAN.match(detail)], details
+    assert any("idx_employee_location" in detail for detail in details), details
+    assert any("COVERING INDEX idx_salary_employee_month" in detail for detail in details), details
+
+def test_query_a_uses_reference_index(conn):
+    details = plan(conn, QUERY_A, A)
+    assert any("COVERING INDEX idx_reference_position_year" in detail for detail in details), details
+
+def summaries(conn):
+    return (conn.execute("SELECT * FROM tb_salary_year_summary ORDER BY employee_id, year").fetchall(),
+            conn.execute("SELECT * FROM tb_employee_overpaid ORDER BY employee_id").fetchall())
+
+def test_summary_queries_match_sql(conn):
+    assert conn.execute(SUMMARY_QUERY_A, A).fetchall() == conn.execute(QUERY_A, A).fetchall()
+    assert conn.execute(SUMMARY_QUERY_B, B).fetchall() == conn.execute(QUERY_B, B).fetchall()
+    pd.testing.assert_frame_equal(query_a(conn.cursor(), summary=True), query_a(conn.cursor()))
+    pd.testing.assert_frame_equal(query_b(conn.cursor(), summary=True), query_b(conn.cursor()))
+
+def test_incremental_refresh_matches_full_refresh(conn):
+    # a new payroll month for every employee, overpaid for some of them
+    conn.execute("INSERT INTO tb_reference_salary SELECT position, 2024, maximum_ref_value, minimum_ref_value FROM tb_reference_salary WHERE year = 2023")
+    conn.execute("""INSERT INTO tb_salary (month_id, employee_id, salary_value)
+                    SELECT 202401, employee_id, CASE WHEN employee_id % 3 = 0 THEN 8000 ELSE 3000 END FROM tb_employee""")
+    before = conn.execute(SUMMARY_QUERY_A, A).fetchall()
+
+    # the new salaries are committed by the caller, not by refresh
+    with pytest.raises(ValueError, match="transaction"):
+        refresh(conn, 202401)
+    assert conn.in_transaction
+    conn.commit()
+
+    # the reports read tb_salary unless asked for the summaries, which are stale until refreshed
+    assert query_a(conn.cursor()).values.tolist() == [list(row[:-1]) for row in conn.execute(QUERY_A, A)]
+    assert query_a(conn.cursor(), summary=True).values.tolist() == [list(row[:-1]) for row in before]
+
+    refresh(conn, 202401)
+    incremental = summaries(conn)
+    assert conn.execute(SUMMARY_QUERY_A, A).fetchall() != before
+    assert conn.execute(SUMMARY_QUERY_A, A).fetchall() == conn.execute(QUERY_A, A).fetchall()
+
+    # refreshing again, or from a month in the middle of the year, changes nothing
+    refresh(conn, 202406)
+    assert summaries(conn) == incremental
+    refresh(conn)
+    assert summaries(conn) == incremental
+
+def test_summary_queries_use_indexes(conn):
+    for query, params in ((SUMMARY_QUERY_A, A), (SUMMARY_QUERY_B, B)):
+        details = plan(conn, query, params)
+        assert not [detail for detail in details if TABLE_SCAN.match(detail)], details
+        assert any("idx_employee_location" in detail for detail in details), details
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "company.sqlite")
+    conn = sqlite3.connect(path)
+    populate(conn, n_employees=100, seed=3)
+    migrate(conn)
+    conn.close()
+    return path
+
+def test_pool_connections_are_read_only(database):
+    pool = ConnectionPool(database, size=1, timeout=0.1)
+    with pool.connection() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM tb_salary")
+        # the only connection is borrowed
+        with pytest.raises(TimeoutError):
+            with pool.connection():
+                pass
+    pool.close()
+
+def test_service_matches_queries_and_filters(database):
+    conn = sqlite3.connect(database)
+    with QueryService(database, pool_size=2) as service:
+        pd.testing.assert_frame_equal(service.report('query_a'), query_a(conn.cursor()))
+        for filters in ({}, {'district': 'Lisbon'}, {'year': 2015}):
+            pd.testing.assert_frame_equal(service.report('query_b', **filters), query_b(conn.cursor(), **filters))
+        assert list(service.report('query_b', year=2015).columns)[-1] == "total_salary_2015"
+
+        plzen  = {'department': 'market_insights', 'district': 'Plzen', 'country': 'Czech Republic'}
+        chunks = list(service.stream('query_b', chunksize=4, summary=False, **plzen))
+        assert len(chunks) > 1 and all(len(chunk) <= 4 for chunk in chunks)
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), query_b(conn.cursor(), **plzen))
+
+        with pytest.raises(ValueError):
+            service.report('query_b', city='Plzen')
+    conn.close()
+
+def test_service_cache_is_invalidated_by_writes(database):
+    with QueryService(database, pool_size=4) as service:
+        with ThreadPoolExecutor(8) as pool:
+            frames = list(pool.map(lambda _: service.report('query_b'), range(32)))
+        assert all(frame.equals(frames[0]) for frame in frames)
+        assert service.cache_info()['size'] == 1 and service.cache_info()['hits'] >= 24
+
+        conn = sqlite3.connect(database)
+        with conn:
+            conn.execute("UPDATE tb_salary_year_summary SET total_salary = total_salary + 1 WHERE year = 2010")
+        conn.close()
+
+        assert (service.report('query_b')["total_salary_2010"] == frames[0]["total_salary_2010"] + 1).all()
+
+def test_async_reports_run_concurrently(database):
+    variants = [('query_b', {'year': year}) for year in range(2010, 2024)] + [('query_a', {}), ('query_a', {'district': 'Lisbon'})]
+
+    async def run():
+        async with AsyncQueryService(database, pool_size=3) as service:
+            return await service.reports(variants, summary=False)
+
+    conn = sqlite3.connect(database)
+    for df, (name, filters) in zip(asyncio.run(run()), variants):
+        expected = query_a(conn.cursor(), False, **filters) if name == 'query_a' else query_b(conn.cursor(), False, **filters)
+        pd.testing.assert_frame_equal(df, expected)
+    conn.close()
+
+def test_async_timeout_interrupts_the_query(tmp_path):
+    path = str(tmp_path / "large.sqlite")
+    conn = sqlite3.connect(path)
+    populate(conn, n_employees=2000, seed=5, fast=True)
+    migrate(conn)
+    conn.close()
+
+    async def run():
+        async with AsyncQueryService(path, pool_size=1, cache_size=0) as service:
+            start    = time.perf_counter()
+            complete = await service.report('query_a', summary=False)
+            elapsed  = time.perf_counter() - start
+
+            async def next_report_waits():
+                # the only thread and connection must be free again well before the interrupted query would have ended
+                start = time.perf_counter()
+                assert (await service.report('query_a')).equals(complete)
+                return time.perf_counter() - start
+
+            with pytest.raises(TimeoutError):
+                await service.report('query_a', summary=False, timeout=elapsed / 10)
+            assert await next_report_waits() < elapsed / 2
+
+            task = asyncio.create_task(service.report('query_a', summary=False))
+            await asyncio.sleep(elapsed / 10)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert await next_report_waits() < elapsed / 2
+
+    asyncio.run(run())
+
+def test_partitioned_queries_match_monolithic_table(database, tmp_path):
+    conn = sqlite3.connect(database)
+    expected_a = query_a(conn.cursor(), summary=False)
+    expected_b = query_b(conn.cursor(), summary=False, year=2015)
+    salaries   = conn.execute("SELECT COUNT(*) FROM tb_salary").fetchone()[0]
+
+    # splitting again replaces the content of the partitions instead of inserting the payments twice
+    split_salaries(conn, str(tmp_path / "partitions"))
+    partitions = split_salaries(conn, str(tmp_path / "partitions"))
+    assert partitions.years() == list(range(2010, 2024))
+    with partitions.view(201001, 201912):
+        assert conn.execute("SELECT COUNT(*) FROM tb_salary").fetchone()[0] == salaries * 10 // 14
+    pd.testing.assert_frame_equal(partitions.query_a(), expected_a)
+    pd.testing.assert_frame_equal(partitions.query_b(year=2015), expected_b)
+
+    # tb_salary is kept while the summary tables depend on it
+    with pytest.raises(ValueError, match="summary tables"):
+        split_salaries(conn, str(tmp_path / "partitions"), drop=True)
+    assert query_a(conn.cursor()).equals(expected_a)
+
+    for table in ('tb_salary_year_summary', 'tb_employee_overpaid'):
+        conn.execute(f"DROP TABLE {table}")
+    partitions = split_salaries(conn, str(tmp_path / "partitions"), drop=True)
+    pd.testing.assert_frame_equal(partitions.query_a(), expected_a)
+    assert split_salaries(conn, str(tmp_path / "partitions")).years() == partitions.years()
+
+    # the monolithic table functions explain where the salaries went instead of failing on a missing table
+    for function in (migrate, refresh, lambda conn: query_a(conn.cursor(), summary=False), lambda conn: query_b(conn.cursor(), summary=True)):
+        with pytest.raises(ValueError, match="partition"):
+            function(conn)
+    conn.close()
+
+def test_partition_catalog_errors(database, tmp_path):
+    conn = sqlite3.connect(database)
+    partitions = SalaryPartitions(conn, str(tmp_path / "partitions"))
+    with pytest.raises(ValueError, match="does not exist"):
+        partitions.attach(str(tmp_path / "benfica.sqlite"))
+    (tmp_path / "benfica.sqlite").write_text("not a database")
+    with pytest.raises(ValueError, match="not a salary partition"):
+        partitions.attach(str(tmp_path / "benfica.sqlite"))
+
+    # the caller's transaction is never committed behind its back
+    path = partitions.create(2010)
+    conn.execute("UPDATE tb_employee SET department = 'benfica'")
+    for action in (lambda: partitions.view(201001, 201012).__enter__(), lambda: partitions.detach(2010),
+                   lambda: partitions.attach(path), lambda: partitions.create(2011),
+                   lambda: partitions.insert([(201001, 2, 4000)])):
+        with pytest.raises(ValueError, match="transaction"):
+            action()
+    conn.rollback()
+    assert partitions.years() == [2010]
+    assert conn.execute("SELECT COUNT(*) FROM tb_employee WHERE department = 'benfica'").fetchone()[0] == 0
+
+    # a block that fails rolls back its own writes before the partitions are detached
+    with pytest.raises(ZeroDivisionError):
+        with partitions.view(201001, 201012):
+            conn.execute("UPDATE tb_employee SET department = 'benfica'")
+            1 / 0
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM tb_employee WHERE department = 'benfica'").fetchone()[0] == 0
+    assert [name for _, name, _ in conn.execute("PRAGMA database_list")] == ['main', 'temp']
+    conn.close()
+
+def test_partition_pruning_and_archiving(database, tmp_path):
+    conn = sqlite3.connect(database)
+    partitions = split_salaries(conn, str(tmp_path / "partitions"))
+    expected   = query_b(conn.cursor(), summary=False)
+
+    # only the partition of the year is attached and searched through its index
+    with partitions.view(201001, 201012) as attached:
+        assert attached == [2010]
+        assert [name for _, name, _ in conn.execute("PRAGMA database_list")] == ['main', 'temp', 'p2010']
+        details = plan(conn, QUERY_B, B)
+        assert any("p2010.tb_salary USING COVERING INDEX" in detail for detail in details), details
+    assert [name for _, name, _ in conn.execute("PRAGMA database_list")] == ['main', 'temp']
+
+    path = partitions.detach(2010)
+    assert 2010 not in partitions.years() and partitions.query_b().empty
+    assert partitions.attach(path) == 2010
+    pd.testing.assert_frame_equal(partitions.query_b(), expected)
+
+    # new salaries go to the partition of their year, a new year gets a new partition
+    assert partitions.insert([(202401, 2, 4000), (202402, 2, 4100), (201001, 2, 1)]) == 3
+    assert partitions.years()[-1] == 2024
+    with partitions.view(202401, 202412):
+        assert conn.execute("SELECT COUNT(*), SUM(salary_value) FROM tb_salary").fetchone() == (2, 8100)
+    assert partitions.query_b().set_index("employee_id").loc[2, "total_salary_2010"] == expected.set_index("employee_id").loc[2, "total_salary_2010"] + 1
+
+    # payment ids come from one sequence: unique across the partitions, and not reused while a year is archived
+    last_id = conn.execute("SELECT MAX(payment_id) FROM tb_salary").fetchone()[0]
+    path    = partitions.detach(2024)
+    partitions.insert([(202501, 2, 4200)])
+    partitions.attach(path)
+    ids = []
+    for year in partitions.years():
+        with partitions.view(year * 100 + 1, year * 100 + 12):
+            ids += [payment_id for payment_id, in conn.execute("SELECT payment_id FROM tb_salary")]
+    assert len(ids) == len(set(ids)) and max(ids) == last_id + 4
+    conn.close()
+
+def sorted_frame(df):
+    # rows with equal sort keys may come in any order, in SQL as in the columnar engine
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+@pytest.mark.parametrize("filters", [{}, {'department': 'supercars', 'district': 'Lisbon', 'country': 'Surrey (England)'},
+                                     {'department': 'unknown'}])
+def test_columnar_engine_matches_sql(conn, filters):
+    engine = ColumnarEngine.from_sqlite(conn)
+    pd.testing.assert_frame_equal(sorted_frame(engine.query_a(**filters)), sorted_frame(query_a(conn.cursor(), False, **filters)))
+    for year in (2010, 2017, 1999):
+        pd.testing.assert_frame_equal(sorted_frame(engine.query_b(year=year, **filters)),
+                                      sorted_frame(query_b(conn.cursor(), False, year=year, **filters)))